@@ -1,4 +1,6 @@
 #!/bin/bash
 NAME="$1"
+# Only ask for a terminal when we have one, so the runner can call us too
+DOCKER_TTY=$([ -t 0 ] && echo -it || echo -i)
 
-docker exec -it $NAME /root/post-entrypoint-custom-bringup.sh
+docker exec $DOCKER_TTY $NAME /root/post-entrypoint-custom-bringup.sh
@@ -1,10 +1,12 @@
 #!/bin/bash
  
 NAME=$1
+# Only ask for a terminal when we have one, so the runner can call us too
+DOCKER_TTY=$([ -t 0 ] && echo -it || echo -i)
 # 720 minutess in 12 hours, first try with just one minute
 TIME_MINUTES=$2
  
 	#-e PYTHONPATH="$PYTHONPATH:/usr/local/lib/python3.9/site_packages/" \
-docker exec -it \
+docker exec $DOCKER_TTY \
 	$NAME \
 	mysqlsh  -u root -pmy-secret-pw --execute "support.collect(mysql=true, os=true, time=$TIME_MINUTES, outputdir='/opt/')"
@@ -0,0 +1,174 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Autocorrelation-aware A/B comparison of two TPS series.
+#
+# Adjacent sysbench intervals are strongly correlated, so treating them as
+# independent samples makes any difference look significant. We resample
+# with a moving-block bootstrap instead: each resample glues together
+# randomly chosen blocks of consecutive intervals, which keeps the
+# correlation inside each block. The default block length follows the
+# measured correlation length of each run.
+#
+# Since we only need the mean of each resample, a resample mean is just the
+# average of a few block sums, and block sums come from a prefix sum. A batch
+# of resamples is therefore one fancy-indexing operation, and batches run in
+# worker processes with independent seeds.
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Block start indices drawn at once, bounds the memory of a batch whatever
+# the run length
+INDEX_BATCH = 1 << 22
+
+
+def autocorrelation(values, max_lag=None):
+    """Autocorrelation function of values for lags 0..max_lag, via the FFT."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    max_lag = n - 1 if max_lag is None else min(max_lag, n - 1)
+    centered = values - values.mean()
+    spectrum = np.fft.rfft(centered, 2 * n)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum), 2 * n)[:max_lag + 1]
+    if acf[0] == 0:
+        return np.zeros(max_lag + 1)
+    return acf / acf[0]
+
+
+def effective_sample_size(values):
+    """Sample size divided by the integrated autocorrelation time, summing
+    the autocorrelation up to its first non-positive lag."""
+    acf = autocorrelation(values, len(values) // 4)
+    nonpositive = np.flatnonzero(acf[1:] <= 0)
+    cutoff = nonpositive[0] + 1 if len(nonpositive) else len(acf)
+    tau = 1 + 2 * acf[1:cutoff].sum()
+    return len(values) / max(tau, 1.0)
+
+
+def default_block_length(values):
+    """Block length covering the correlation length of the series: the
+    first lag where the autocorrelation drops below 1/e, but no shorter
+    than the usual n^(1/3) and no longer than a tenth of the run."""
+    n = len(values)
+    acf = autocorrelation(values, n // 4)
+    below = np.flatnonzero(acf < 1 / np.e)
+    decay = below[0] if len(below) else len(acf)
+    return int(max(1, min(max(np.ceil(n ** (1 / 3)), decay), n // 10)))
+
+
+def block_sums(values, block):
+    prefix = np.concatenate([[0.0], np.cumsum(np.asarray(values, dtype=np.float64))])
+    return prefix[block:] - prefix[:-block]
+
+
+def _bootstrap_means(sums, block, n_blocks, resamples, seed):
+    rng = np.random.default_rng(seed)
+    rows = max(1, INDEX_BATCH // n_blocks)
+    means = np.empty(resamples)
+    for start in range(0, resamples, rows):
+        count = min(rows, resamples - start)
+        starts = rng.integers(0, len(sums), size=(count, n_blocks))
+        means[start:start + count] = sums[starts].sum(axis=1) / (block * n_blocks)
+    return means
+
+
+def bootstrap_means(values, block, resamples, seeds, executor=None):
+    """Moving-block bootstrap distribution of the mean of values, split in
+    one batch per seed."""
+    sums = block_sums(values, block)
+    n_blocks = int(np.ceil(len(values) / block))
+    batch = int(np.ceil(resamples / len(seeds)))
+    args = [(sums, block, n_blocks, batch, seed) for seed in seeds]
+    if executor is None:
+        parts = [_bootstrap_means(*a) for a in args]
+    else:
+        parts = list(executor.map(_bootstrap_means, *zip(*args)))
+    return np.concatenate(parts)[:resamples]
+
+
+def compare_runs(a, b, label_a='A', label_b='B', resamples=10000, confidence=0.95,
+                 block=None, seed=0, max_workers=None):
+    """Compare the mean TPS of run b against run a."""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if block is not None and not 1 <= block <= min(len(a), len(b)):
+        raise ValueError(f'Block length {block} must be between 1 and the length of the shorter run, {min(len(a), len(b))}')
+    block_a = block or default_block_length(a)
+    block_b = block or default_block_length(b)
+
+    workers = max_workers or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed).spawn(2 * workers)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            means_a = bootstrap_means(a, block_a, resamples, seeds[:workers], executor)
+            means_b = bootstrap_means(b, block_b, resamples, seeds[workers:], executor)
+    else:
+        means_a = bootstrap_means(a, block_a, resamples, seeds[:1])
+        means_b = bootstrap_means(b, block_b, resamples, seeds[1:2])
+
+    diff = b.mean() - a.mean()
+    boot_diff = means_b - means_a
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(boot_diff, [tail, 1 - tail])
+    # Two-sided p-value from how often the bootstrap difference crosses zero,
+    # counting the observed difference so it is never 0
+    hits = min(np.count_nonzero(boot_diff <= 0), np.count_nonzero(boot_diff >= 0))
+    p_value = min(1.0, 2 * (hits + 1) / (len(boot_diff) + 1))
+
+    pooled_std = np.sqrt((a.var(ddof=1) + b.var(ddof=1)) / 2)
+    cohens_d = float(diff / pooled_std) if pooled_std > 0 else None
+
+    return {
+        'baseline': label_a,
+        'candidate': label_b,
+        'mean_baseline': float(a.mean()),
+        'mean_candidate': float(b.mean()),
+        'difference': float(diff),
+        'relative_difference_pct': float(100 * diff / a.mean()) if a.mean() else None,
+        'confidence': confidence,
+        'ci_low': float(low),
+        'ci_high': float(high),
+        'relative_ci_pct': [float(100 * low / a.mean()), float(100 * high / a.mean())] if a.mean() else None,
+        'p_value': float(p_value),
+        'significant': bool(low > 0 or high < 0),
+        'cohens_d': cohens_d,
+        'bootstrap_std_error': float(boot_diff.std(ddof=1)),
+        'block_length': [block_a, block_b],
+        'lag1_autocorrelation': [float(autocorrelation(a, 1)[-1]), float(autocorrelation(b, 1)[-1])],
+        'effective_sample_size': [effective_sample_size(a), effective_sample_size(b)],
+        'samples': [len(a), len(b)],
+        'resamples': resamples,
+    }
+
+
+def print_comparison(result):
+    # Relative figures are unknown against a baseline mean of 0
+    relative = 'n/a' if result['relative_difference_pct'] is None else f'{result["relative_difference_pct"]:+.2f}%'
+    relative_ci = 'n/a' if result['relative_ci_pct'] is None else '[{:+.2f}%, {:+.2f}%]'.format(*result['relative_ci_pct'])
+    print(f'{result["candidate"]} vs {result["baseline"]}:')
+    print(f'  Mean TPS: {result["mean_candidate"]:.2f} vs {result["mean_baseline"]:.2f}')
+    print(f'  Difference: {result["difference"]:+.2f} TPS ({relative})')
+    print(f'  {result["confidence"] * 100:.0f}% CI: [{result["ci_low"]:+.2f}, {result["ci_high"]:+.2f}] TPS '
+          f'({relative_ci})')
+    # No resample crossed zero: the p-value is only known to be below this
+    floor = 2 / (result['resamples'] + 1)
+    p_value = f'< {floor:.2g}' if result['p_value'] <= floor else f'{result["p_value"]:.4f}'
+    print(f'  p-value: {p_value} ({"significant" if result["significant"] else "not significant"})')
+    cohens_d = 'n/a' if result['cohens_d'] is None else f'{result["cohens_d"]:.2f}'
+    print(f'  Effect size (Cohen\'s d): {cohens_d}')
+    print(f'  Block length: {result["block_length"][0]}/{result["block_length"][1]}, '
+          f'effective samples: {result["effective_sample_size"][0]:.0f}/{result["effective_sample_size"][1]:.0f}\n')
+
+
+def add_significance_arguments(parser):
+    parser.add_argument('--significance', type=str, default=None, metavar='JSON',
+                        help='Compare mean TPS against the first run with a moving-block bootstrap and write the results to this JSON file')
+    parser.add_argument('--resamples', type=int, default=10000, help='Bootstrap resamples for --significance (default: 10000)')
+    parser.add_argument('--block-length', type=int, default=None, help='Bootstrap block length in intervals (default: chosen from the autocorrelation)')
+
+
+def write_significance(results, output):
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
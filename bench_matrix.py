@@ -0,0 +1,273 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Benchmark matrix: mysql.cnf variants x thread counts x repeats.
+#
+# A matrix is expanded into independent jobs, each with its own directory:
+#
+#   <matrix>/matrix.json                    the sweep and the status of every job
+#   <matrix>/cnf/<variant>.cnf              the mysql.cnf of every variant
+#   <matrix>/<variant>/threads-<N>/rep-<k>/
+#       sysbench_output.txt                 the sysbench log
+#       run.json                            job parameters, commands and timings
+#       steps.log                           output of the setup steps
+#
+# Jobs are handed to an execution backend:
+#
+#   docker     runs 0001-0005 for each job, with a container name and port
+#              per parallel slot so jobs never share a MySQL instance, and
+#              optionally os-sampler.py next to sysbench (os_samples.bin)
+#   synthetic  writes a synthetic sysbench log (see synthetic.py), so the
+#              runner, the parsers and the plots can be exercised and timed
+#              without Docker or MySQL
+#
+# Backends are looked up by name in BACKENDS and only need a run(job)
+# method, so another backend (ssh to a remote host, for example) is one more
+# class.
+
+import hashlib
+import json
+import os
+import queue
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from synthetic import write_sysbench_log
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_FILE = 'sysbench_output.txt'
+
+
+def _key(name):
+    return name.strip().replace('-', '_').lower()
+
+
+def apply_cnf_overrides(text, overrides):
+    """Return mysql.cnf text with each key set to its override value in the
+    [mysqld] section, replacing an existing setting or appending one."""
+    lines = text.splitlines()
+    pending = dict((_key(k), (k, v)) for k, v in overrides.items())
+    section = None
+    last_mysqld = None
+    for i, line in enumerate(lines):
+        stripped = line.split('#')[0].strip()
+        if stripped.startswith('['):
+            section = stripped.strip('[]').strip()
+            continue
+        if section != 'mysqld' or not stripped:
+            continue
+        last_mysqld = i
+        key = _key(re.split(r'[=\s]', stripped, 1)[0])
+        if key in pending:
+            name, value = pending.pop(key)
+            lines[i] = f'{name:<31} = {value}'
+    extra = [f'{name:<31} = {value}' for name, value in pending.values()]
+    if extra:
+        if last_mysqld is None:
+            lines += ['[mysqld]'] + extra
+        else:
+            lines[last_mysqld + 1:last_mysqld + 1] = extra
+    return '\n'.join(lines) + '\n'
+
+
+def cnf_variants(cnf_specs, vary_specs):
+    """Expand --cnf [name=]path and --vary key=v1,v2 into (name, text)
+    variants: every base cnf combined with every value of every varied key."""
+    bases = []
+    for spec in cnf_specs:
+        name, sep, path = spec.partition('=')
+        if not sep:
+            path = spec
+            name = os.path.splitext(os.path.basename(spec))[0]
+        with open(path) as f:
+            bases.append((name, f.read()))
+    variants = bases
+    for spec in vary_specs:
+        key, sep, values = spec.partition('=')
+        if not sep or not values:
+            raise ValueError(f'--vary expects key=value1,value2, not "{spec}"')
+        variants = [(f'{name}-{key}-{value}', apply_cnf_overrides(text, {key: value}))
+                    for name, text in variants for value in values.split(',')]
+    names = [name for name, _ in variants]
+    if len(set(names)) != len(names):
+        raise ValueError('mysql.cnf variant names must be unique')
+    return variants
+
+
+def expand_jobs(matrix_dir, variants, threads, repeats, duration):
+    """One job per variant, thread count and repeat."""
+    cnf_dir = os.path.join(matrix_dir, 'cnf')
+    os.makedirs(cnf_dir, exist_ok=True)
+    jobs = []
+    for name, text in variants:
+        cnf_path = os.path.join(cnf_dir, f'{name}.cnf')
+        with open(cnf_path, 'w') as f:
+            f.write(text)
+        for n in threads:
+            for rep in range(repeats):
+                job_dir = os.path.join(matrix_dir, name, f'threads-{n}', f'rep-{rep}')
+                seed = int.from_bytes(hashlib.blake2b(f'{name}/{n}/{rep}'.encode(), digest_size=4).digest(), 'little')
+                jobs.append({
+                    'variant': name,
+                    'cnf': cnf_path,
+                    'threads': n,
+                    'repeat': rep,
+                    'time': duration,
+                    'seed': seed,
+                    'dir': job_dir,
+                    'output': os.path.join(job_dir, OUTPUT_FILE),
+                })
+    return jobs
+
+
+class SyntheticBackend:
+    """Write synthetic sysbench logs instead of running MySQL."""
+
+    def __init__(self, interval=2, warmup=0, dip_period=0, delay=0.0):
+        self.interval = interval
+        self.warmup = warmup
+        self.dip_period = dip_period
+        self.delay = delay
+
+    def run(self, job, slot, log):
+        with open(job['cnf']) as f:
+            cnf_text = f.read()
+        if self.delay:
+            time.sleep(self.delay)
+        write_sysbench_log(job['output'], job['time'], job['threads'], self.interval, cnf_text, job['seed'],
+                           warmup=self.warmup, dip_period=self.dip_period)
+        return []
+
+
+class DockerBackend:
+    """Run the 0001-0005 scripts for a job, one MySQL container per slot."""
+
+    def __init__(self, base_port=3306, telemetry=False, ready_timeout=600, scripts_dir=SCRIPTS_DIR, os_sample=0):
+        self.base_port = base_port
+        self.telemetry = telemetry
+        self.os_sample = os_sample
+        self.ready_timeout = ready_timeout
+        self.scripts_dir = scripts_dir
+
+    def _script(self, name):
+        return os.path.join(self.scripts_dir, name)
+
+    def _step(self, commands, log, command, stdout=None):
+        commands.append(command)
+        log.write(f'$ {" ".join(map(str, command))}\n')
+        log.flush()
+        subprocess.run(list(map(str, command)), stdout=stdout or log, stderr=log, stdin=subprocess.DEVNULL, check=True)
+
+    def _wait_ready(self, name, log):
+        deadline = time.time() + self.ready_timeout
+        while time.time() < deadline:
+            ping = subprocess.run(['docker', 'exec', name, 'mysqladmin', 'ping', '-uroot', '-pmy-secret-pw'],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+            if ping.returncode == 0:
+                return
+            time.sleep(2)
+        raise TimeoutError(f'MySQL in {name} not ready after {self.ready_timeout}s')
+
+    def run(self, job, slot, log):
+        name = f'sysbench-matrix-{slot}'
+        port = self.base_port + slot
+        mysql_dir = os.path.join(job['dir'], 'mysql')
+        telemetry_dir = os.path.join(job['dir'], 'telemetry')
+        os.makedirs(mysql_dir, exist_ok=True)
+        os.makedirs(telemetry_dir, exist_ok=True)
+        commands = []
+        self._step(commands, log, [self._script('0001-start-mysql-docker-port.sh'), name, os.path.abspath(job['cnf']),
+                                   port, os.path.abspath(mysql_dir), os.path.abspath(telemetry_dir),
+                                   os.path.join(self.scripts_dir, 'root-user')])
+        try:
+            self._wait_ready(name, log)
+            self._step(commands, log, [self._script('0002-post-entrypoint-db-setup.sh'), name])
+            self._step(commands, log, [self._script('0003-populate-sbtest.sh'), f'{name}-populate', port])
+            telemetry = None
+            if self.telemetry:
+                command = [self._script('0005-telemetry-mysql.sh'), name, max(1, job['time'] // 60)]
+                commands.append(command)
+                telemetry = subprocess.Popen(list(map(str, command)), stdout=log, stderr=log, stdin=subprocess.DEVNULL)
+            sampler = None
+            if self.os_sample:
+                command = [sys.executable, self._script('os-sampler.py'), 'record', os.path.join(job['dir'], 'os_samples.bin'),
+                           '--interval', self.os_sample]
+                commands.append(command)
+                sampler = subprocess.Popen(list(map(str, command)), stdout=log, stderr=log, stdin=subprocess.DEVNULL)
+            try:
+                with open(job['output'], 'w') as out:
+                    self._step(commands, log, [self._script('0004-run-sysbench.sh'), f'{name}-sysbench', port,
+                                               job['time'], job['threads']], stdout=out)
+            finally:
+                if sampler:
+                    sampler.terminate()
+                    sampler.wait()
+            if telemetry:
+                telemetry.wait()
+        finally:
+            subprocess.run(['docker', 'stop', name], stdout=log, stderr=log, stdin=subprocess.DEVNULL)
+        return commands
+
+
+BACKENDS = {
+    'docker': DockerBackend,
+    'synthetic': SyntheticBackend,
+}
+
+
+def write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def run_job(backend, job, slots):
+    """Run one job on a free slot and record its outcome in run.json."""
+    slot = slots.get()
+    os.makedirs(job['dir'], exist_ok=True)
+    record = dict(job, slot=slot, backend=type(backend).__name__, started=time.time())
+    try:
+        with open(os.path.join(job['dir'], 'steps.log'), 'w') as log:
+            record['commands'] = [list(map(str, c)) for c in backend.run(job, slot, log)]
+        record['status'] = 'ok'
+    except Exception as e:
+        record['status'] = 'failed'
+        record['error'] = f'{type(e).__name__}: {e}'
+    finally:
+        slots.put(slot)
+    record['finished'] = time.time()
+    record['elapsed'] = record['finished'] - record['started']
+    write_json(os.path.join(job['dir'], 'run.json'), record)
+    return record
+
+
+def run_matrix(matrix_dir, jobs, backend, max_parallel=1, progress=None):
+    """Run every job with at most max_parallel at a time and write
+    matrix.json. Returns the job records in matrix order."""
+    slots = queue.Queue()
+    for slot in range(max_parallel):
+        slots.put(slot)
+    started = time.time()
+    records = []
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        futures = [executor.submit(run_job, backend, job, slots) for job in jobs]
+        for future in futures:
+            record = future.result()
+            records.append(record)
+            if progress:
+                progress(record, len(records), len(jobs))
+    write_json(os.path.join(matrix_dir, 'matrix.json'), {
+        'started': started,
+        'elapsed': time.time() - started,
+        'max_parallel': max_parallel,
+        'backend': type(backend).__name__,
+        'jobs': records,
+    })
+    return records
+
+
+def load_matrix(matrix_dir):
+    with open(os.path.join(matrix_dir, 'matrix.json')) as f:
+        return json.load(f)
@@ -0,0 +1,288 @@
+#!/usr/bin/python3
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+import numpy as np
+from synthetic import write_fio_ss_json, write_sysbench_log
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_VERSION = 1
+
+# Absolute change below which a slowdown is noise, per metric
+MIN_DELTA = {'max_rss_mb': 16.0}
+
+# Function to build the command line of a script in this repository
+def script(name, *args):
+    return [sys.executable, os.path.join(SCRIPTS_DIR, name)] + [str(arg) for arg in args]
+
+# Functions returning the command and working directory of each benchmarked
+# tool, given the dataset directory and a scratch output directory
+def plot_tps_command(data, out):
+    return script('plot-sysbench-output-tps.py', os.path.join(data, 'sysbench_a.txt'),
+                  '--output', os.path.join(out, 'tps_over_time.png')), out
+
+def compare_command(data, out):
+    return script('compare-sysbench.py', os.path.join(data, 'sysbench_a.txt'), os.path.join(data, 'sysbench_b.txt'),
+                  '--output', os.path.join(out, 'a_vs_b.png')), out
+
+def variance_command(data, out):
+    return script('plot-variance-tps.py', os.path.join(data, 'sysbench_a.txt'), 'A',
+                  os.path.join(data, 'sysbench_b.txt'), 'B', '--output-dir', out), out
+
+def ss_plot_command(data, out):
+    # The script reads ss_iops.json and ss_bw.json from its working directory
+    for name in ('ss_iops.json', 'ss_bw.json'):
+        link = os.path.join(out, name)
+        if not os.path.lexists(link):
+            os.symlink(os.path.abspath(os.path.join(data, 'fio_a', name)), link)
+    return script(os.path.join('ss', 'plot-fio-steady-state.py')), out
+
+def ss_compare_command(data, out):
+    return script(os.path.join('ss', 'compare-ss.py'), '--dir1', os.path.join(data, 'fio_a'),
+                  '--dir2', os.path.join(data, 'fio_b')), out
+
+TOOLS = {
+    'plot-tps': plot_tps_command,
+    'compare': compare_command,
+    'variance': variance_command,
+    'ss-plot': ss_plot_command,
+    'ss-compare': ss_compare_command,
+}
+
+# Function to parse a comma separated list of sizes such as 1e4,1e5
+def parse_sizes(value):
+    try:
+        sizes = [int(float(v)) for v in value.split(',') if v]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid size list: {value}')
+    if not sizes or min(sizes) < 2:
+        raise argparse.ArgumentTypeError(f'invalid size list: {value}')
+    return sizes
+
+# Function to print a size the way it was most likely given
+def format_size(size):
+    exponent = len(str(size)) - 1
+    return f'1e{exponent}' if size == 10 ** exponent else str(size)
+
+# Function to generate the inputs of one size, reusing them when present.
+# Everything is seeded, so a dataset only depends on its size.
+def prepare_dataset(work_dir, size):
+    data = os.path.join(work_dir, f'data-{format_size(size)}')
+    stamp = os.path.join(data, 'dataset.json')
+    params = {'version': DATASET_VERSION, 'size': size}
+    if os.path.exists(stamp):
+        with open(stamp) as f:
+            if json.load(f) == params:
+                return data
+    print(f'Generating {format_size(size)} interval inputs in {data}', flush=True)
+    for run, seed in (('a', 1), ('b', 2)):
+        os.makedirs(os.path.join(data, f'fio_{run}'), exist_ok=True)
+        write_sysbench_log(os.path.join(data, f'sysbench_{run}.txt'), size * 2, seed=seed, warmup=600)
+        for kind in ('iops', 'bw'):
+            write_fio_ss_json(os.path.join(data, f'fio_{run}', f'ss_{kind}.json'), size, kind, seed=seed)
+    with open(stamp, 'w') as f:
+        json.dump(params, f)
+    return data
+
+# Function to run a tool once and collect its wall time, peak memory and
+# the stage timings it reports through stage_timer.py
+def run_tool(command, cwd, env):
+    fd, timings_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    env = dict(env, PLOT_SYSBENCH_TIMINGS=timings_path)
+    try:
+        with open(os.path.join(cwd, 'stderr.log'), 'w') as err:
+            started = time.perf_counter()
+            proc = subprocess.Popen(command, cwd=cwd, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=err)
+            _, status, usage = os.wait4(proc.pid, 0)
+            wall = time.perf_counter() - started
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode:
+            with open(os.path.join(cwd, 'stderr.log')) as err:
+                tail = err.read().strip().splitlines()[-1:]
+            raise RuntimeError(f'{" ".join(command[1:2])} exited with {proc.returncode}: {" ".join(tail)}')
+        with open(timings_path) as f:
+            stages = json.load(f) if os.path.getsize(timings_path) else {}
+    finally:
+        os.unlink(timings_path)
+    return {
+        'wall': wall,
+        # Interpreter start, imports and anything outside the stages
+        'startup': max(0.0, wall - sum(stages.values())),
+        'max_rss_mb': usage.ru_maxrss / 1024,
+        'stages': stages,
+    }
+
+# Function to benchmark one tool on one dataset, keeping the best of the
+# repeats: noise on an otherwise idle machine only ever adds time
+def benchmark_tool(tool, size, data, out_dir, env, repeat, warm):
+    out = os.path.join(out_dir, f'{tool}-{format_size(size)}')
+    os.makedirs(out, exist_ok=True)
+    command, cwd = TOOLS[tool](data, out)
+    if warm:
+        run_tool(command, cwd, env)
+    runs = [run_tool(command, cwd, env) for _ in range(repeat)]
+    stages = list(dict.fromkeys(stage for run in runs for stage in run['stages']))
+    return {
+        'tool': tool,
+        'size': size,
+        'wall': min(run['wall'] for run in runs),
+        'walls': [run['wall'] for run in runs],
+        'startup': min(run['startup'] for run in runs),
+        'max_rss_mb': max(run['max_rss_mb'] for run in runs),
+        'stages': {stage: min(run['stages'].get(stage, 0.0) for run in runs) for stage in stages},
+    }
+
+# Function to describe the code and machine a benchmark ran on
+def environment(label):
+    def git(*args):
+        try:
+            return subprocess.run(['git', '-C', SCRIPTS_DIR] + list(args), capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    status = git('status', '--porcelain', '--untracked-files=no')
+    versions = {}
+    for package in ('numpy', 'pandas', 'matplotlib', 'scipy'):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        'timestamp': time.time(),
+        'label': label,
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(status),
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'versions': versions,
+    }
+
+# Function to flatten a result into the metrics compared between runs
+def result_metrics(result):
+    metrics = {'wall': result['wall'], 'startup': result['startup'], 'max_rss_mb': result['max_rss_mb']}
+    metrics.update(result['stages'])
+    return metrics
+
+# Function to read the results recorded so far
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+# Function to compute the baseline of every metric: the median over the
+# last runs recorded on the same host with the same cache mode
+def baseline(history, host, cache, runs):
+    values = {}
+    for record in [r for r in history if r['host'] == host and r['cache'] == cache][-runs:]:
+        for result in record['results']:
+            for metric, value in result_metrics(result).items():
+                values.setdefault((result['tool'], result['size'], metric), []).append(value)
+    return {key: float(np.median(v)) for key, v in values.items()}
+
+# Function to print the results next to their baseline and return the regressions
+def report(results, base, threshold, min_delta):
+    regressions = []
+    print(f'{"tool":<12} {"size":>6} {"metric":<12} {"current":>10} {"baseline":>10} {"change":>8}')
+    for result in results:
+        for metric, value in result_metrics(result).items():
+            key = (result['tool'], result['size'], metric)
+            unit = 'MiB' if metric == 'max_rss_mb' else 's'
+            line = f'{result["tool"]:<12} {format_size(result["size"]):>6} {metric:<12} {value:>9.3f}{unit[0]}'
+            if key in base:
+                change = 100 * (value - base[key]) / base[key] if base[key] else 0.0
+                line += f' {base[key]:>9.3f}{unit[0]} {change:>+7.1f}%'
+                if change > threshold and value - base[key] > MIN_DELTA.get(metric, min_delta):
+                    regressions.append((key, value, base[key], change))
+                    line += '  REGRESSION'
+            print(line)
+    return regressions
+
+# Function to print how the wall time of every tool and size evolved
+def show_history(history, runs):
+    history = history[-runs:]
+    if not history:
+        print('No benchmark history')
+        return
+    for i, record in enumerate(history):
+        commit = (record['commit'] or 'unknown')[:10] + ('+' if record['dirty'] else '')
+        stamp = time.strftime('%Y-%m-%d %H:%M', time.localtime(record['timestamp']))
+        print(f'#{i:<3} {stamp} {commit:<11} {record["host"]} cache={record["cache"]} {record["label"] or ""}')
+    keys = list(dict.fromkeys((r['tool'], r['size']) for record in history for r in record['results']))
+    print(f'\n{"tool":<12} {"size":>6}  ' + ' '.join(f'{"#" + str(i):>8}' for i in range(len(history))))
+    for tool, size in keys:
+        walls = []
+        for record in history:
+            wall = [r['wall'] for r in record['results'] if (r['tool'], r['size']) == (tool, size)]
+            walls.append(f'{wall[0]:>7.2f}s' if wall else f'{"-":>8}')
+        print(f'{tool:<12} {format_size(size):>6}  ' + ' '.join(walls))
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the plotting tools on synthetic inputs and track regressions.')
+    parser.add_argument('--sizes', type=parse_sizes, default=[10 ** 4, 10 ** 5, 10 ** 6], help='Comma separated input sizes in intervals (default: 1e4,1e5,1e6)')
+    parser.add_argument('--tools', type=str, default=','.join(TOOLS), help=f'Comma separated tools to benchmark (default: {",".join(TOOLS)})')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per tool and size, the fastest is kept (default: 3)')
+    parser.add_argument('--cache', choices=['cold', 'warm'], default='cold', help='Benchmark without the parsed-series cache, or with a primed one (default: cold)')
+    parser.add_argument('--work-dir', type=str, default=os.path.join(tempfile.gettempdir(), 'plot-sysbench-bench'), help='Directory for the generated inputs and outputs (default: a directory under the system temporary directory)')
+    parser.add_argument('--history', type=str, default='benchmarks.jsonl', help='JSON lines file the results are appended to (default: benchmarks.jsonl)')
+    parser.add_argument('--label', type=str, default=None, help='Free form label stored with the results')
+    parser.add_argument('--baseline-runs', type=int, default=5, help='Previous runs the baseline is the median of (default: 5)')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Slowdown in percent reported as a regression (default: 10)')
+    parser.add_argument('--min-delta', type=float, default=0.05, help='Slowdown in seconds below which a change is noise (default: 0.05)')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 when a regression is found')
+    parser.add_argument('--no-record', action='store_true', help='Do not append the results to the history')
+    parser.add_argument('--show-history', action='store_true', help='Only print the wall times of the recorded runs')
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    if args.show_history:
+        show_history(history, args.baseline_runs * 4)
+        return 0
+
+    tools = [tool.strip() for tool in args.tools.split(',') if tool.strip()]
+    for tool in tools:
+        if tool not in TOOLS:
+            parser.error(f'unknown tool {tool}, choose from: {", ".join(TOOLS)}')
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+
+    env = dict(os.environ, MPLBACKEND='Agg')
+    if args.cache == 'cold':
+        env['PLOT_SYSBENCH_NO_CACHE'] = '1'
+    else:
+        env.pop('PLOT_SYSBENCH_NO_CACHE', None)
+        env['PLOT_SYSBENCH_CACHE_DIR'] = os.path.join(args.work_dir, 'cache')
+    out_dir = os.path.join(args.work_dir, 'out')
+
+    record = environment(args.label)
+    record.update(cache=args.cache, repeat=args.repeat, results=[])
+    for size in args.sizes:
+        data = prepare_dataset(args.work_dir, size)
+        for tool in tools:
+            result = benchmark_tool(tool, size, data, out_dir, env, args.repeat, args.cache == 'warm')
+            print(f'{tool} {format_size(size)}: {result["wall"]:.2f}s', flush=True)
+            record['results'].append(result)
+
+    print()
+    regressions = report(record['results'], baseline(history, record['host'], args.cache, args.baseline_runs),
+                         args.threshold, args.min_delta)
+    if regressions:
+        print(f'\n{len(regressions)} regressions above {args.threshold:g}%')
+    if not args.no_record:
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        print(f'Results appended to {args.history}')
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,222 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Changepoint detection for TPS level shifts.
+#
+# We segment a series into pieces of constant mean with binary
+# segmentation. The cost of a segment is its sum of squared deviations from
+# its own mean, which two cumulative sums give in O(1) for any segment, so
+# the best split of a segment is one vectorized pass over its candidate
+# split points. A segment is split while that lowers the total cost by more
+# than the penalty. Searching a segment costs its length, so the whole
+# search is O(n) per detected changepoint: O(n log n) when the splits are
+# balanced, up to O(n^2) when every split cuts a sliver off the end.
+#
+# The penalty per changepoint is the BIC style 2 * sigma^2 * log(n). sysbench
+# intervals are autocorrelated, and the mean of a stretch of correlated
+# intervals wanders much more than independent noise of the same variance
+# would, so sigma^2 is the long-run variance of the noise: the variance of
+# the residuals around block medians, so that level shifts do not inflate
+# it, scaled by (1 + rho) / (1 - rho) for the lag-1 autocorrelation rho of
+# the noise. Adjacent segments whose means differ by less than a minimum
+# relative shift are merged afterwards, closest pair first, with a heap of
+# the gaps between neighbouring segments.
+
+import heapq
+import json
+import numpy as np
+from matplotlib import patheffects
+
+MIN_SEGMENT = 60
+MIN_SHIFT = 2.0
+# Residuals for the noise estimate are taken around medians of blocks this
+# long, short enough that few blocks straddle a level shift
+NOISE_BLOCK = 30
+MAX_AUTOCORRELATION = 0.99
+
+
+def add_changepoint_arguments(parser):
+    parser.add_argument('--changepoints', action='store_true', help='Detect TPS level shifts and annotate the segments on the plot')
+    parser.add_argument('--changepoint-json', type=str, default=None, metavar='JSON', help='Also write the detected segments to this JSON file')
+    parser.add_argument('--changepoint-penalty', type=float, default=1.0, help='Multiplier of the per-changepoint penalty, higher finds fewer changes (default: 1)')
+    parser.add_argument('--min-segment', type=int, default=MIN_SEGMENT, help=f'Shortest segment in seconds (default: {MIN_SEGMENT})')
+    parser.add_argument('--min-shift', type=float, default=MIN_SHIFT, help=f'Merge adjacent segments whose mean TPS differs by less than this percentage (default: {MIN_SHIFT})')
+
+
+def _mad_variance(values):
+    """Variance of normal noise from the median absolute deviation."""
+    return (np.median(np.abs(values - np.median(values))) / 0.6745) ** 2
+
+
+def noise_variance(values, block=NOISE_BLOCK):
+    """Robust long-run variance of the noise around the level of values."""
+    values = np.asarray(values, dtype=np.float64)
+    blocks = len(values) // block
+    if blocks < 2:
+        return 0.0
+    shaped = values[:blocks * block].reshape(blocks, block)
+    variance = _mad_variance((shaped - np.median(shaped, axis=1, keepdims=True)).ravel())
+    if variance == 0:
+        return 0.0
+    # Adjacent differences have variance 2 sigma^2 (1 - rho)
+    rho = 1 - _mad_variance(np.diff(values)) / (2 * variance)
+    rho = min(max(rho, 0.0), MAX_AUTOCORRELATION)
+    return variance * (1 + rho) / (1 - rho)
+
+
+def segment_cost(s1, s2, start, end):
+    """Sum of squared deviations from the mean of values[start:end], from
+    the cumulative sums of the values and of their squares. start and end
+    may be arrays."""
+    seg = s1[end] - s1[start]
+    return (s2[end] - s2[start]) - seg * seg / (end - start)
+
+
+def binary_segmentation(values, penalty, min_size=2):
+    """Split points of values under a mean-change cost. Returns the
+    segment end indices, the last one being len(values)."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    centered = values - values.mean() if n else values
+    s1 = np.concatenate([[0.0], np.cumsum(centered)])
+    s2 = np.concatenate([[0.0], np.cumsum(centered ** 2)])
+
+    ends = []
+    pending = [(0, n)]
+    while pending:
+        start, end = pending.pop()
+        if end - start < 2 * min_size:
+            ends.append(end)
+            continue
+        # Cost of every admissible split of this segment at once
+        splits = np.arange(start + min_size, end - min_size + 1)
+        cost = segment_cost(s1, s2, start, splits) + segment_cost(s1, s2, splits, end)
+        i = int(np.argmin(cost))
+        if segment_cost(s1, s2, start, end) - cost[i] > penalty:
+            pending.extend([(int(splits[i]), end), (start, int(splits[i]))])
+        else:
+            ends.append(end)
+    return sorted(ends)
+
+
+def _shift(sums, counts, left, right):
+    """Percent difference of the mean of segment right from segment left."""
+    a = sums[left] / counts[left]
+    b = sums[right] / counts[right]
+    if a == 0:
+        return 0.0 if b == 0 else float('inf')
+    return 100 * abs(b - a) / abs(a)
+
+
+def merge_segments(values, ends, min_shift):
+    """Merge adjacent segments whose means differ by less than min_shift
+    percent, closest pair first."""
+    if len(ends) < 2:
+        return list(ends)
+    s1 = np.concatenate([[0.0], np.cumsum(np.asarray(values, dtype=np.float64))])
+    bounds = np.concatenate([[0], ends])
+    # Segments as a linked list holding their sums and counts, a merge
+    # folds the right segment into the left one
+    sums = list(s1[bounds[1:]] - s1[bounds[:-1]])
+    counts = list(np.diff(bounds))
+    end = list(ends)
+    following = list(range(1, len(ends))) + [None]
+    previous = [None] + list(range(len(ends) - 1))
+    version = [0] * len(ends)
+    # (shift, left segment, versions of both when the shift was computed),
+    # ties go to the leftmost pair
+    heap = [(_shift(sums, counts, i, i + 1), i, 0, 0) for i in range(len(ends) - 1)]
+    heapq.heapify(heap)
+    while heap:
+        shift, left, left_version, right_version = heapq.heappop(heap)
+        right = following[left]
+        if version[left] != left_version or right is None or version[right] != right_version:
+            continue
+        if shift >= min_shift:
+            break
+        sums[left] += sums[right]
+        counts[left] += counts[right]
+        end[left] = end[right]
+        following[left] = following[right]
+        if following[right] is not None:
+            previous[following[right]] = left
+        version[left] += 1
+        version[right] = -1
+        for a in (previous[left], left):
+            if a is not None and following[a] is not None:
+                b = following[a]
+                heapq.heappush(heap, (_shift(sums, counts, a, b), a, version[a], version[b]))
+    return [end[i] for i in range(len(ends)) if version[i] >= 0]
+
+
+def detect_segments(times, values, min_segment=MIN_SEGMENT, min_shift=MIN_SHIFT, penalty_scale=1.0):
+    """Segment a TPS series into level shifts and describe each segment."""
+    times = np.asarray(times)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return []
+    interval = max(1, int(np.median(np.diff(times)))) if n > 1 else 1
+    min_size = max(2, int(round(min_segment / interval)))
+    penalty = penalty_scale * 2 * max(noise_variance(values), 1e-12) * np.log(n)
+    ends = merge_segments(values, binary_segmentation(values, penalty, min_size), min_shift)
+
+    segments = []
+    start = 0
+    for end in ends:
+        part = values[start:end]
+        segment = {
+            'start_time': int(times[start] - interval),
+            'end_time': int(times[end - 1]),
+            'duration': int(times[end - 1] - times[start] + interval),
+            'intervals': int(end - start),
+            'mean_tps': float(part.mean()),
+            'std_tps': float(part.std()),
+        }
+        if segments:
+            prev = segments[-1]['mean_tps']
+            segment['shift_pct'] = float(100 * (segment['mean_tps'] - prev) / prev) if prev else None
+        segments.append(segment)
+        start = end
+    return segments
+
+
+def format_duration(seconds):
+    if seconds >= 3600:
+        return f'{seconds / 3600:.1f}h'
+    if seconds >= 60:
+        return f'{seconds / 60:.0f}m'
+    return f'{seconds}s'
+
+
+def annotate_segments(ax, segments, color='C3', edge='w', time_factor=1, min_label=0.03):
+    """Draw each segment mean as a horizontal line labelled with its mean
+    TPS and duration, with a dotted line at every changepoint. Lines and
+    text are outlined in the edge color so they stand out of the markers.
+    Segments shorter than min_label of the run are left unlabelled so a
+    ramp split in many short steps stays readable."""
+    outline = [patheffects.withStroke(linewidth=4, foreground=edge)]
+    total = sum(segment['duration'] for segment in segments)
+    for i, segment in enumerate(segments):
+        x0 = segment['start_time'] / time_factor
+        x1 = segment['end_time'] / time_factor
+        ax.hlines(segment['mean_tps'], x0, x1, colors=color, linewidth=2, path_effects=outline)
+        if i:
+            ax.axvline(x0, color=color, linestyle=':', linewidth=1)
+        if segment['duration'] < min_label * total:
+            continue
+        ax.annotate(f'{segment["mean_tps"]:.0f} TPS\n{format_duration(segment["duration"])}',
+                    ((x0 + x1) / 2, segment['mean_tps']), xytext=(0, 6), textcoords='offset points',
+                    ha='center', va='bottom', fontsize=9, color=color, path_effects=outline)
+
+
+def print_segments(label, segments):
+    print(f'{label}: {len(segments)} segment(s)')
+    for segment in segments:
+        shift = f' ({segment["shift_pct"]:+.1f}%)' if segment.get('shift_pct') is not None else ''
+        print(f'  {segment["start_time"]:>7}s - {segment["end_time"]:>7}s  {format_duration(segment["duration"]):>6}  '
+              f'{segment["mean_tps"]:.2f} TPS{shift}')
+
+
+def write_segments(results, output):
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
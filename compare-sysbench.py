@@ -2,28 +2,53 @@
 
 import pandas as pd
 import matplotlib.pyplot as plt
-import re
 import argparse
-from concurrent.futures import ThreadPoolExecutor
-
-# Function to parse a line and extract time and TPS
-def parse_line(line):
-    match = re.search(r'\[\s*(\d+)s\s*\].*?tps:\s*([\d.]+)', line)
-    if match:
-        time_in_seconds = int(match.group(1))
-        tps = float(match.group(2))
-        return time_in_seconds, tps
-    return None
-
-# Function to read and parse sysbench output file
-def read_sysbench_output(file_path):
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
-
-    with ThreadPoolExecutor() as executor:
-        results = list(executor.map(parse_line, lines))
-
-    return [result for result in results if result is not None]
+import glob
+import os
+from ab_stats import add_significance_arguments, compare_runs, print_comparison, write_significance
+from changepoints import add_changepoint_arguments, annotate_segments, detect_segments, print_segments, write_segments
+from density_render import add_render_arguments, pixel_size, plot_density
+from downsample import add_downsample_arguments, downsample, pixel_width
+from series_cache import add_cache_arguments, handle_cache_arguments
+from spectrum import add_spectrum_arguments, analyze_spectrum, plot_spectrum, print_peaks, write_peaks
+from stage_timer import checkpoint
+from sysbench_parse import load_sysbench_many
+from time_axis import time_scale
+
+DEFAULT_FILES = ['sysbench_output_doublewrite.txt', 'sysbench_output_nodoublewrite.txt']
+DEFAULT_LEGENDS = ['innodb_doublewrite=ON', 'innodb_doublewrite=OFF']
+
+# Function to expand file, glob and directory arguments into a list of logs
+def expand_inputs(inputs, dir_pattern):
+    files = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            files.extend(sorted(glob.glob(os.path.join(entry, dir_pattern))))
+        elif glob.has_magic(entry):
+            files.extend(sorted(glob.glob(entry)))
+        else:
+            files.append(entry)
+    return files
+
+# Function to pick one label per run, falling back to the file name
+def run_labels(files, legends):
+    labels = []
+    for i, file_path in enumerate(files):
+        if i < len(legends) and legends[i]:
+            labels.append(legends[i])
+        else:
+            labels.append(os.path.splitext(os.path.basename(file_path))[0])
+    return labels
+
+# Function to pick one color per run, red and green for a plain A/B compare
+def run_colors(count):
+    if count <= 2:
+        return ['r', 'g'][:count]
+    if count <= 20:
+        cmap = plt.get_cmap('tab20')
+        return [cmap(i) for i in range(count)]
+    cmap = plt.get_cmap('turbo')
+    return [cmap(i / (count - 1)) for i in range(count)]
 
 # Function to list available matplotlib themes
 def list_themes():
@@ -34,13 +59,23 @@ def list_themes():
 # Main function
 def main():
     parser = argparse.ArgumentParser(description='Compare sysbench outputs.')
-    parser.add_argument('file1', type=str, nargs='?', default='sysbench_output_doublewrite.txt', help='First sysbench output file')
-    parser.add_argument('file2', type=str, nargs='?', default='sysbench_output_nodoublewrite.txt', help='Second sysbench output file')
-    parser.add_argument('--legend1', type=str, default='innodb_doublewrite=ON', help='Legend for the first file')
-    parser.add_argument('--legend2', type=str, default='innodb_doublewrite=OFF', help='Legend for the second file')
+    parser.add_argument('files', type=str, nargs='*', help='sysbench output files, globs or directories of logs (default: the doublewrite ON/OFF sample logs)')
+    parser.add_argument('--legend', type=str, action='append', default=[], help='Legend for the next run, repeat once per run in order')
+    parser.add_argument('--legend1', type=str, default=None, help='Legend for the first file')
+    parser.add_argument('--legend2', type=str, default=None, help='Legend for the second file')
+    parser.add_argument('--dir-pattern', type=str, default='*.txt', help='Glob used to pick logs out of a directory argument (default: *.txt)')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of parser processes (default: number of CPUs)')
+    parser.add_argument('--output', type=str, default='a_vs_b.png', help='Output image file')
     parser.add_argument('--theme', type=str, default='dark_background', help='Matplotlib theme to use')
     parser.add_argument('--list-themes', action='store_true', help='List available matplotlib themes')
     parser.add_argument('--report-interval', type=int, default=1, help='Time interval in seconds for reporting')
+    parser.add_argument('--zoom-in', action='store_true', help='Start the y axis at the lowest TPS value instead of 0')
+    add_render_arguments(parser)
+    add_significance_arguments(parser)
+    add_changepoint_arguments(parser)
+    add_spectrum_arguments(parser)
+    add_downsample_arguments(parser)
+    add_cache_arguments(parser)
 
     args = parser.parse_args()
 
@@ -48,47 +83,111 @@ def main():
         list_themes()
         return
 
+    use_cache = handle_cache_arguments(args)
     plt.style.use(args.theme)
 
-    # Read and parse both sysbench output files
-    tps_data_1 = read_sysbench_output(args.file1)
-    tps_data_2 = read_sysbench_output(args.file2)
-
-    # Adjust time intervals based on the report interval
-    tps_data_1 = [(time * args.report_interval, tps) for time, tps in tps_data_1]
-    tps_data_2 = [(time * args.report_interval, tps) for time, tps in tps_data_2]
-
-    # Determine the maximum time value to decide if we need to use hours or seconds
-    max_time_in_seconds = max(max(tps_data_1, key=lambda x: x[0])[0], max(tps_data_2, key=lambda x: x[0])[0])
-    use_hours = max_time_in_seconds > 2 * 3600
-
-    # Convert times if necessary
-    if use_hours:
-        tps_data_1 = [(time / 3600, tps) for time, tps in tps_data_1]
-        tps_data_2 = [(time / 3600, tps) for time, tps in tps_data_2]
-        time_label = 'Time (hours)'
+    if args.files:
+        files = expand_inputs(args.files, args.dir_pattern)
+        legends = list(args.legend)
     else:
-        time_label = 'Time (seconds)'
+        files = DEFAULT_FILES
+        legends = args.legend or list(DEFAULT_LEGENDS)
+    if not files:
+        parser.error('no sysbench output files matched')
+    for i, legend in enumerate([args.legend1, args.legend2]):
+        if legend is not None:
+            legends.extend([None] * (i + 1 - len(legends)))
+            legends[i] = legend
+    labels = run_labels(files, legends)
+
+    # Read and parse all sysbench output files in parallel
+    runs = load_sysbench_many(files, max_workers=args.jobs, use_cache=use_cache)
+    checkpoint('parse')
+
+    if args.significance:
+        try:
+            results = [compare_runs(runs[0]['tps'], columns['tps'], labels[0], label,
+                                    resamples=args.resamples, block=args.block_length, max_workers=args.jobs)
+                       for columns, label in zip(runs[1:], labels[1:])]
+        except ValueError as e:
+            parser.error(str(e))
+        for result in results:
+            print_comparison(result)
+        write_significance(results, args.significance)
+        checkpoint('significance')
 
-    # Create pandas DataFrames
-    df1 = pd.DataFrame(tps_data_1, columns=[time_label, 'TPS'])
-    df2 = pd.DataFrame(tps_data_2, columns=[time_label, 'TPS'])
+    # Adjust time intervals based on the report interval
+    times = [columns['time'] * args.report_interval for columns in runs]
 
-    # Plot the TPS values
-    plt.figure(figsize=(30, 12))
+    # Convert times to hours for long runs
+    factor, time_label = time_scale(max(t.max() for t in times if len(t)))
+    times = [t / factor for t in times]
 
-    plt.plot(df1[time_label], df1['TPS'], 'ro', markersize=2, label=args.legend1)
-    plt.plot(df2[time_label], df2['TPS'], 'go', markersize=2, label=args.legend2)
+    # Plot the TPS values, with the jitter spectrum to the right if asked for
+    if args.spectrum:
+        fig, (ax, spectrum_ax) = plt.subplots(1, 2, figsize=(40, 12), gridspec_kw={'width_ratios': [3, 1]})
+        plt.sca(ax)
+    else:
+        fig = plt.figure(figsize=(30, 12))
+    colors = run_colors(len(runs))
+
+    if args.render == 'density':
+        # Bin every interval into one image per run at the output resolution
+        tps_max = max(columns['tps'].max() for columns in runs if len(columns['tps']))
+        tps_min = min(columns['tps'].min() for columns in runs if len(columns['tps'])) if args.zoom_in else 0
+        t_min = min(t.min() for t in times if len(t))
+        t_max = max(t.max() for t in times if len(t))
+        series = [(t, columns['tps']) for t, columns in zip(times, runs)]
+        handles = plot_density(plt.gca(), series, colors, labels,
+                               (t_min, t_max, tps_min, tps_max * 1.02), pixel_size(fig))
+    else:
+        for t, columns, label, color in zip(times, runs, labels, colors):
+            # Downsample to what the output resolution can show
+            t, tps = downsample(t, columns['tps'], args.downsample, pixel_width(fig))
+            df = pd.DataFrame({time_label: t, 'TPS': tps})
+            checkpoint('dataframe')
+            plt.plot(df[time_label], df['TPS'], 'o', color=color, markersize=2, label=label)
+            checkpoint('render')
+        handles = None
+        if not args.zoom_in:
+            plt.ylim(0)
+
+    # Annotate the level shifts of every run
+    if args.changepoints or args.changepoint_json:
+        segments = {}
+        for columns, label, color in zip(runs, labels, colors):
+            segments[label] = detect_segments(columns['time'] * args.report_interval, columns['tps'], args.min_segment,
+                                              args.min_shift, args.changepoint_penalty)
+            print_segments(label, segments[label])
+            if args.changepoints:
+                annotate_segments(plt.gca(), segments[label], color, 'w', factor)
+        if args.changepoint_json:
+            write_segments(segments, args.changepoint_json)
 
     plt.title('Transactions Per Second (TPS) Over Time')
     plt.xlabel(time_label)
     plt.ylabel('TPS')
     plt.grid(True)
-    # Try plotting without this to zoom in
-    plt.ylim(0)
-    plt.legend()
+    plt.legend(handles=handles, markerscale=4 if handles is None else 1, ncol=max(1, len(runs) // 10))
+
+    # Overlay the jitter spectrum of every run
+    if args.spectrum or args.spectrum_json:
+        peaks = {}
+        for columns, label, color in zip(runs, labels, colors):
+            analysis = analyze_spectrum(columns['time'] * args.report_interval, columns['tps'],
+                                        args.spectrum_peaks, args.spectrum_segment)
+            peaks[label] = analysis['peaks']
+            print_peaks(label, analysis['peaks'], analysis['longest_period'])
+            if args.spectrum:
+                plot_spectrum(spectrum_ax, analysis, color, label)
+        if args.spectrum:
+            spectrum_ax.legend()
+        if args.spectrum_json:
+            write_peaks(peaks, args.spectrum_json)
     plt.tight_layout()
-    plt.savefig('a_vs_b.png')
+    checkpoint('render')
+    plt.savefig(args.output)
+    checkpoint('savefig')
     #plt.show()
 
 if __name__ == '__main__':
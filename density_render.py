@@ -0,0 +1,65 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Rasterized density rendering for overlaid time series.
+#
+# Overlaying several long runs as markers turns dense bands into a solid
+# blob and makes matplotlib manage one marker per interval. Instead we bin
+# each run's (time, value) points into a 2D histogram at the output
+# resolution and draw it as a single RGBA image: the run color with an
+# alpha that grows with the number of intervals falling into each pixel.
+# Images of several runs are alpha composited by matplotlib in draw order.
+
+import numpy as np
+from matplotlib.colors import to_rgb
+from matplotlib.lines import Line2D
+
+RENDER_MODES = ['markers', 'density']
+
+
+def add_render_arguments(parser):
+    parser.add_argument('--render', choices=RENDER_MODES, default='markers',
+                        help='Draw every interval as a marker, or bin intervals into one density image per run (default: markers)')
+
+
+def pixel_size(fig, pixels_per_bin=4):
+    """Histogram shape for a figure, one bin per pixels_per_bin pixels."""
+    return (int(round(fig.get_figwidth() * fig.dpi / pixels_per_bin)),
+            int(round(fig.get_figheight() * fig.dpi / pixels_per_bin)))
+
+
+def density_counts(x, y, extent, shape):
+    """Count points per bin. extent is (xmin, xmax, ymin, ymax) and shape
+    is (width, height) in bins. Returns a (height, width) array."""
+    xmin, xmax, ymin, ymax = extent
+    width, height = shape
+    xi = ((np.asarray(x) - xmin) * (width / max(xmax - xmin, 1e-12))).astype(np.int64)
+    yi = ((np.asarray(y) - ymin) * (height / max(ymax - ymin, 1e-12))).astype(np.int64)
+    np.clip(xi, 0, width - 1, out=xi)
+    np.clip(yi, 0, height - 1, out=yi)
+    counts = np.bincount(yi * width + xi, minlength=width * height)
+    return counts.reshape(height, width)
+
+
+def density_image(counts, color, max_alpha=0.9):
+    """Turn pixel counts into an RGBA image of a single color. Alpha is
+    log scaled so isolated outliers stay visible next to dense bands."""
+    image = np.zeros(counts.shape + (4,), dtype=np.float32)
+    image[..., :3] = to_rgb(color)
+    if counts.max() > 0:
+        level = np.log1p(counts) / np.log1p(counts.max())
+        image[..., 3] = np.where(counts > 0, 0.4 + 0.6 * level, 0) * max_alpha
+    return image
+
+
+def plot_density(ax, series, colors, labels, extent, shape):
+    """Draw one density image per (x, y) series and add legend handles."""
+    xmin, xmax, ymin, ymax = extent
+    handles = []
+    for (x, y), color, label in zip(series, colors, labels):
+        counts = density_counts(x, y, extent, shape)
+        ax.imshow(density_image(counts, color), origin='lower', aspect='auto',
+                  extent=(xmin, xmax, ymin, ymax), interpolation='nearest')
+        handles.append(Line2D([], [], linestyle='', marker='s', markersize=8, color=color, label=label))
+    ax.set_xlim(xmin, xmax)
+    ax.set_ylim(ymin, ymax)
+    return handles
@@ -0,0 +1,126 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Visual-preserving downsampling for long time series.
+#
+# A 30 inch wide figure saved at 100 dpi is 3000 pixels wide, so handing it
+# millions of markers only costs render time and PNG size without adding
+# anything visible. We reduce each series to what the output resolution can
+# show while keeping peaks and stalls:
+#
+#   minmax  split the x range into one bucket per pixel column and keep the
+#           minimum and maximum sample of each bucket, so every extreme that
+#           would have been drawn is still drawn
+#   lttb    Largest-Triangle-Three-Buckets, keeps one point per bucket picked
+#           to preserve the visual shape of the curve
+#   none    keep every sample
+#
+# All methods return indices into the input so callers can pick any number
+# of aligned columns. x must be sorted.
+#
+# Scatter plots have no sorted axis to bucket along, so they are thinned to
+# one sample per occupied cell of the pixel grid instead, whatever method
+# is picked other than none.
+
+import numpy as np
+
+METHODS = ['minmax', 'lttb', 'none']
+
+
+def add_downsample_arguments(parser):
+    parser.add_argument('--downsample', choices=METHODS, default='minmax',
+                        help='Downsampling used for time series plots, "none" plots every sample (default: minmax)')
+
+
+def pixel_width(fig):
+    """Width of the saved figure in pixels."""
+    return int(round(fig.get_figwidth() * fig.dpi))
+
+
+def _bucket_bounds(x, n_buckets):
+    # Equal-width buckets over the x range, as [start, end) index bounds
+    edges = np.linspace(x[0], x[-1], n_buckets + 1)
+    bounds = np.searchsorted(x, edges[1:-1], side='left')
+    return np.concatenate([[0], bounds, [len(x)]])
+
+
+def minmax_indices(x, y, n_buckets):
+    n = len(x)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    bounds = _bucket_bounds(x, n_buckets)
+    counts = np.diff(bounds)
+    starts = bounds[:-1][counts > 0]
+    counts = counts[counts > 0]
+    y = np.asarray(y)
+    bucket = np.repeat(np.arange(len(starts)), counts)
+    keep = []
+    for reduce in (np.minimum, np.maximum):
+        extreme = np.repeat(reduce.reduceat(y, starts), counts)
+        # First sample of each bucket that reaches the bucket extreme
+        hits = np.flatnonzero(y == extreme)
+        _, first = np.unique(bucket[hits], return_index=True)
+        keep.append(hits[first])
+    return np.unique(np.concatenate(keep))
+
+
+def lttb_indices(x, y, n_out):
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # First and last points are always kept, the rest of the samples are
+    # split into n_out - 2 buckets of equal count.
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = bounds[i], bounds[i + 1]
+        # Average of the next bucket, or the last point for the final bucket
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else n
+        next_start = end if i + 2 < len(bounds) else n - 1
+        cx = x[next_start:next_end].mean()
+        cy = y[next_start:next_end].mean()
+        area = np.abs((x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_indices(x, y, method, width):
+    """Return the indices to plot for a series drawn width pixels wide."""
+    if method == 'none' or len(x) == 0:
+        return np.arange(len(x))
+    if method == 'minmax':
+        return minmax_indices(x, y, width)
+    if method == 'lttb':
+        return lttb_indices(x, y, 2 * width)
+    raise ValueError(f'Unknown downsampling method: {method}')
+
+
+def downsample(x, y, method, width):
+    idx = downsample_indices(x, y, method, width)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+
+def scatter_indices(x, y, shape):
+    """Indices of the first sample in every occupied cell of a (width,
+    height) grid over the range of x and y."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    width, height = shape
+    xi = ((x - x.min()) * ((width - 1) / max(np.ptp(x), 1e-12))).astype(np.int64)
+    yi = ((y - y.min()) * ((height - 1) / max(np.ptp(y), 1e-12))).astype(np.int64)
+    _, first = np.unique(yi * width + xi, return_index=True)
+    return np.sort(first)
+
+
+def downsample_scatter(x, y, method, shape):
+    """Thin an unsorted (x, y) scatter to what a shape (width, height)
+    pixel area can show."""
+    if method == 'none' or len(x) == 0:
+        return np.asarray(x), np.asarray(y)
+    idx = scatter_indices(x, y, shape)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
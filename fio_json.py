@@ -0,0 +1,200 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Selective extraction from fio JSON output.
+#
+# fio --output-format=json+ writes per job latency percentile maps and full
+# latency histograms next to the few arrays a plot needs. json.load builds
+# Python objects for all of it, several times the size of the file. Here we
+# walk the memory mapped file instead and only materialize the requested
+# paths:
+#
+#   jobs[].steadystate.data.iops    every job's steady-state IOPS array
+#   jobs[].jobname                  every job's name
+#
+# '[]' matches any array element and results come back in document order.
+# The scanner only stops at brackets and strings, numbers and separators
+# are skipped by the regex engine, and subtrees no requested path can lead
+# into are skipped as a whole without returning to Python per key: a
+# container with nothing nested, such as a json+ histogram of thousands of
+# bins, by a find of its closing bracket, others by one regex match per
+# bracket. A numeric array is converted by NumPy straight from the mapped
+# bytes.
+
+import json
+import mmap
+import re
+import warnings
+import numpy as np
+
+# The next character that changes the structure: a bracket or a string
+STRUCTURE_RE = re.compile(rb'[{}\[\]"]')
+STRING_END_RE = re.compile(rb'(?:[^"\\]|\\.)*"')
+# Everything up to the next bracket outside a string, whole strings included,
+# so skipping a histogram of thousands of keys is one match and not one per key
+SKIP_RUN_RE = re.compile(rb'(?:[^{}\[\]"]+|"(?:[^"\\]|\\.)*")*')
+KEY_SEPARATOR_RE = re.compile(rb'\s*:')
+VALUE_START_RE = re.compile(rb'\S')
+SCALAR_END_RE = re.compile(rb'[,}\]\s]')
+
+
+def parse_path(path):
+    """'jobs[].steadystate.data.iops' -> ('jobs', '[]', 'steadystate', 'data', 'iops')"""
+    parts = []
+    for part in path.split('.'):
+        while part.endswith('[]'):
+            part = part[:-2]
+            if part:
+                parts.append(part)
+            parts.append('[]')
+            part = ''
+        if part:
+            parts.append(part)
+    return tuple(parts)
+
+
+def _flat_array_end(buf, start):
+    """Position just past the array opening at start if it holds no nested
+    containers or strings, None otherwise."""
+    end = buf.find(b']', start)
+    if end < 0:
+        raise ValueError('truncated JSON')
+    for char in (b'[', b'{', b'"'):
+        if buf.find(char, start + 1, end) >= 0:
+            return None
+    return end + 1
+
+
+def _flat_end(buf, start):
+    """Position just past the container opening at start if it holds no
+    nested containers and no escapes, None otherwise. A histogram or
+    percentile map is skipped by a few scans in C then."""
+    close = buf.find(b'}' if buf[start] == 0x7b else b']', start + 1)
+    if close < 0:
+        raise ValueError('truncated JSON')
+    body = buf[start + 1:close]
+    # An odd number of quotes means the bracket found is inside a string
+    if b'{' in body or b'[' in body or b'\\' in body or body.count(b'"') % 2:
+        return None
+    return close + 1
+
+
+def _skip(buf, pos):
+    """Position just past the object or array opening at pos."""
+    depth = 0
+    while True:
+        # The run stops at a bracket, or at the end or an unterminated string
+        if pos >= len(buf) or buf[pos] == 0x22:
+            raise ValueError('truncated JSON')
+        end = _flat_end(buf, pos) if buf[pos] in b'{[' else None
+        if end is not None:
+            pos = end
+        else:
+            depth += 1 if buf[pos] in b'{[' else -1
+            pos += 1
+        if depth == 0:
+            return pos
+        pos = SKIP_RUN_RE.match(buf, pos).end()
+
+
+def _array(buf, start):
+    """Decode the array opening at start, numeric arrays as float64 NumPy
+    arrays. Returns the value and the position past it."""
+    end = _flat_array_end(buf, start)
+    if end is not None:
+        body = buf[start + 1:end - 1]
+        if not body.strip():
+            return np.empty(0), end
+        # fromstring warns and stops at the first thing that is not a number
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            try:
+                return np.fromstring(body, dtype=np.float64, sep=','), end
+            except (DeprecationWarning, ValueError):
+                pass
+    else:
+        end = _skip(buf, start)
+    return json.loads(buf[start:end]), end
+
+
+def _value(buf, pos):
+    """Decode the value starting at pos, used for wanted non-array paths."""
+    start = VALUE_START_RE.search(buf, pos).start()
+    char = buf[start]
+    if char == 0x5b:  # '['
+        return _array(buf, start)
+    if char == 0x7b:  # '{'
+        end = _skip(buf, start)
+    elif char == 0x22:
+        end = STRING_END_RE.match(buf, start + 1).end()
+    else:
+        end = SCALAR_END_RE.search(buf, start).start()
+    return json.loads(buf[start:end]), end
+
+
+def extract_buffer(buf, paths):
+    """Return {path: [values in document order]} for the requested paths."""
+    wanted = {parse_path(path): path for path in paths}
+    prefixes = {p[:i] for p in wanted for i in range(len(p) + 1)}
+    results = {path: [] for path in paths}
+    # Each open container: (is_object, path of the container)
+    stack = []
+    key = None
+    pos = 0
+    while True:
+        match = STRUCTURE_RE.search(buf, pos)
+        if not match:
+            break
+        start = match.start()
+        char = buf[start]
+        in_object = bool(stack) and stack[-1][0]
+        if char == 0x22:
+            end = STRING_END_RE.match(buf, start + 1).end()
+            separator = KEY_SEPARATOR_RE.match(buf, end) if in_object else None
+            pos = end
+            if separator:
+                key = buf[start + 1:end - 1].decode()
+                path = stack[-1][1] + (key,)
+                if path in wanted:
+                    value, pos = _value(buf, separator.end())
+                    results[wanted[path]].append(value)
+                elif path not in prefixes:
+                    # Leave the value to the scan, or skip it if it is a container
+                    nxt = VALUE_START_RE.search(buf, separator.end())
+                    if nxt and buf[nxt.start()] in b'{[':
+                        pos = _skip(buf, nxt.start())
+                    else:
+                        pos = separator.end()
+            continue
+        if char in b'{[':
+            if not stack:
+                path = ()
+            else:
+                path = stack[-1][1] + ((key,) if in_object else ('[]',))
+            if stack and path in wanted:
+                value, pos = _value(buf, start)
+                results[wanted[path]].append(value)
+                continue
+            if path not in prefixes:
+                pos = _skip(buf, start)
+                continue
+            stack.append((char == 0x7b, path))
+            key = None
+        else:
+            stack.pop()
+        pos = start + 1
+    return results
+
+
+def extract_paths(file_path, paths):
+    """Extract the requested paths of a fio JSON output without loading the
+    rest of it."""
+    with open(file_path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return {path: [] for path in paths}
+        try:
+            return extract_buffer(buf, paths)
+        finally:
+            buf.close()
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+
+import argparse
+import os
+from synthetic import write_fio_ss_json, write_sysbench_log
+
+# Function to parse a count such as 1e6 or 250000
+def parse_count(value):
+    try:
+        count = int(float(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid count: {value}')
+    if count < 1:
+        raise argparse.ArgumentTypeError(f'invalid count: {value}')
+    return count
+
+# Function to write a synthetic sysbench log
+def generate_sysbench(args):
+    count = write_sysbench_log(args.output, args.intervals * args.interval, args.threads, args.interval, seed=args.seed,
+                               warmup=args.warmup, dip_period=args.dip_period)
+    print(f'Wrote {count} intervals to {args.output}')
+
+# Function to write synthetic ss_iops.json and ss_bw.json into a directory
+def generate_fio_ss(args):
+    os.makedirs(args.output, exist_ok=True)
+    for kind in args.kind:
+        path = os.path.join(args.output, f'ss_{kind}.json')
+        count = write_fio_ss_json(path, args.intervals, kind, seed=args.seed, level=args.iops)
+        print(f'Wrote {count} entries per job to {path}')
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic sysbench logs and fio steady-state JSON outputs.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sysbench = subparsers.add_parser('sysbench', help='Write a synthetic sysbench log')
+    sysbench.add_argument('output', type=str, help='Output file')
+    sysbench.add_argument('--intervals', type=parse_count, default=21600, help='Number of interval lines, 1e6 style accepted (default: 21600)')
+    sysbench.add_argument('--interval', type=int, default=2, help='Report interval in seconds (default: 2)')
+    sysbench.add_argument('--threads', type=int, default=128, help='sysbench threads (default: 128)')
+    sysbench.add_argument('--warmup', type=int, default=0, help='Warm-up ramp in seconds (default: 0)')
+    sysbench.add_argument('--dip-period', type=int, default=0, help='Period in seconds of TPS dips (default: none)')
+    sysbench.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    sysbench.set_defaults(func=generate_sysbench)
+
+    fio_ss = subparsers.add_parser('fio-ss', help='Write synthetic fio steady-state JSON outputs')
+    fio_ss.add_argument('output', type=str, help='Output directory')
+    fio_ss.add_argument('--intervals', type=parse_count, default=240, help='Entries in each steadystate data array, 1e6 style accepted (default: 240)')
+    fio_ss.add_argument('--kind', choices=['iops', 'bw'], action='append', default=None, help='Output to write, may be repeated (default: iops and bw)')
+    fio_ss.add_argument('--iops', type=float, default=16000, help='Steady state IOPS (default: 16000)')
+    fio_ss.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    fio_ss.set_defaults(func=generate_fio_ss)
+
+    args = parser.parse_args()
+    if args.command == 'fio-ss' and not args.kind:
+        args.kind = ['iops', 'bw']
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Latency versus throughput from the sysbench interval columns.
+#
+# Every interval line carries the 95th percentile latency next to TPS. A
+# tail latency regression at unchanged throughput, or a TPS gain bought
+# with worse latency, only shows when both are looked at together. The
+# rolling Pearson correlation between the two comes from cumulative sums of
+# x, y, x^2, y^2 and xy, so every window of a run costs O(n) in total.
+
+import numpy as np
+from steady_state import rolling_sum
+
+
+def rolling_correlation(x, y, w):
+    """Pearson correlation of every window of w paired samples. Windows
+    where either series is constant are NaN."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) < w or w < 2:
+        return np.empty(0)
+    # Center first so the cumulative sums do not lose precision
+    x = x - x.mean()
+    y = y - y.mean()
+    sx, sy = rolling_sum(x, w), rolling_sum(y, w)
+    cov = rolling_sum(x * y, w) - sx * sy / w
+    var_x = rolling_sum(x * x, w) - sx * sx / w
+    var_y = rolling_sum(y * y, w) - sy * sy / w
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[(var_x <= 1e-12 * w) | (var_y <= 1e-12 * w)] = np.nan
+    return np.clip(corr, -1, 1)
+
+
+def correlation(x, y):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) < 2 or x.std() == 0 or y.std() == 0:
+        return np.nan
+    return float(np.corrcoef(x, y)[0, 1])
+
+
+def latency_summary(columns):
+    """Latency and throughput figures of one run."""
+    tps = columns['tps']
+    lat = columns['lat95']
+    return {
+        'tps_mean': float(tps.mean()),
+        'lat95_mean': float(lat.mean()),
+        'lat95_median': float(np.median(lat)),
+        'lat95_p99': float(np.percentile(lat, 99)),
+        'lat95_max': float(lat.max()),
+        'correlation': correlation(tps, lat),
+    }
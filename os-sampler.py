@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+
+import argparse
+import signal
+import time
+import numpy as np
+from os_sampler import OsSampler, derive_rates, load_samples
+
+# Function to record samples until the duration is over or we are told to stop
+def record(args):
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.append(signum))
+    devices = args.device or None
+    sampler = OsSampler(args.output, args.interval, args.proc_root, devices)
+    print(f'Sampling {len(sampler.fields)} counters from {args.proc_root} every {args.interval}s into {args.output}', flush=True)
+    try:
+        count = sampler.run(args.duration, stop=lambda: bool(stopping))
+    finally:
+        sampler.close()
+    print(f'{count} samples written to {args.output}')
+
+# Function to summarize a sample file
+def info(args):
+    header, columns = load_samples(args.file)
+    times = columns['time']
+    print(f'{args.file}: {len(times)} samples of {len(header["fields"])} counters every {header["interval"]}s '
+          f'from {header["proc_root"]} on {header["host"]}')
+    if len(times):
+        print(f'  {time.ctime(times[0])} to {time.ctime(times[-1])} ({times[-1] - times[0]:.0f}s)')
+    if len(times) < 2:
+        return
+    rates = derive_rates(header, columns)
+    print(f'  {"metric":<32} {"mean":>12} {"max":>12}')
+    for name, values in rates.items():
+        if name != 'time' and np.isfinite(values).any():
+            print(f'  {name:<32} {np.nanmean(values):>12.2f} {np.nanmax(values):>12.2f}')
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Sample /proc/stat, /proc/diskstats and /proc/pressure into a compact binary file.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='Append samples to a file until --duration or SIGTERM/SIGINT')
+    record_parser.add_argument('output', type=str, help='Sample file, appended to if it exists with the same counters, interval and proc root')
+    record_parser.add_argument('--interval', type=float, default=1.0, help='Seconds between samples (default: 1)')
+    record_parser.add_argument('--duration', type=float, default=None, help='Seconds to sample for (default: until stopped)')
+    record_parser.add_argument('--proc-root', type=str, default='/proc', help='Root of the proc tree to read (default: /proc)')
+    record_parser.add_argument('--device', type=str, action='append', default=[], help='Block device to sample, may be repeated (default: all but loop, ram and partitions)')
+    record_parser.set_defaults(func=record)
+
+    info_parser = subparsers.add_parser('info', help='Summarize a sample file')
+    info_parser.add_argument('file', type=str, help='Sample file')
+    info_parser.set_defaults(func=info)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Low overhead OS sampler.
+#
+# mysqlsh support.collect() in 0005-telemetry-mysql.sh gathers a lot, costs
+# a lot and is not aligned with the sysbench intervals. This samples the few
+# kernel counters that explain most TPS dips:
+#
+#   /proc/stat          CPU time by state, context switches, runnable and
+#                       blocked tasks
+#   /proc/diskstats     completed I/Os, sectors, busy time and queue time
+#                       of every selected block device
+#   /proc/pressure/*    cumulative CPU, I/O and memory stall time (PSI)
+#
+# Samples go to an append-only binary file. The file starts with MAGIC, a
+# little endian uint32 length and a JSON header naming the fields, padded
+# to 8 bytes. Every sample after it is one fixed size record of float64:
+# the wall clock time followed by one raw counter per field. Recording is a
+# few small reads and one write per interval, a crash loses at most the
+# record being written, and loading is a single np.fromfile().
+#
+# Rates are only derived when loading, from the deltas between consecutive
+# records. The /proc root is a parameter so a fake tree can stand in for
+# the real one.
+
+import json
+import os
+import re
+import struct
+import time
+import numpy as np
+
+MAGIC = b'PLOTSYSBENCH-OS\n'
+FORMAT_VERSION = 1
+SECTOR_SIZE = 512
+
+CPU_STATES = ['user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal']
+STAT_FIELDS = ['ctxt', 'procs_running', 'procs_blocked']
+# /proc/diskstats columns after major, minor and name
+DISK_FIELDS = {'reads': 0, 'read_sectors': 2, 'writes': 4, 'write_sectors': 6, 'io_ticks': 9, 'time_in_queue': 10}
+PRESSURE_RESOURCES = ['cpu', 'io', 'memory']
+
+# Devices not worth sampling by default: pseudo devices and partitions
+SKIP_DEVICE_RE = re.compile(r'^(loop|ram|zram|sr|fd)\d*|^(nvme\d+n\d+p|mmcblk\d+p)\d+$|^([shv]d[a-z]+|xvd[a-z]+)\d+$')
+
+
+def read_stat(proc_root):
+    values = {}
+    with open(os.path.join(proc_root, 'stat')) as f:
+        for line in f:
+            fields = line.split()
+            if fields[0] == 'cpu':
+                for state, value in zip(CPU_STATES, fields[1:]):
+                    values[f'cpu.{state}'] = float(value)
+            elif fields[0] in STAT_FIELDS:
+                values[f'stat.{fields[0]}'] = float(fields[1])
+    return values
+
+
+def read_diskstats(proc_root, devices=None):
+    values = {}
+    with open(os.path.join(proc_root, 'diskstats')) as f:
+        for line in f:
+            fields = line.split()
+            name = fields[2]
+            if devices is None and SKIP_DEVICE_RE.match(name):
+                continue
+            if devices is not None and name not in devices:
+                continue
+            stats = fields[3:]
+            for field, column in DISK_FIELDS.items():
+                values[f'disk.{name}.{field}'] = float(stats[column])
+    return values
+
+
+def read_pressure(proc_root):
+    """Cumulative stall time in microseconds. Kernels without PSI have no
+    /proc/pressure and contribute no fields."""
+    values = {}
+    for resource in PRESSURE_RESOURCES:
+        try:
+            with open(os.path.join(proc_root, 'pressure', resource)) as f:
+                for line in f:
+                    kind, *fields = line.split()
+                    total = dict(field.split('=') for field in fields)['total']
+                    values[f'psi.{resource}.{kind}'] = float(total)
+        except OSError:
+            continue
+    return values
+
+
+def read_counters(proc_root='/proc', devices=None):
+    values = read_stat(proc_root)
+    values.update(read_diskstats(proc_root, devices))
+    values.update(read_pressure(proc_root))
+    return values
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f'{f.name} is not an OS sample file')
+    length, = struct.unpack('<I', f.read(4))
+    header = json.loads(f.read(length))
+    header['data_offset'] = f.tell() + (-f.tell() % 8)
+    return header
+
+
+class OsSampler:
+    """Append samples of the /proc counters to path every interval seconds.
+    The fields are fixed by the first sample of a new file; appending to an
+    existing file requires the same fields, interval and /proc root."""
+
+    def __init__(self, path, interval=1.0, proc_root='/proc', devices=None):
+        self.path = path
+        self.interval = interval
+        self.proc_root = proc_root
+        self.devices = devices
+        first = read_counters(proc_root, devices)
+        self.fields = sorted(first)
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb') as f:
+                header = _read_header(f)
+            recorded = {'fields': self.fields, 'interval': self.interval, 'proc_root': self.proc_root}
+            different = [name for name, value in recorded.items() if header.get(name) != value]
+            if different:
+                raise ValueError(f'{path} was recorded with a different {", ".join(different)}, cannot append')
+        else:
+            self._write_header()
+        self.f = open(path, 'ab')
+
+    def _write_header(self):
+        header = json.dumps({
+            'version': FORMAT_VERSION,
+            'interval': self.interval,
+            'proc_root': self.proc_root,
+            'host': os.uname().nodename,
+            'fields': self.fields,
+        }).encode()
+        length = len(MAGIC) + 4 + len(header)
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(header)) + header + b'\0' * (-length % 8))
+
+    def sample(self):
+        now = time.time()
+        values = read_counters(self.proc_root, self.devices)
+        # A device that went away is recorded as NaN rather than shifting fields
+        record = np.array([now] + [values.get(field, np.nan) for field in self.fields], dtype='<f8')
+        self.f.write(record.tobytes())
+        self.f.flush()
+        return now
+
+    def run(self, duration=None, stop=None):
+        """Sample until duration seconds have passed or stop() is true, on a
+        fixed schedule so slow reads do not make the samples drift."""
+        start = time.monotonic()
+        count = 0
+        while True:
+            self.sample()
+            count += 1
+            if stop is not None and stop():
+                break
+            next_time = start + count * self.interval
+            if duration is not None and next_time - start > duration:
+                break
+            time.sleep(max(0.0, next_time - time.monotonic()))
+        return count
+
+    def close(self):
+        self.f.close()
+
+
+def load_samples(path):
+    """The header and {'time': ..., field: ...} raw counter columns of a
+    sample file, dropping a partially written last record."""
+    with open(path, 'rb') as f:
+        header = _read_header(f)
+    width = len(header['fields']) + 1
+    data = np.fromfile(path, dtype='<f8', offset=header['data_offset'])
+    data = data[:len(data) // width * width].reshape(-1, width)
+    columns = {'time': data[:, 0]}
+    for i, field in enumerate(header['fields']):
+        columns[field] = data[:, i + 1]
+    return header, columns
+
+
+def sample_devices(fields):
+    return list(dict.fromkeys(field.split('.')[1] for field in fields if field.startswith('disk.')))
+
+
+def _delta(values):
+    delta = np.diff(values)
+    # Counters only go back when they wrap or the device was reset
+    delta[delta < 0] = np.nan
+    return delta
+
+
+def derive_rates(header, columns):
+    """Per interval rates between consecutive samples, stamped with the end
+    of each interval:
+
+      cpu.busy, cpu.iowait, cpu.steal   percent of CPU time
+      stat.ctxt                         context switches per second
+      stat.procs_running/blocked        tasks at the end of the interval
+      disk.<dev>.util                   percent of time with I/O in flight
+      disk.<dev>.read_iops/write_iops   completed I/Os per second
+      disk.<dev>.read_mbs/write_mbs     MB/s
+      disk.<dev>.queue                  average requests in flight
+      psi.<resource>.some/full          percent of time stalled
+    """
+    time_ = columns['time']
+    dt = np.diff(time_)
+    dt[dt <= 0] = np.nan
+    rates = {'time': time_[1:]}
+    fields = header['fields']
+    if 'cpu.idle' in columns:
+        cpu = {state: _delta(columns[f'cpu.{state}']) for state in CPU_STATES if f'cpu.{state}' in columns}
+        total = sum(cpu.values())
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates['cpu.busy'] = 100 * (total - cpu['idle'] - cpu.get('iowait', 0)) / total
+            rates['cpu.iowait'] = 100 * cpu.get('iowait', np.zeros_like(total)) / total
+            rates['cpu.steal'] = 100 * cpu.get('steal', np.zeros_like(total)) / total
+    if 'stat.ctxt' in columns:
+        rates['stat.ctxt'] = _delta(columns['stat.ctxt']) / dt
+    for gauge in ('stat.procs_running', 'stat.procs_blocked'):
+        if gauge in columns:
+            rates[gauge] = columns[gauge][1:]
+    for device in sample_devices(fields):
+        prefix = f'disk.{device}'
+        rates[f'{prefix}.util'] = np.minimum(100.0, 100 * _delta(columns[f'{prefix}.io_ticks']) / (1000 * dt))
+        rates[f'{prefix}.read_iops'] = _delta(columns[f'{prefix}.reads']) / dt
+        rates[f'{prefix}.write_iops'] = _delta(columns[f'{prefix}.writes']) / dt
+        rates[f'{prefix}.read_mbs'] = _delta(columns[f'{prefix}.read_sectors']) * SECTOR_SIZE / 1e6 / dt
+        rates[f'{prefix}.write_mbs'] = _delta(columns[f'{prefix}.write_sectors']) * SECTOR_SIZE / 1e6 / dt
+        rates[f'{prefix}.queue'] = _delta(columns[f'{prefix}.time_in_queue']) / (1000 * dt)
+    for field in fields:
+        if field.startswith('psi.'):
+            rates[field] = np.minimum(100.0, 100 * _delta(columns[field]) / (1e6 * dt))
+    return rates
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+
+import argparse
+import matplotlib.pyplot as plt
+import numpy as np
+from density_render import add_render_arguments, pixel_size, plot_density
+from downsample import add_downsample_arguments, downsample, downsample_scatter, pixel_width
+from latency_tps import latency_summary, rolling_correlation
+from series_cache import add_cache_arguments, handle_cache_arguments
+from sysbench_parse import load_sysbench_many
+from time_axis import time_scale
+
+# Function to print the latency summary of a run
+def print_summary(label, summary):
+    print(f'{label}:')
+    print(f'  Mean TPS: {summary["tps_mean"]:.2f}')
+    print(f'  95th percentile latency (ms): mean {summary["lat95_mean"]:.2f}, median {summary["lat95_median"]:.2f}, '
+          f'p99 {summary["lat95_p99"]:.2f}, max {summary["lat95_max"]:.2f}')
+    print(f'  Correlation of TPS and latency: {summary["correlation"]:.3f}\n')
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Plot sysbench 95th percentile latency against TPS.')
+    parser.add_argument('files', type=str, nargs='*', default=['sysbench_output.txt'], help='sysbench output files (default: sysbench_output.txt)')
+    parser.add_argument('--legend', type=str, action='append', default=[], help='Legend for the next run, repeat once per run in order')
+    parser.add_argument('--output', type=str, default='latency_vs_tps.png', help='Output image file')
+    parser.add_argument('--corr-window', type=int, default=600, help='Rolling correlation window in seconds (default: 600)')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of parser processes (default: number of CPUs)')
+    parser.add_argument('--theme', type=str, default='default', help='Matplotlib theme to use')
+    add_render_arguments(parser)
+    add_downsample_arguments(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    use_cache = handle_cache_arguments(args)
+    plt.style.use(args.theme)
+    labels = [args.legend[i] if i < len(args.legend) else file_path for i, file_path in enumerate(args.files)]
+    colors = [f'C{i % 10}' for i in range(len(args.files))]
+    runs = load_sysbench_many(args.files, max_workers=args.jobs, use_cache=use_cache)
+
+    factor, time_label = time_scale(max(columns['time'].max() for columns in runs if len(columns['time'])))
+
+    # TPS, latency and their rolling correlation share the time axis on the
+    # left, the latency versus TPS view takes the right column.
+    fig = plt.figure(figsize=(30, 15))
+    grid = fig.add_gridspec(3, 2, width_ratios=[2, 1], height_ratios=[2, 2, 1])
+    tps_ax = fig.add_subplot(grid[0, 0])
+    lat_ax = fig.add_subplot(grid[1, 0], sharex=tps_ax)
+    corr_ax = fig.add_subplot(grid[2, 0], sharex=tps_ax)
+    scatter_ax = fig.add_subplot(grid[:, 1])
+    width = pixel_width(fig) * 2 // 3
+
+    for columns, label, color in zip(runs, labels, colors):
+        summary = latency_summary(columns)
+        print_summary(label, summary)
+        times = columns['time'] / factor
+        t, tps = downsample(times, columns['tps'], args.downsample, width)
+        tps_ax.plot(t, tps, 'o', color=color, markersize=2, label=label)
+        t, lat = downsample(times, columns['lat95'], args.downsample, width)
+        lat_ax.plot(t, lat, 'o', color=color, markersize=2, label=label)
+
+        interval = max(1, int(np.median(np.diff(columns['time'])))) if len(columns['time']) > 1 else 1
+        w = max(2, args.corr_window // interval)
+        corr = rolling_correlation(columns['tps'], columns['lat95'], w)
+        if len(corr):
+            # Each window is drawn at its end, when its value is known,
+            # windows where either series is constant have none
+            known = np.isfinite(corr)
+            t, corr = downsample(times[w - 1:][known], corr[known], args.downsample, width)
+            corr_ax.plot(t, corr, '-', color=color, linewidth=1,
+                         label=f'{label} (overall {summary["correlation"]:.2f})')
+
+    # Latency versus TPS, as markers or as one density image per run
+    if args.render == 'density':
+        tps_all = np.concatenate([columns['tps'] for columns in runs])
+        lat_all = np.concatenate([columns['lat95'] for columns in runs])
+        lat_pad = 0.02 * (lat_all.max() - lat_all.min() or 1)
+        extent = (tps_all.min(), tps_all.max(), lat_all.min() - lat_pad, lat_all.max() + lat_pad)
+        # The scatter takes a third of the figure width
+        fig_width, fig_height = pixel_size(fig)
+        handles = plot_density(scatter_ax, [(columns['tps'], columns['lat95']) for columns in runs],
+                               colors, labels, extent, (fig_width // 3, fig_height))
+        scatter_ax.legend(handles=handles)
+    else:
+        # One marker per pixel of the scatter is all that can show
+        fig_width, fig_height = pixel_size(fig, pixels_per_bin=1)
+        for columns, label, color in zip(runs, labels, colors):
+            tps, lat = downsample_scatter(columns['tps'], columns['lat95'], args.downsample, (fig_width // 3, fig_height))
+            scatter_ax.plot(tps, lat, 'o', color=color, markersize=1, alpha=0.3, label=label)
+        scatter_ax.legend(markerscale=6)
+
+    tps_ax.set_title('Transactions Per Second (TPS) Over Time')
+    tps_ax.set_ylabel('TPS')
+    tps_ax.set_ylim(0)
+    tps_ax.legend(loc='lower left', markerscale=4)
+    lat_ax.set_title('95th Percentile Latency Over Time')
+    lat_ax.set_ylabel('Latency (ms, 95%)')
+    lat_ax.set_ylim(0)
+    corr_ax.set_title(f'Rolling Correlation of TPS and Latency ({args.corr_window}s window)')
+    corr_ax.set_ylabel('Pearson r')
+    corr_ax.set_xlabel(time_label)
+    corr_ax.set_ylim(-1, 1)
+    corr_ax.axhline(0, color='grey', linewidth=0.5)
+    corr_ax.legend(loc='lower left')
+    scatter_ax.set_title('Latency vs TPS')
+    scatter_ax.set_xlabel('TPS')
+    scatter_ax.set_ylabel('Latency (ms, 95%)')
+    for ax in (tps_ax, lat_ax, corr_ax, scatter_ax):
+        ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(args.output)
+    print(f'Latency plot saved to {args.output}')
+
+if __name__ == '__main__':
+    main()
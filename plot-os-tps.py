@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+
+import argparse
+import os
+import time
+from datetime import datetime
+import matplotlib.pyplot as plt
+import numpy as np
+from downsample import add_downsample_arguments, downsample, pixel_width
+from latency_tps import correlation
+from os_sampler import derive_rates, load_samples, sample_devices
+from series_cache import add_cache_arguments, handle_cache_arguments
+from sysbench_parse import load_sysbench
+from time_axis import time_scale
+
+# Function to parse a start time given as epoch seconds or an ISO 8601 date
+def parse_start(value):
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid start time: {value}')
+
+# Function to estimate when a sysbench run started. sysbench logs carry no
+# wall clock time, but the log was last written when the run ended.
+def log_start_time(file_path, times):
+    return os.path.getmtime(file_path) - float(times[-1])
+
+# Function to print the OS metrics that move most with TPS
+def print_correlations(tps_times, tps, rates, sample_times, count=8):
+    inside = (sample_times >= tps_times[0]) & (sample_times <= tps_times[-1])
+    if inside.sum() < 3:
+        print('Too few samples overlap the TPS series to correlate them')
+        return
+    found = []
+    for name, values in rates.items():
+        finite = inside & np.isfinite(values)
+        if name != 'time' and finite.sum() >= 3:
+            r = correlation(np.interp(sample_times[finite], tps_times, tps), values[finite])
+            if np.isfinite(r):
+                found.append((name, r))
+    found.sort(key=lambda item: -abs(item[1]))
+    print(f'Correlation of TPS with OS metrics over {inside.sum()} aligned samples:')
+    for name, r in found[:count]:
+        print(f'  {name:<32} {r:+.3f}')
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Plot OS samples from os-sampler.py aligned with sysbench TPS.')
+    parser.add_argument('samples', type=str, help='Sample file written by os-sampler.py record')
+    parser.add_argument('--tps', type=str, default=None, help='sysbench output file to align the samples with')
+    parser.add_argument('--tps-start', type=parse_start, default=None, help='Wall clock start of the sysbench run, epoch seconds or ISO 8601 (default: log modification time minus its duration)')
+    parser.add_argument('--offset', type=float, default=0.0, help='Seconds added to the sample times, to correct the alignment (default: 0)')
+    parser.add_argument('--device', type=str, action='append', default=[], help='Only plot this block device, may be repeated (default: all sampled devices)')
+    parser.add_argument('--output', type=str, default='os_vs_tps.png', help='Output image file')
+    parser.add_argument('--theme', type=str, default='default', help='Matplotlib theme to use')
+    add_downsample_arguments(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    use_cache = handle_cache_arguments(args)
+    plt.style.use(args.theme)
+    header, columns = load_samples(args.samples)
+    if len(columns['time']) < 2:
+        parser.error(f'{args.samples} holds fewer than two samples')
+    rates = derive_rates(header, columns)
+    devices = args.device or sample_devices(header['fields'])
+
+    # Put the samples on the time axis of the TPS series
+    tps_columns = None
+    start = columns['time'][0]
+    if args.tps:
+        tps_columns = load_sysbench(args.tps, use_cache)
+        start = args.tps_start if args.tps_start is not None else log_start_time(args.tps, tps_columns['time'])
+        print(f'Aligning samples with a run started at {time.ctime(start)}')
+    sample_times = rates['time'] - start + args.offset
+    last = max(sample_times[-1], tps_columns['time'][-1] if tps_columns is not None else 0)
+    factor, time_label = time_scale(last)
+
+    panels = ['cpu', 'disk']
+    if any(name.startswith('psi.') for name in rates):
+        panels.append('psi')
+    if tps_columns is not None:
+        panels.insert(0, 'tps')
+    fig, axes = plt.subplots(len(panels), 1, figsize=(30, 5 * len(panels)), sharex=True, squeeze=False)
+    axes = dict(zip(panels, axes[:, 0]))
+    width = pixel_width(fig)
+
+    def plot(ax, values, label, style='-', **kwargs):
+        t, v = downsample(sample_times / factor, values, args.downsample, width)
+        ax.plot(t, v, style, label=label, linewidth=1, **kwargs)
+
+    if tps_columns is not None:
+        t, tps = downsample(tps_columns['time'] / factor, tps_columns['tps'], args.downsample, width)
+        axes['tps'].plot(t, tps, 'o', markersize=2, label=os.path.basename(args.tps))
+        axes['tps'].set_title('Transactions Per Second (TPS) Over Time')
+        axes['tps'].set_ylabel('TPS')
+        axes['tps'].set_ylim(0)
+
+    ax = axes['cpu']
+    for name, label in (('cpu.busy', 'CPU busy'), ('cpu.iowait', 'CPU iowait'), ('cpu.steal', 'CPU steal')):
+        if name in rates:
+            plot(ax, rates[name], label)
+    if 'stat.procs_blocked' in rates:
+        blocked_ax = ax.twinx()
+        t, v = downsample(sample_times / factor, rates['stat.procs_blocked'], args.downsample, width)
+        blocked_ax.plot(t, v, ':', color='grey', linewidth=1, label='Tasks blocked on I/O')
+        blocked_ax.set_ylabel('Tasks')
+        blocked_ax.set_ylim(0)
+        blocked_ax.legend(loc='upper right')
+    ax.set_title('CPU')
+    ax.set_ylabel('Percent of CPU time')
+    ax.set_ylim(0, 100)
+
+    ax = axes['disk']
+    for device in devices:
+        if f'disk.{device}.util' in rates:
+            plot(ax, rates[f'disk.{device}.util'], f'{device} utilization')
+    ax.set_title('Block devices')
+    ax.set_ylabel('Percent of time busy')
+    ax.set_ylim(0, 105)
+
+    if 'psi' in axes:
+        ax = axes['psi']
+        for i, resource in enumerate(('cpu', 'io', 'memory')):
+            if f'psi.{resource}.some' in rates:
+                plot(ax, rates[f'psi.{resource}.some'], f'{resource} some', color=f'C{i}')
+            if f'psi.{resource}.full' in rates and np.nanmax(rates[f'psi.{resource}.full']) > 0:
+                plot(ax, rates[f'psi.{resource}.full'], f'{resource} full', '--', color=f'C{i}')
+        ax.set_title('Pressure stall information')
+        ax.set_ylabel('Percent of time stalled')
+        ax.set_ylim(0)
+
+    for ax in axes.values():
+        ax.grid(True)
+        ax.legend(loc='upper left', markerscale=4)
+    axes[panels[-1]].set_xlabel(time_label)
+    fig.tight_layout()
+    fig.savefig(args.output)
+    print(f'OS plot saved to {args.output}')
+
+    if tps_columns is not None:
+        print_correlations(tps_columns['time'].astype(np.float64), tps_columns['tps'], rates, sample_times)
+
+if __name__ == '__main__':
+    main()
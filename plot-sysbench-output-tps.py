@@ -1,53 +1,126 @@
 #!/usr/bin/python3
 
+import argparse
+import time
 import pandas as pd
 import matplotlib.pyplot as plt
-import re
-from concurrent.futures import ThreadPoolExecutor
-
-# Function to parse a line and extract time and TPS
-def parse_line(line):
-    match = re.search(r'\[\s*(\d+)s\s*\].*?tps:\s*([\d.]+)', line)
-    if match:
-        time_in_seconds = int(match.group(1))
-        tps = float(match.group(2))
-        return time_in_seconds, tps
-    return None
-
-# Read the sysbench output file
-with open('sysbench_output.txt', 'r') as file:
-    lines = file.readlines()
-
-# Use ThreadPoolExecutor to parse lines concurrently
-with ThreadPoolExecutor() as executor:
-    results = list(executor.map(parse_line, lines))
-
-# Filter out None results
-tps_data = [result for result in results if result is not None]
-
-# Determine if we need to use hours or seconds based on the maximum time value
-max_time_in_seconds = max(tps_data, key=lambda x: x[0])[0]
-use_hours = max_time_in_seconds > 2 * 3600
-
-# Convert times if necessary
-if use_hours:
-    tps_data = [(time / 3600, tps) for time, tps in tps_data]
-    time_label = 'Time (hours)'
+from changepoints import add_changepoint_arguments, annotate_segments, detect_segments, print_segments, write_segments
+from downsample import add_downsample_arguments, downsample, pixel_width
+from series_cache import add_cache_arguments, handle_cache_arguments
+from spectrum import add_spectrum_arguments, analyze_spectrum, plot_spectrum, print_peaks, write_peaks
+from stage_timer import checkpoint
+from sysbench_follow import SysbenchFollower
+from sysbench_parse import load_sysbench
+from time_axis import time_scale
+
+# Function to plot a finished sysbench output file
+def plot_tps(args, use_cache):
+    # Read and parse the sysbench output file
+    columns = load_sysbench(args.file, use_cache)
+    checkpoint('parse')
+    times = columns['time']
+    tps = columns['tps']
+
+    # Convert times if necessary
+    factor, time_label = time_scale(times.max())
+    times = times / factor
+
+    # Plot the TPS values, downsampled to what the output resolution can show
+    if args.spectrum:
+        fig, (ax, spectrum_ax) = plt.subplots(1, 2, figsize=(40, 12), gridspec_kw={'width_ratios': [3, 1]})
+        plt.sca(ax)
+    else:
+        fig = plt.figure(figsize=(30, 12))
+    times, tps = downsample(times, tps, args.downsample, pixel_width(fig))
+
+    # Create a pandas DataFrame
+    df = pd.DataFrame({time_label: times, 'TPS': tps})
+    checkpoint('dataframe')
+
+    plt.plot(df[time_label], df['TPS'], 'o', markersize=2)
+
+    # Annotate level shifts, detected on the full resolution series
+    if args.changepoints or args.changepoint_json:
+        segments = detect_segments(columns['time'], columns['tps'], args.min_segment, args.min_shift, args.changepoint_penalty)
+        print_segments(args.file, segments)
+        if args.changepoints:
+            annotate_segments(plt.gca(), segments, time_factor=factor)
+        if args.changepoint_json:
+            write_segments({args.file: segments}, args.changepoint_json)
+    plt.title('Transactions Per Second (TPS) Over Time')
+    plt.xlabel(time_label)
+    plt.ylabel('TPS')
+    plt.grid(True)
+    # Plot without this to zoom in
+    plt.ylim(0)
+
+    # Jitter spectrum of the full resolution series
+    if args.spectrum or args.spectrum_json:
+        analysis = analyze_spectrum(columns['time'], columns['tps'], args.spectrum_peaks, args.spectrum_segment)
+        print_peaks(args.file, analysis['peaks'], analysis['longest_period'])
+        if args.spectrum:
+            plot_spectrum(spectrum_ax, analysis, 'C0', args.file)
+        if args.spectrum_json:
+            write_peaks({args.file: analysis['peaks']}, args.spectrum_json)
+    plt.tight_layout()
+    checkpoint('render')
+    plt.savefig(args.output)
+    checkpoint('savefig')
+    #plt.show()
+
+# Function to follow a sysbench run in progress and refresh the plot.
+# Only newly appended bytes are parsed on each refresh, and the figure holds
+# a bounded number of points: the recent window at full resolution plus a
+# min/max decimated history of the whole run.
+def follow_tps(args):
+    follower = SysbenchFollower(args.file, window=args.window, history=args.history_points)
+
+    fig, ax = plt.subplots(figsize=(30, 12))
+    low_line, = ax.plot([], [], '-', linewidth=0.5, alpha=0.6, label='History (min)')
+    high_line, = ax.plot([], [], '-', linewidth=0.5, alpha=0.6, label='History (max)')
+    recent_line, = ax.plot([], [], 'o', markersize=2, label=f'Last {args.window} intervals')
+    ax.set_title('Transactions Per Second (TPS) Over Time (live)')
+    ax.set_ylabel('TPS')
+    ax.grid(True)
+    ax.legend(loc='lower left')
+
+    while True:
+        if follower.poll():
+            history = follower.history
+            factor, time_label = time_scale(follower.recent.get('time')[-1])
+            low_line.set_data(history.time / factor, history.low)
+            high_line.set_data(history.time / factor, history.high)
+            recent_times, recent_tps = downsample(follower.recent.get('time'), follower.recent.get('tps'), args.downsample, pixel_width(fig))
+            recent_line.set_data(recent_times / factor, recent_tps)
+            ax.set_xlabel(time_label)
+            ax.relim()
+            ax.autoscale_view()
+            ax.set_ylim(0)
+            fig.tight_layout()
+            fig.savefig(args.output)
+            print(f'{follower.total} intervals, last at {follower.recent.get("time")[-1]:.0f}s', flush=True)
+        if follower.finished:
+            break
+        time.sleep(args.refresh)
+
+parser = argparse.ArgumentParser(description='Plot sysbench TPS over time.')
+parser.add_argument('file', type=str, nargs='?', default='sysbench_output.txt', help='sysbench output file')
+parser.add_argument('--output', type=str, default='tps_over_time.png', help='Output image file')
+parser.add_argument('--follow', action='store_true', help='Follow a sysbench run in progress and refresh the output periodically')
+parser.add_argument('--refresh', type=float, default=10.0, help='Seconds between refreshes in --follow mode (default: 10)')
+parser.add_argument('--window', type=int, default=3600, help='Recent intervals kept at full resolution in --follow mode (default: 3600)')
+parser.add_argument('--history-points', type=int, default=4096, help='Decimated history buckets kept in --follow mode (default: 4096)')
+add_changepoint_arguments(parser)
+add_spectrum_arguments(parser)
+add_downsample_arguments(parser)
+add_cache_arguments(parser)
+args = parser.parse_args()
+use_cache = handle_cache_arguments(args)
+
+if args.follow:
+    try:
+        follow_tps(args)
+    except KeyboardInterrupt:
+        pass
 else:
-    time_label = 'Time (seconds)'
-
-# Create a pandas DataFrame
-df = pd.DataFrame(tps_data, columns=[time_label, 'TPS'])
-
-# Plot the TPS values
-plt.figure(figsize=(30, 12))
-plt.plot(df[time_label], df['TPS'], 'o', markersize=2)
-plt.title('Transactions Per Second (TPS) Over Time')
-plt.xlabel(time_label)
-plt.ylabel('TPS')
-plt.grid(True)
-# Plot without this to zoom in
-plt.ylim(0)
-plt.tight_layout()
-plt.savefig('tps_over_time.png')
-#plt.show()
+    plot_tps(args, use_cache)
@@ -1,99 +1,128 @@
 #!/usr/bin/python3
-import re
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 import argparse
 from scipy.stats import norm
+from ab_stats import add_significance_arguments, compare_runs, print_comparison, write_significance
+from binned_kde import kde_curves
+from streaming_stats import summarize_file_parallel
+from series_cache import add_cache_arguments, handle_cache_arguments
+from stage_timer import checkpoint
+from sysbench_parse import load_sysbench
 
-def extract_tps(filename):
-    tps_values = []
-    with open(filename, 'r') as file:
-        for line in file:
-            match = re.search(r'tps: (\d+\.\d+)', line)
-            if match:
-                tps_values.append(float(match.group(1)))
-    return tps_values
+def extract_tps(filename, use_cache=True):
+    return load_sysbench(filename, use_cache)['tps']
 
+# Compute the statistics every figure needs once per dataset, up front
 def analyze_tps(tps_values):
-    mean_tps = np.mean(tps_values)
-    median_tps = np.median(tps_values)
-    std_tps = np.std(tps_values)
-    variance_tps = np.var(tps_values)
-    return mean_tps, median_tps, std_tps, variance_tps
-
-def print_statistics(label, tps_values):
-    mean_tps, median_tps, std_tps, variance_tps = analyze_tps(tps_values)
+    tps_values = np.asarray(tps_values, dtype=np.float64)
+    return {
+        'count': len(tps_values),
+        'mean': tps_values.mean(),
+        'median': np.median(tps_values),
+        'std': tps_values.std(),
+        'variance': tps_values.var(),
+        'min': tps_values.min(),
+        'max': tps_values.max(),
+    }
+
+def print_statistics(label, stats):
     print(f'{label} Statistics:')
-    print(f'Mean TPS: {mean_tps:.2f}')
-    print(f'Median TPS: {median_tps:.2f}')
-    print(f'Standard Deviation of TPS: {std_tps:.2f}')
-    print(f'Variance of TPS: {variance_tps:.2f}\n')
-
-def plot_histograms(tps_values1, tps_values2, legend1, legend2, color1, color2):
+    print(f'Mean TPS: {stats["mean"]:.2f}')
+    print(f'Median TPS: {stats["median"]:.2f}')
+    print(f'Standard Deviation of TPS: {stats["std"]:.2f}')
+    print(f'Variance of TPS: {stats["variance"]:.2f}\n')
+
+# Add kernel density curves to the statistics bundles, evaluated on one
+# grid shared by both datasets with an FFT-based binned KDE
+def add_density(tps_values1, tps_values2, stats1, stats2, bw_method='scott'):
+    datasets = [tps_values1] if tps_values2 is None else [tps_values1, tps_values2]
+    grid, curves = kde_curves(datasets, bw_method)
+    for stats, curve in zip([stats1, stats2], curves):
+        stats['kde_grid'] = grid
+        stats['kde'] = curve
+
+# Print a constant-memory streaming summary of TPS and p95 latency
+def print_streaming_summary(label, file_path, max_workers=None):
+    summaries = summarize_file_parallel(file_path, max_workers=max_workers)
+    print(f'{label} Streaming Summary:')
+    for name, title in (('tps', 'TPS'), ('lat95', 'Latency 95th percentile (ms)')):
+        stats = summaries[name].as_dict()
+        print(f'{title}: mean {stats["mean"]:.2f} median {stats["median"]:.2f} '
+              f'std {stats["std"]:.2f} variance {stats["variance"]:.2f} '
+              f'p95 {stats["p95"]:.2f} p99 {stats["p99"]:.2f} '
+              f'min {stats["min"]:.2f} max {stats["max"]:.2f} ({stats["count"]} intervals)')
+    print()
+
+# TPS range covering both datasets, for shared histogram bins
+def tps_range(stats1, stats2):
+    if stats2 is None:
+        return stats1['min'], stats1['max']
+    return min(stats1['min'], stats2['min']), max(stats1['max'], stats2['max'])
+
+def plot_histograms(tps_values1, tps_values2, stats1, stats2, legend1, legend2, color1, color2):
     plt.figure(figsize=(20, 12))
-    bins = np.linspace(min(min(tps_values1), min(tps_values2)), max(max(tps_values1), max(tps_values2)), 30)
+    bins = np.linspace(*tps_range(stats1, stats2), 30)
     plt.hist(tps_values1, bins=bins, alpha=0.5, color=color1, edgecolor='black', label=legend1)
-    if tps_values2:
+    if tps_values2 is not None:
         plt.hist(tps_values2, bins=bins, alpha=0.5, color=color2, edgecolor='black', label=legend2)
     plt.title('Distribution of TPS Values')
     plt.xlabel('Transactions Per Second (TPS)')
     plt.ylabel('Frequency')
     plt.legend(loc='best')
     plt.grid(True)
-    plt.savefig('histogram.png')
-    plt.show()
 
-def plot_box_plots(tps_values1, tps_values2, legend1, legend2, color1, color2):
+def plot_box_plots(tps_values1, tps_values2, stats1, stats2, legend1, legend2, color1, color2):
     data = []
     labels = []
     data.append(tps_values1)
     labels.append(legend1)
-    if tps_values2:
+    if tps_values2 is not None:
         data.append(tps_values2)
         labels.append(legend2)
     plt.figure(figsize=(20, 12))
-    box = plt.boxplot(data, labels=labels, patch_artist=True)
+    box = plt.boxplot(data, patch_artist=True)
+    plt.xticks(range(1, len(labels) + 1), labels)
     colors = [color1, color2]
     for patch, color in zip(box['boxes'], colors):
         patch.set_facecolor(color)
     plt.title('Box Plot of TPS Values')
     plt.ylabel('Transactions Per Second (TPS)')
     plt.grid(True)
-    plt.savefig('box_plot.png')
-    plt.show()
 
-def plot_density_plots(tps_values1, tps_values2, legend1, legend2, color1, color2):
+def plot_density_plots(tps_values1, tps_values2, stats1, stats2, legend1, legend2, color1, color2):
     plt.figure(figsize=(20, 12))
-    sns.kdeplot(tps_values1, shade=True, label=legend1, color=color1)
-    if tps_values2:
-        sns.kdeplot(tps_values2, shade=True, label=legend2, color=color2)
+    plt.fill_between(stats1['kde_grid'], stats1['kde'], alpha=0.25, color=color1)
+    plt.plot(stats1['kde_grid'], stats1['kde'], label=legend1, color=color1)
+    if tps_values2 is not None:
+        plt.fill_between(stats2['kde_grid'], stats2['kde'], alpha=0.25, color=color2)
+        plt.plot(stats2['kde_grid'], stats2['kde'], label=legend2, color=color2)
     plt.title('Density Plot of TPS Values')
     plt.xlabel('Transactions Per Second (TPS)')
     plt.ylabel('Density')
     plt.legend(loc='best')
     plt.grid(True)
-    plt.savefig('density_plot.png')
-    plt.show()
 
-def plot_combined_hist_density(tps_values1, tps_values2, legend1, legend2, color1, color2):
+def plot_combined_hist_density(tps_values1, tps_values2, stats1, stats2, legend1, legend2, color1, color2):
     plt.figure(figsize=(20, 12))
-    bins = np.linspace(min(min(tps_values1), min(tps_values2)), max(max(tps_values1), max(tps_values2)), 30)
+    bins = np.linspace(*tps_range(stats1, stats2), 30)
     plt.hist(tps_values1, bins=bins, alpha=0.3, color=color1, edgecolor='black', label=f'Histogram {legend1}', density=True)
-    if tps_values2:
+    if tps_values2 is not None:
         plt.hist(tps_values2, bins=bins, alpha=0.3, color=color2, edgecolor='black', label=f'Histogram {legend2}', density=True)
-    sns.kdeplot(tps_values1, shade=False, label=f'Density {legend1}', color=color1)
-    if tps_values2:
-        sns.kdeplot(tps_values2, shade=False, label=f'Density {legend2}', color=color2)
+    plt.plot(stats1['kde_grid'], stats1['kde'], label=f'Density {legend1}', color=color1)
+    if tps_values2 is not None:
+        plt.plot(stats2['kde_grid'], stats2['kde'], label=f'Density {legend2}', color=color2)
 
-    mean1, std1 = np.mean(tps_values1), np.std(tps_values1)
+    mean1, std1 = stats1['mean'], stats1['std']
     ax2 = plt.gca().twinx()
     ax2.set_ylabel('Density')
     ax2.axvline(mean1, color=color1, linestyle='dotted', linewidth=2)
     ax2.axvline(mean1 - std1, color=color1, linestyle='dotted', linewidth=1)
     ax2.axvline(mean1 + std1, color=color1, linestyle='dotted', linewidth=1)
-    if tps_values2:
-        mean2, std2 = np.mean(tps_values2), np.std(tps_values2)
+    if tps_values2 is not None:
+        mean2, std2 = stats2['mean'], stats2['std']
         ax2.axvline(mean2, color=color2, linestyle='dotted', linewidth=2)
         ax2.axvline(mean2 - std2, color=color2, linestyle='dotted', linewidth=1)
         ax2.axvline(mean2 + std2, color=color2, linestyle='dotted', linewidth=1)
@@ -103,17 +132,15 @@ def plot_combined_hist_density(tps_values1, tps_values2, legend1, legend2, color
     plt.ylabel('Frequency/Density')
     plt.legend(loc='best')
     plt.grid(True)
-    plt.savefig('combined_hist_density.png')
-    plt.show()
 
-def plot_bell_curve(tps_values1, tps_values2, legend1, legend2, color1, color2):
+def plot_bell_curve(tps_values1, tps_values2, stats1, stats2, legend1, legend2, color1, color2):
     plt.figure(figsize=(20, 12))
-    mean1, std1 = np.mean(tps_values1), np.std(tps_values1)
+    mean1, std1 = stats1['mean'], stats1['std']
     x1 = np.linspace(mean1 - 3*std1, mean1 + 3*std1, 100)
     plt.plot(x1, norm.pdf(x1, mean1, std1) * 100, label=f'Bell Curve {legend1}', color=color1)  # Multiplying by 100 for percentage
 
-    if tps_values2:
-        mean2, std2 = np.mean(tps_values2), np.std(tps_values2)
+    if tps_values2 is not None:
+        mean2, std2 = stats2['mean'], stats2['std']
         x2 = np.linspace(mean2 - 3*std2, mean2 + 3*std2, 100)
         plt.plot(x2, norm.pdf(x2, mean2, std2) * 100, label=f'Bell Curve {legend2}', color=color2)  # Multiplying by 100 for percentage
 
@@ -122,15 +149,13 @@ def plot_bell_curve(tps_values1, tps_values2, legend1, legend2, color1, color2):
     plt.ylabel('Probability Density (%)')
     plt.legend(loc='best')
     plt.grid(True)
-    plt.savefig('bell_curve.png')
-    plt.show()
 
-def plot_combined_hist_bell_curve(tps_values1, tps_values2, legend1, legend2, color1, color2):
+def plot_combined_hist_bell_curve(tps_values1, tps_values2, stats1, stats2, legend1, legend2, color1, color2):
     fig, ax1 = plt.subplots(figsize=(20, 12))
 
-    bins = np.linspace(min(min(tps_values1), min(tps_values2)), max(max(tps_values1), max(tps_values2)), 30)
+    bins = np.linspace(*tps_range(stats1, stats2), 30)
     ax1.hist(tps_values1, bins=bins, alpha=0.5, color=color1, edgecolor='black', label=legend1)
-    if tps_values2:
+    if tps_values2 is not None:
         ax1.hist(tps_values2, bins=bins, alpha=0.5, color=color2, edgecolor='black', label=legend2)
 
     ax1.set_xlabel('Transactions Per Second (TPS)')
@@ -139,15 +164,15 @@ def plot_combined_hist_bell_curve(tps_values1, tps_values2, legend1, legend2, co
     ax1.grid(True)
 
     ax2 = ax1.twinx()
-    mean1, std1 = np.mean(tps_values1), np.std(tps_values1)
+    mean1, std1 = stats1['mean'], stats1['std']
     x1 = np.linspace(mean1 - 3*std1, mean1 + 3*std1, 100)
     ax2.plot(x1, norm.pdf(x1, mean1, std1) * 100, label=f'Bell Curve {legend1}', color=color1, linestyle='dashed')
     ax2.axvline(mean1, color=color1, linestyle='dotted', linewidth=2)
     ax2.axvline(mean1 - std1, color=color1, linestyle='dotted', linewidth=1)
     ax2.axvline(mean1 + std1, color=color1, linestyle='dotted', linewidth=1)
 
-    if tps_values2:
-        mean2, std2 = np.mean(tps_values2), np.std(tps_values2)
+    if tps_values2 is not None:
+        mean2, std2 = stats2['mean'], stats2['std']
         x2 = np.linspace(mean2 - 3*std2, mean2 + 3*std2, 100)
         ax2.plot(x2, norm.pdf(x2, mean2, std2) * 100, label=f'Bell Curve {legend2}', color=color2, linestyle='dashed')
         ax2.axvline(mean2, color=color2, linestyle='dotted', linewidth=2)
@@ -158,10 +183,15 @@ def plot_combined_hist_bell_curve(tps_values1, tps_values2, legend1, legend2, co
     ax2.legend(loc='upper center')
 
     plt.title('Combined Histogram and Bell Curve of TPS Values')
-    plt.savefig('combined_hist_bell_curve.png')
-    plt.show()
 
-def plot_variance_bars(variance1, variance2, legend1, legend2, color1, color2):
+def plot_variance_bars(tps_values1, tps_values2, stats1, stats2, legend1, legend2, color1, color2):
+    variance1 = stats1['variance']
+    if stats2 is not None:
+        variance2 = stats2['variance']
+    else:
+        # Use black for the second bar if there's only one dataset
+        variance2, legend2, color2 = 0, '', 'black'
+
     fig, ax1 = plt.subplots(figsize=(20, 12))
 
     labels = [legend1, legend2]
@@ -185,24 +215,23 @@ def plot_variance_bars(variance1, variance2, legend1, legend2, color1, color2):
     for bar, variance in zip(bars, variances):
         plt.plot(bar.get_x() + bar.get_width() / 2, variance, 'o', color='black')
 
-    plt.savefig('variance_bar.png')
-    plt.show()
 
-def plot_outliers(tps_values1, tps_values2, legend1, legend2, color1, color2):
+def plot_outliers(tps_values1, tps_values2, stats1, stats2, legend1, legend2, color1, color2):
     data = [tps_values1]
     labels = [legend1]
     colors = [color1]
 
-    if tps_values2:
+    if tps_values2 is not None:
         data.append(tps_values2)
         labels.append(legend2)
         colors.append(color2)
 
     fig, ax = plt.subplots(figsize=(20, 12))
-    box = ax.boxplot(data, labels=labels, patch_artist=True, showfliers=True,
+    box = ax.boxplot(data, patch_artist=True, showfliers=True,
                      whiskerprops=dict(color='white', linewidth=2),
                      capprops=dict(color='white', linewidth=2),
                      medianprops=dict(color='yellow', linewidth=2))
+    ax.set_xticks(range(1, len(labels) + 1), labels)
 
     # Color the boxes
     for patch, color in zip(box['boxes'], colors):
@@ -218,8 +247,36 @@ def plot_outliers(tps_values1, tps_values2, legend1, legend2, color1, color2):
     plt.title('Outliers in TPS Values')
     plt.ylabel('Transactions Per Second (TPS)')
     plt.grid(True)
-    plt.savefig('outliers_plot.png')
-    plt.show()
+
+# Figures we can produce, by output file name
+FIGURES = {
+    'histogram': plot_histograms,
+    'box_plot': plot_box_plots,
+    'density_plot': plot_density_plots,
+    'combined_hist_density': plot_combined_hist_density,
+    'bell_curve': plot_bell_curve,
+    'combined_hist_bell_curve': plot_combined_hist_bell_curve,
+    'variance_bar': plot_variance_bars,
+    'outliers_plot': plot_outliers,
+}
+
+# Function to make a batch worker headless, spawned workers import pyplot
+# afresh with the default backend
+def use_agg():
+    plt.switch_backend('Agg')
+
+# Render one figure and save it, this also runs in batch worker processes
+def render_figure(name, datasets, output_dir, show=False):
+    plt.style.use('dark_background')  # Set the dark theme
+    FIGURES[name](*datasets)
+    checkpoint('render')
+    output = os.path.join(output_dir, f'{name}.png')
+    plt.savefig(output)
+    checkpoint('savefig')
+    if show:
+        plt.show()
+    plt.close('all')
+    return output
 
 def main():
     parser = argparse.ArgumentParser(description='Analyze and compare TPS values from sysbench output files.')
@@ -229,34 +286,67 @@ def main():
     parser.add_argument('legend2', nargs='?', default=None, help='Legend for the second TPS file (optional)')
     parser.add_argument('--color1', default='cyan', help='Color for the first dataset (default: cyan)')
     parser.add_argument('--color2', default='orange', help='Color for the second dataset (default: orange)')
+    parser.add_argument('--batch', action='store_true', help='Render headlessly in parallel worker processes instead of showing each figure')
+    parser.add_argument('--figures', type=str, default=','.join(FIGURES), help=f'Comma separated figures to produce (default: all of {",".join(FIGURES)})')
+    parser.add_argument('--output-dir', type=str, default='.', help='Directory to write the figures to (default: .)')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of worker processes in --batch and --summary mode (default: number of CPUs)')
+    parser.add_argument('--kde-bw', choices=['scott', 'silverman'], default='scott', help='Bandwidth rule for the density curves (default: scott)')
+    parser.add_argument('--summary', action='store_true', help='Only print streaming statistics computed in one pass without loading the logs into memory, no plots')
+    add_significance_arguments(parser)
+    add_cache_arguments(parser)
 
     args = parser.parse_args()
-
-    plt.style.use('dark_background')  # Set the dark theme
-
-    tps_values1 = extract_tps(args.file1)
-    tps_values2 = extract_tps(args.file2) if args.file2 else None
-
-    print_statistics(args.legend1, tps_values1)
-    if tps_values2:
-        print_statistics(args.legend2, tps_values2)
-
-    plot_histograms(tps_values1, tps_values2, args.legend1, args.legend2 if args.legend2 else '', args.color1, args.color2)
-    plot_box_plots(tps_values1, tps_values2, args.legend1, args.legend2 if args.legend2 else '', args.color1, args.color2)
-    plot_density_plots(tps_values1, tps_values2, args.legend1, args.legend2 if args.legend2 else '', args.color1, args.color2)
-    plot_combined_hist_density(tps_values1, tps_values2, args.legend1, args.legend2 if args.legend2 else '', args.color1, args.color2)
-    plot_bell_curve(tps_values1, tps_values2, args.legend1, args.legend2 if args.legend2 else '', args.color1, args.color2)
-    plot_combined_hist_bell_curve(tps_values1, tps_values2, args.legend1, args.legend2 if args.legend2 else '', args.color1, args.color2)
-
-    # Plot variance bars
-    _, _, _, variance1 = analyze_tps(tps_values1)
-    if tps_values2:
-        _, _, _, variance2 = analyze_tps(tps_values2)
-        plot_variance_bars(variance1, variance2, args.legend1, args.legend2, args.color1, args.color2)
+    use_cache = handle_cache_arguments(args)
+
+    if args.summary:
+        print_streaming_summary(args.legend1, args.file1, args.jobs)
+        if args.file2:
+            print_streaming_summary(args.legend2, args.file2, args.jobs)
+        return
+
+    figures = [name.strip() for name in args.figures.split(',') if name.strip()]
+    for name in figures:
+        if name not in FIGURES:
+            parser.error(f'unknown figure {name}, choose from: {", ".join(FIGURES)}')
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    tps_values1 = extract_tps(args.file1, use_cache)
+    tps_values2 = extract_tps(args.file2, use_cache) if args.file2 else None
+    checkpoint('parse')
+    stats1 = analyze_tps(tps_values1)
+    stats2 = analyze_tps(tps_values2) if tps_values2 is not None else None
+    add_density(tps_values1, tps_values2, stats1, stats2, args.kde_bw)
+    checkpoint('statistics')
+
+    print_statistics(args.legend1, stats1)
+    if stats2 is not None:
+        print_statistics(args.legend2, stats2)
+
+    if args.significance:
+        if tps_values2 is None:
+            parser.error('--significance needs two TPS files')
+        try:
+            result = compare_runs(tps_values1, tps_values2, args.legend1, args.legend2,
+                                  resamples=args.resamples, block=args.block_length, max_workers=args.jobs)
+        except ValueError as e:
+            parser.error(str(e))
+        print_comparison(result)
+        write_significance([result], args.significance)
+        checkpoint('significance')
+
+    datasets = (tps_values1, tps_values2, stats1, stats2,
+                args.legend1, args.legend2 if args.legend2 else '', args.color1, args.color2)
+
+    if args.batch:
+        # Batch mode never opens a window, so it must not need a display either
+        use_agg()
+        with ProcessPoolExecutor(max_workers=args.jobs, initializer=use_agg) as executor:
+            futures = [executor.submit(render_figure, name, datasets, args.output_dir) for name in figures]
+            for future in futures:
+                print(f'Wrote {future.result()}')
     else:
-        plot_variance_bars(variance1, 0, args.legend1, '', args.color1, 'black')  # Use black for the second bar if there's only one dataset
-
-    plot_outliers(tps_values1, tps_values2, args.legend1, args.legend2 if args.legend2 else '', args.color1, args.color2)
+        for name in figures:
+            render_figure(name, datasets, args.output_dir, show=True)
 
 if __name__ == '__main__':
     main()
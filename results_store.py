@@ -0,0 +1,184 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Indexed SQLite store of sysbench runs.
+#
+# Every ingested log becomes one row in the runs table holding the run
+# options (threads, report interval), the final "SQL statistics", "Latency"
+# and "Threads fairness" blocks, summary statistics of the interval series
+# and the mysql.cnf used for the run. The interval columns themselves are
+# kept as raw NumPy buffers in the series table, so a plot never has to go
+# back to the original log.
+#
+# Runs are keyed by the content hash of the log, so ingesting the same log
+# twice is a no-op. Cross-run questions such as "mean TPS of every 128
+# thread run with this mysql.cnf, by date" are plain indexed queries on the
+# runs table and never touch the series.
+#
+# Environment:
+#   PLOT_SYSBENCH_RESULTS   database path (default results.db)
+
+import hashlib
+import os
+import sqlite3
+import time
+import numpy as np
+from series_cache import file_hash
+from streaming_stats import summarize_columns
+from sysbench_parse import COLUMNS, parse_summary, parse_sysbench
+
+DEFAULT_DB = 'results.db'
+
+SUMMARY_FIELDS = [
+    'sysbench_version', 'threads', 'report_interval',
+    'queries_read', 'queries_write', 'queries_other', 'queries_total',
+    'transactions', 'transactions_per_sec', 'queries', 'queries_per_sec',
+    'ignored_errors', 'reconnects', 'total_time', 'total_events',
+    'latency_min', 'latency_avg', 'latency_max', 'latency_p95', 'latency_sum',
+    'events_avg', 'events_stddev', 'execution_time_avg', 'execution_time_stddev',
+]
+
+SERIES_FIELDS = [f'{column}_{stat}' for column in ('tps', 'lat95')
+                 for stat in ('mean', 'median', 'std', 'min', 'max', 'p95', 'p99')]
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    label TEXT,
+    ingested_at REAL NOT NULL,
+    file_mtime REAL,
+    duration INTEGER,
+    intervals INTEGER,
+    cnf_hash TEXT,
+    cnf TEXT,
+    {', '.join(f'{name} NUMERIC' if name != 'sysbench_version' else f'{name} TEXT'
+               for name in SUMMARY_FIELDS + SERIES_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS runs_threads ON runs (threads);
+CREATE INDEX IF NOT EXISTS runs_label ON runs (label);
+CREATE INDEX IF NOT EXISTS runs_cnf ON runs (cnf_hash);
+CREATE INDEX IF NOT EXISTS runs_ingested ON runs (ingested_at);
+CREATE TABLE IF NOT EXISTS run_meta (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (run_id, key)
+);
+CREATE INDEX IF NOT EXISTS run_meta_key ON run_meta (key, value);
+CREATE TABLE IF NOT EXISTS series (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    dtype TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+'''
+
+
+def results_path():
+    return os.environ.get('PLOT_SYSBENCH_RESULTS', DEFAULT_DB)
+
+
+def open_store(path=None):
+    db = sqlite3.connect(path or results_path())
+    db.row_factory = sqlite3.Row
+    db.execute('PRAGMA foreign_keys = ON')
+    db.executescript(SCHEMA)
+    return db
+
+
+def series_statistics(columns):
+    stats = {}
+    if len(columns['tps']) == 0:
+        return stats
+    for name, summary in summarize_columns(columns, ('tps', 'lat95')).items():
+        values = summary.as_dict()
+        for stat in ('mean', 'median', 'std', 'min', 'max', 'p95', 'p99'):
+            stats[f'{name}_{stat}'] = values[stat]
+    return stats
+
+
+def ingest_run(db, log_path, label=None, cnf_path=None, meta=None):
+    """Record one sysbench log. Returns (run_id, created), where created is
+    False if a log with the same contents was already ingested."""
+    content_hash = file_hash(log_path)
+    row = db.execute('SELECT id FROM runs WHERE content_hash = ?', (content_hash,)).fetchone()
+    if row:
+        return row['id'], False
+
+    columns = parse_sysbench(log_path)
+    summary = parse_summary(log_path)
+    record = {name: summary.get(name) for name in SUMMARY_FIELDS}
+    record.update(series_statistics(columns))
+    record.update({
+        'content_hash': content_hash,
+        'path': os.path.abspath(log_path),
+        'label': label or os.path.splitext(os.path.basename(log_path))[0],
+        'ingested_at': time.time(),
+        'file_mtime': os.stat(log_path).st_mtime,
+        'duration': int(columns['time'][-1]) if len(columns['time']) else None,
+        'intervals': len(columns['time']),
+    })
+    if cnf_path:
+        with open(cnf_path) as f:
+            record['cnf'] = f.read()
+        record['cnf_hash'] = hashlib.blake2b(record['cnf'].encode(), digest_size=20).hexdigest()
+
+    with db:
+        names = list(record)
+        cursor = db.execute(f'INSERT INTO runs ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})',
+                            [record[name] for name in names])
+        run_id = cursor.lastrowid
+        db.executemany('INSERT INTO series (run_id, name, dtype, data) VALUES (?, ?, ?, ?)',
+                       [(run_id, name, columns[name].dtype.str, columns[name].tobytes()) for name, _ in COLUMNS])
+        db.executemany('INSERT INTO run_meta (run_id, key, value) VALUES (?, ?, ?)',
+                       [(run_id, key, value) for key, value in (meta or {}).items()])
+    return run_id, True
+
+
+def load_series(db, run_id, names=None):
+    """Interval columns of a stored run, as a dict of NumPy arrays."""
+    rows = db.execute('SELECT name, dtype, data FROM series WHERE run_id = ? ORDER BY rowid', (run_id,)).fetchall()
+    return {row['name']: np.frombuffer(row['data'], dtype=row['dtype'])
+            for row in rows if names is None or row['name'] in names}
+
+
+def run_meta(db, run_id):
+    return {row['key']: row['value'] for row in
+            db.execute('SELECT key, value FROM run_meta WHERE run_id = ?', (run_id,))}
+
+
+def find_runs(db, threads=None, label=None, cnf_hash=None, meta=None, since=None, order='ingested_at'):
+    """Select runs by indexed columns and metadata. label accepts SQL LIKE
+    wildcards and cnf_hash may be a prefix."""
+    where, params = [], []
+    if threads is not None:
+        where.append('threads = ?')
+        params.append(threads)
+    if label:
+        where.append('label LIKE ?')
+        params.append(label)
+    if cnf_hash:
+        where.append('cnf_hash LIKE ?')
+        params.append(cnf_hash + '%')
+    if since is not None:
+        where.append('ingested_at >= ?')
+        params.append(since)
+    for key, value in (meta or {}).items():
+        where.append('id IN (SELECT run_id FROM run_meta WHERE key = ? AND value = ?)')
+        params.extend([key, value])
+    query = 'SELECT * FROM runs'
+    if where:
+        query += ' WHERE ' + ' AND '.join(where)
+    query += f' ORDER BY {order}, id'
+    return db.execute(query, params).fetchall()
+
+
+def get_runs(db, run_ids):
+    rows = {row['id']: row for row in db.execute(
+        f'SELECT * FROM runs WHERE id IN ({", ".join("?" * len(run_ids))})', run_ids)}
+    missing = [run_id for run_id in run_ids if run_id not in rows]
+    if missing:
+        raise KeyError(f'No such run(s): {", ".join(map(str, missing))}')
+    return [rows[run_id] for run_id in run_ids]
@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Thread scaling models: Amdahl's law and the Universal Scalability Law.
+#
+#   Amdahl  X(N) = lambda N / (1 + sigma (N - 1))
+#   USL     X(N) = lambda N / (1 + sigma (N - 1) + kappa N (N - 1))
+#
+# lambda is the throughput of one thread, sigma the serialized fraction
+# (contention) and kappa the cost of keeping threads coherent (crosstalk).
+# With kappa > 0 throughput peaks at N* = sqrt((1 - sigma) / kappa) threads
+# and then falls, which is the retrograde scaling Amdahl cannot describe.
+#
+# Both models are linear in their coefficients once inverted:
+#
+#   N / X(N) = a + b (N - 1) + c N (N - 1),  a = 1/lambda, b = sigma/lambda, c = kappa/lambda
+#
+# so an ordinary least squares solve gives a starting point that needs no
+# measurement at one thread. A few Gauss-Newton steps on the throughput
+# residuals then refine it, as the inverted fit over-weights the low thread
+# counts.
+
+import numpy as np
+
+
+def usl_throughput(threads, lam, sigma, kappa=0.0):
+    n = np.asarray(threads, dtype=np.float64)
+    return lam * n / (1 + sigma * (n - 1) + kappa * n * (n - 1))
+
+
+def _design(n, model):
+    columns = [np.ones_like(n), n - 1]
+    if model == 'usl':
+        columns.append(n * (n - 1))
+    return np.column_stack(columns)
+
+
+def _linear_fit(n, x, model):
+    coef = np.linalg.lstsq(_design(n, model), n / x, rcond=None)[0]
+    coef = np.maximum(coef, [1e-12] + [0.0] * (len(coef) - 1))
+    return np.concatenate([[1 / coef[0]], coef[1:] / coef[0]])
+
+
+def _refine(n, x, params, iterations=50):
+    """Gauss-Newton on X(N) residuals, keeping sigma and kappa >= 0."""
+    params = params.copy()
+    for _ in range(iterations):
+        lam, sigma = params[0], params[1]
+        kappa = params[2] if len(params) > 2 else 0.0
+        d = 1 + sigma * (n - 1) + kappa * n * (n - 1)
+        model = lam * n / d
+        jac = [n / d, -lam * n * (n - 1) / d ** 2]
+        if len(params) > 2:
+            jac.append(-lam * n * n * (n - 1) / d ** 2)
+        step = np.linalg.lstsq(np.column_stack(jac), x - model, rcond=None)[0]
+        updated = params + step
+        updated[1:] = np.maximum(updated[1:], 0.0)
+        if np.sum((x - usl_throughput(n, *updated)) ** 2) > np.sum((x - model) ** 2):
+            break
+        converged = np.all(np.abs(updated - params) <= 1e-10 * np.maximum(np.abs(params), 1e-12))
+        params = updated
+        if converged:
+            break
+    return params
+
+
+def fit_model(threads, tps, model='usl'):
+    """Least squares fit of 'amdahl' or 'usl' to throughput measured at
+    several thread counts. Repeated thread counts are separate points."""
+    n = np.asarray(threads, dtype=np.float64)
+    x = np.asarray(tps, dtype=np.float64)
+    needed = 3 if model == 'usl' else 2
+    if len(np.unique(n)) < needed:
+        raise ValueError(f'{model} needs runs at {needed} or more thread counts')
+    params = _refine(n, x, _linear_fit(n, x, model))
+    lam, sigma = float(params[0]), float(params[1])
+    kappa = float(params[2]) if model == 'usl' else 0.0
+    fitted = usl_throughput(n, lam, sigma, kappa)
+    total = np.sum((x - x.mean()) ** 2)
+    fit = {
+        'model': model,
+        'lambda': lam,
+        'sigma': sigma,
+        'kappa': kappa,
+        'r2': float(1 - np.sum((x - fitted) ** 2) / total) if total else 1.0,
+    }
+    fit.update(peak(fit))
+    return fit
+
+
+def peak(fit):
+    """Predicted peak concurrency and throughput. Amdahl, or a USL fit with
+    no crosstalk, has no peak (None) and only approaches lambda / sigma."""
+    if fit['kappa'] > 0 and fit['sigma'] < 1:
+        n = float(np.sqrt((1 - fit['sigma']) / fit['kappa']))
+        return {'peak_threads': n, 'peak_tps': float(usl_throughput(n, fit['lambda'], fit['sigma'], fit['kappa']))}
+    ceiling = fit['lambda'] / fit['sigma'] if fit['sigma'] > 0 else None
+    return {'peak_threads': None, 'peak_tps': ceiling}
+
+
+def model_tps(fit, threads):
+    return usl_throughput(threads, fit['lambda'], fit['sigma'], fit['kappa'])
+
+
+def model_latency(fit, threads):
+    """Mean response time in ms by Little's law, N = X R."""
+    n = np.asarray(threads, dtype=np.float64)
+    return 1000 * n / model_tps(fit, n)
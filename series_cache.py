@@ -0,0 +1,187 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# On-disk cache of parsed columnar series.
+#
+# Parsing a multi-day sysbench log or a fio json+ output is far more
+# expensive than plotting it, and we tend to re-plot the same inputs many
+# times just to change a theme, legend or ylim. We keep the parsed NumPy
+# columns in a content-addressed cache so the next run only has to load an
+# .npz file.
+#
+# Each entry is named after the loader kind and a BLAKE2b hash of the input
+# file contents. An index maps (path, size, mtime) to the content hash so
+# that an unchanged file is not re-hashed on every run. The cache is bounded
+# in size and the least recently used entries are evicted first.
+#
+# Environment:
+#   PLOT_SYSBENCH_CACHE_DIR     cache directory (default ~/.cache/plot-sysbench)
+#   PLOT_SYSBENCH_CACHE_MAX_MB  size bound in MiB (default 1024)
+#   PLOT_SYSBENCH_NO_CACHE      if set, bypass the cache entirely
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+import numpy as np
+
+INDEX_FILE = 'index.json'
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def cache_dir():
+    path = os.environ.get('PLOT_SYSBENCH_CACHE_DIR')
+    if not path:
+        base = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+        path = os.path.join(base, 'plot-sysbench')
+    return path
+
+
+def cache_max_bytes():
+    return int(os.environ.get('PLOT_SYSBENCH_CACHE_MAX_MB', '1024')) * 1024 * 1024
+
+
+def cache_enabled():
+    return not os.environ.get('PLOT_SYSBENCH_NO_CACHE')
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the parsed-series cache')
+    parser.add_argument('--clear-cache', action='store_true', help='Remove all parsed-series cache entries before running')
+
+
+def handle_cache_arguments(args):
+    """Apply --clear-cache / --no-cache and return whether to use the cache."""
+    if args.clear_cache:
+        clear_cache()
+    return cache_enabled() and not args.no_cache
+
+
+def clear_cache():
+    shutil.rmtree(cache_dir(), ignore_errors=True)
+
+
+def file_hash(file_path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+def _atomic_write(path, write):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _load_index(directory):
+    try:
+        with open(os.path.join(directory, INDEX_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(directory, index):
+    payload = json.dumps(index).encode()
+    _atomic_write(os.path.join(directory, INDEX_FILE), lambda f: f.write(payload))
+
+
+def content_key(file_path, directory=None):
+    """Return the content hash of file_path, reusing the index when the
+    path, size and mtime are unchanged."""
+    directory = directory or cache_dir()
+    path = os.path.abspath(file_path)
+    st = os.stat(path)
+    index = _load_index(directory)
+    entry = index.get(path)
+    if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+        return entry['hash']
+    digest = file_hash(path)
+    index[path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': digest}
+    _save_index(directory, index)
+    return digest
+
+
+def evict(directory=None, max_bytes=None):
+    """Remove least recently used entries until the cache fits max_bytes."""
+    directory = directory or cache_dir()
+    max_bytes = cache_max_bytes() if max_bytes is None else max_bytes
+    entries = []
+    for name in os.listdir(directory):
+        if not name.endswith('.npz'):
+            continue
+        st = os.stat(os.path.join(directory, name))
+        entries.append((st.st_mtime, st.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    evicted = False
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.unlink(os.path.join(directory, name))
+        total -= size
+        evicted = True
+    if evicted:
+        _prune_index(directory)
+
+
+def _prune_index(directory):
+    # Entries are named <kind>-<content hash>.npz, forget the paths whose
+    # content no longer has any entry
+    kept = {name[:-len('.npz')].rsplit('-', 1)[-1] for name in os.listdir(directory) if name.endswith('.npz')}
+    index = _load_index(directory)
+    pruned = {path: entry for path, entry in index.items() if entry['hash'] in kept}
+    if len(pruned) != len(index):
+        _save_index(directory, pruned)
+
+
+def _entry_path(file_path, kind):
+    directory = cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{kind}-{content_key(file_path, directory)}.npz')
+
+
+def cache_get(file_path, kind):
+    """Return the cached columns for file_path, or None on a miss."""
+    entry = _entry_path(file_path, kind)
+    if not os.path.exists(entry):
+        return None
+    try:
+        with np.load(entry, allow_pickle=False) as npz:
+            columns = {name: npz[name] for name in npz.files}
+    except (OSError, ValueError, zipfile.BadZipFile):
+        os.unlink(entry)
+        return None
+    os.utime(entry)
+    return columns
+
+
+def cache_put(file_path, kind, columns):
+    entry = _entry_path(file_path, kind)
+    _atomic_write(entry, lambda f: np.savez(f, **columns))
+    evict(os.path.dirname(entry))
+
+
+def cached_load(file_path, kind, loader, use_cache=True):
+    """Return loader(file_path), a dict of NumPy arrays, going through the
+    cache. kind names the loader and its output format; bump it whenever
+    the loader output changes so stale entries are not reused."""
+    if not use_cache or not cache_enabled():
+        return loader(file_path)
+
+    columns = cache_get(file_path, kind)
+    if columns is None:
+        columns = loader(file_path)
+        cache_put(file_path, kind, columns)
+    return columns
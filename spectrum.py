@@ -0,0 +1,138 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Spectrum of TPS jitter.
+#
+# Periodic InnoDB activity, such as adaptive flushing or checkpoints driven
+# by innodb_log_file_size, shows up as TPS dips that repeat at a fixed
+# period. We remove the linear trend and the mean of the series, apply a
+# Hann window and take the real FFT. Amplitudes are scaled so that a
+# sinusoidal dip of A TPS shows up as a peak of about A TPS.
+#
+# With a segment length the spectrum is instead the Welch average over
+# half-overlapping segments, which trades frequency resolution for a much
+# less noisy estimate on long runs. Either way a period is only reported
+# if it fits at least twice in the record or segment.
+
+import json
+import numpy as np
+
+DEFAULT_PEAKS = 5
+# Bin 1 is a single cycle over the whole record or segment, mostly what the
+# detrending left over. A period has to fit at least twice to be reported.
+MIN_PEAK_BIN = 2
+
+
+def add_spectrum_arguments(parser):
+    parser.add_argument('--spectrum', action='store_true', help='Draw the TPS jitter spectrum next to the time series and report the dominant periods')
+    parser.add_argument('--spectrum-peaks', type=int, default=DEFAULT_PEAKS, help=f'Number of dominant periods to report (default: {DEFAULT_PEAKS})')
+    parser.add_argument('--spectrum-segment', type=int, default=0, help='Welch segment length in seconds, 0 uses the whole run (default: 0)')
+    parser.add_argument('--spectrum-json', type=str, default=None, metavar='JSON', help='Also write the dominant periods to this JSON file')
+
+
+def detrend(values):
+    """values minus their least-squares line."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n < 2:
+        return values - values.mean() if n else values
+    x = np.arange(n, dtype=np.float64) - (n - 1) / 2
+    slope = (x * values).sum() / (x * x).sum()
+    return values - values.mean() - slope * x
+
+
+def _amplitude(segment, window):
+    spectrum = np.fft.rfft(detrend(segment) * window)
+    return 2 * np.abs(spectrum) / window.sum()
+
+
+def amplitude_spectrum(values, interval, segment=None):
+    """Return (frequencies in Hz, amplitudes) of a series sampled every
+    interval seconds, optionally Welch averaged over segments of that many
+    samples."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if not segment or segment >= n:
+        segment = n
+    window = np.hanning(segment)
+    if segment == n:
+        amplitude = _amplitude(values, window)
+    else:
+        # Half-overlapping segments, averaged in power
+        starts = np.arange(0, n - segment + 1, segment // 2)
+        power = np.mean([_amplitude(values[s:s + segment], window) ** 2 for s in starts], axis=0)
+        amplitude = np.sqrt(power)
+    freqs = np.fft.rfftfreq(segment, interval)
+    return freqs, amplitude
+
+
+def dominant_periods(freqs, amplitude, count=DEFAULT_PEAKS, mean=None):
+    """The count largest local maxima of the spectrum with periods of at
+    most half the record, as a list of dicts sorted by amplitude."""
+    if len(amplitude) < MIN_PEAK_BIN + 2:
+        return []
+    a = amplitude
+    peaks = np.flatnonzero((a[1:-1] > a[:-2]) & (a[1:-1] >= a[2:])) + 1
+    peaks = peaks[peaks >= MIN_PEAK_BIN]
+    peaks = peaks[np.argsort(a[peaks])[::-1][:count]]
+    result = []
+    for i in peaks:
+        peak = {
+            'period': float(1 / freqs[i]),
+            'frequency': float(freqs[i]),
+            'amplitude': float(a[i]),
+        }
+        if mean:
+            peak['amplitude_pct'] = float(100 * a[i] / mean)
+        result.append(peak)
+    return result
+
+
+def analyze_spectrum(times, tps, count=DEFAULT_PEAKS, segment_seconds=0):
+    """Spectrum and dominant periods of a TPS series."""
+    times = np.asarray(times)
+    interval = max(1, int(np.median(np.diff(times)))) if len(times) > 1 else 1
+    segment = int(segment_seconds // interval) if segment_seconds else None
+    freqs, amplitude = amplitude_spectrum(tps, interval, segment)
+    return {
+        'frequencies': freqs,
+        'amplitude': amplitude,
+        'peaks': dominant_periods(freqs, amplitude, count, float(np.mean(tps)) if len(tps) else None),
+        'longest_period': float(1 / freqs[MIN_PEAK_BIN]) if len(freqs) > MIN_PEAK_BIN else None,
+    }
+
+
+def format_period(seconds):
+    if seconds >= 3600:
+        return f'{seconds / 3600:.2f}h'
+    if seconds >= 60:
+        return f'{seconds / 60:.1f}m'
+    return f'{seconds:.1f}s'
+
+
+def plot_spectrum(ax, analysis, color, label):
+    """Plot amplitude against period, long periods to the left."""
+    freqs, amplitude = analysis['frequencies'][1:], analysis['amplitude'][1:]
+    ax.plot(1 / freqs, amplitude, '-', color=color, linewidth=1, label=label)
+    for peak in analysis['peaks']:
+        ax.annotate(format_period(peak['period']), (peak['period'], peak['amplitude']),
+                    xytext=(0, 4), textcoords='offset points', ha='center', fontsize=8, color=color)
+    ax.set_xscale('log')
+    if not ax.xaxis_inverted():
+        ax.invert_xaxis()
+    ax.set_xlabel('Period (seconds)')
+    ax.set_ylabel('Amplitude (TPS)')
+    ax.set_title('TPS jitter spectrum')
+    ax.grid(True, which='both', alpha=0.3)
+
+
+def print_peaks(label, peaks, longest=None):
+    limit = f' (resolvable up to {format_period(longest)}, half the run or --spectrum-segment)' if longest else ''
+    print(f'{label}: dominant periods{limit}')
+    for peak in peaks:
+        pct = f' ({peak["amplitude_pct"]:.2f}% of mean)' if 'amplitude_pct' in peak else ''
+        print(f'  {format_period(peak["period"]):>8}  {peak["amplitude"]:.2f} TPS{pct}')
+
+
+def write_peaks(results, output):
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
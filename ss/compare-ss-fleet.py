@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+
+import argparse
+import math
+import matplotlib.pyplot as plt
+import numpy as np
+from ss_plot import (BASE_COLORS, SERIES_LABELS, add_legend, add_ss_arguments, fleet_colors, handle_cache_arguments,
+                     load_drives, parse_shorthand_bandwidth, plot_drive, set_limits, setup_axes, ss_title, time_scale)
+from stage_timer import checkpoint
+
+LAYOUTS = ['grid', 'overlay']
+OVERLAY_SERIES = ['Mean IOPS', 'Mean Bandwidth (KB/s)']
+SUMMARY_SERIES = ['Mean IOPS', 'Mean IOPS (BW)', 'Mean Bandwidth (KB/s)', 'Mean Bandwidth (KB/s) (BW)']
+
+# Function to summarize the end of each drive's series against the fleet
+def fleet_summary(drives, window, outlier):
+    rows = []
+    for label in SUMMARY_SERIES:
+        values = {drive['name']: drive['series'][label][-window:] for drive in drives if label in drive['series']}
+        means = {name: np.nanmean(v) for name, v in values.items() if np.isfinite(v).any()}
+        if not means:
+            continue
+        median = np.median(list(means.values()))
+        for name, mean in means.items():
+            v = values[name]
+            deviation = 100 * (mean - median) / median if median else 0.0
+            rows.append({
+                'series': label,
+                'drive': name,
+                'mean': mean,
+                'cv': 100 * np.nanstd(v) / mean if mean else float('nan'),
+                'deviation': deviation,
+                'outlier': abs(deviation) > outlier,
+            })
+    return rows
+
+# Function to print the fleet summary, worst drives first
+def print_summary(rows, window):
+    print(f'Last {window} steady-state entries of each drive, against the fleet median:')
+    series = None
+    for row in sorted(rows, key=lambda r: (SUMMARY_SERIES.index(r['series']), r['deviation'])):
+        if row['series'] != series:
+            series = row['series']
+            print(f'\n{series}')
+            print(f'  {"drive":<24} {"mean":>14} {"CV %":>7} {"vs median":>10}')
+        note = '  OUTLIER' if row['outlier'] else ''
+        print(f'  {row["drive"]:<24} {row["mean"]:>14.1f} {row["cv"]:>7.2f} {row["deviation"]:>+9.1f}%{note}')
+
+# Function to draw one panel per drive, all on the same scales
+def plot_grid(fig, drives, labels, factor, time_unit, args):
+    cols = args.cols or math.ceil(math.sqrt(len(drives)))
+    rows = math.ceil(len(drives) / cols)
+    axes = fig.subplots(rows, cols, sharex=True, sharey=True, squeeze=False).flatten()
+    bw_axes = []
+    for ax1, drive in zip(axes, drives):
+        ax2 = setup_axes(ax1, time_unit)
+        plot_drive(ax1, ax2, drive, factor, BASE_COLORS, args.marker_size, args.alpha, labels, '{series}')
+        ax1.set_title(drive['name'], color='white')
+        bw_axes.append(ax2)
+    for ax in axes[len(drives):]:
+        ax.set_visible(False)
+    # The IOPS axes are shared, the twin bandwidth axes cannot be: give
+    # them all the range of the largest drive
+    iops_top = args.iops_max or 1.05 * max(ax.dataLim.y1 for ax in axes[:len(drives)])
+    bw_top = parse_shorthand_bandwidth(args.bw_max) if args.bw_max else 1.05 * max(ax.dataLim.y1 for ax in bw_axes)
+    axes[0].set_ylim(0, iops_top)
+    for ax in bw_axes:
+        ax.set_ylim(0, bw_top)
+    return axes[0].get_lines() + bw_axes[0].get_lines()
+
+# Function to draw all drives on one pair of axes, one color per drive
+def plot_overlay(fig, drives, labels, factor, time_unit, args):
+    ax1 = fig.subplots()
+    ax2 = setup_axes(ax1, time_unit)
+    for drive, color in zip(drives, fleet_colors(len(drives))):
+        plot_drive(ax1, ax2, drive, factor, color, args.marker_size, args.alpha, labels)
+    set_limits(ax1, ax2, args.iops_max, args.bw_max)
+    return ax1.get_lines() + ax2.get_lines()
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Compare the fio steady-state data of any number of drives.')
+    parser.add_argument('dirs', type=str, nargs='+', help='Drive directories holding ss_iops.json and/or ss_bw.json')
+    parser.add_argument('--layout', choices=LAYOUTS, default='grid', help='One panel per drive, or all drives on one plot (default: grid)')
+    parser.add_argument('--series', type=str, action='append', default=[],
+                        help=f'Series to plot, may be repeated (default: all for grid, {" and ".join(OVERLAY_SERIES)} for overlay)')
+    parser.add_argument('--cols', type=int, default=None, help='Columns of the grid layout (default: square)')
+    parser.add_argument('--marker-size', type=float, default=1, help='Base marker size (default: 1)')
+    parser.add_argument('--alpha', type=float, default=0.8, help='Alpha value of the markers (default: 0.8)')
+    parser.add_argument('--window', type=int, default=600, help='Trailing steady-state entries summarized per drive (default: 600)')
+    parser.add_argument('--outlier', type=float, default=5.0, help='Flag drives further than this percent from the fleet median (default: 5)')
+    parser.add_argument('--output', type=str, default='steady_state_fleet.png', help='Output image file')
+    add_ss_arguments(parser)
+    args = parser.parse_args()
+
+    use_cache = handle_cache_arguments(args)
+    for label in args.series:
+        if label not in SERIES_LABELS:
+            parser.error(f'unknown series {label}, choose from: {", ".join(SERIES_LABELS)}')
+    labels = args.series or (OVERLAY_SERIES if args.layout == 'overlay' else SERIES_LABELS)
+
+    drives = load_drives(args.dirs, args.jobs, use_cache)
+    checkpoint('parse')
+    if not drives:
+        parser.error('no ss_iops.json or ss_bw.json found in the drive directories')
+    skipped = len(args.dirs) - len(drives)
+    if skipped:
+        print(f'Skipping {skipped} directories without fio steady-state output')
+
+    print_summary(fleet_summary(drives, args.window, args.outlier), args.window)
+    factor, time_unit = time_scale(drives)
+
+    if args.layout == 'grid':
+        cols = args.cols or math.ceil(math.sqrt(len(drives)))
+        fig = plt.figure(figsize=(9 * cols, 5 * math.ceil(len(drives) / cols)))
+        handles = plot_grid(fig, drives, labels, factor, time_unit, args)
+    else:
+        fig = plt.figure(figsize=(28, 16))
+        handles = plot_overlay(fig, drives, labels, factor, time_unit, args)
+    fig.patch.set_facecolor('black')
+    fig.suptitle(ss_title(args.title_prefix, f'Steady-State of {len(drives)} Drives'), color='white')
+    # Leave the right edge to the legend, as wide as it is drawn
+    legend = add_legend(fig, handles, loc='upper right', bbox_to_anchor=(0.99, 0.95), markerscale=6)
+    width = legend.get_window_extent(fig.canvas.get_renderer()).width / fig.bbox.width
+    fig.tight_layout(pad=2.0, rect=[0, 0, 0.98 - width, 1])
+    checkpoint('render')
+    fig.savefig(args.output, facecolor=fig.get_facecolor())
+    checkpoint('savefig')
+    print(f'\nFleet plot saved to {args.output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/python3
+
+import argparse
+import os
+import re
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.colors import TwoSlopeNorm
+from matplotlib.ticker import FuncFormatter
+from ss_plot import add_cache_arguments, add_legend, drive_names, fleet_colors, format_latency, handle_cache_arguments, ss_title
+from fio_ss import SS_FILES
+from fio_latency import (DEFAULT_PERCENTILES, DIRECTIONS, LATENCY_KINDS, histogram_percentiles, load_latency_many,
+                         merge_histograms, parse_percentiles, select_histograms)
+from stage_timer import checkpoint
+
+FLEET = 'fleet'
+LATENCY_RE = re.compile(r'^([\d.]+)\s*(ns|us|ms|s)?$')
+LATENCY_UNITS = {'ns': 1, 'us': 1e3, 'ms': 1e6, 's': 1e9, None: 1e3}
+
+# Function to parse an SLO such as 99.9:10ms, a latency without unit is in us
+def parse_slo(value):
+    percentile, _, latency = value.partition(':')
+    match = LATENCY_RE.match(latency.strip().lower())
+    if not match:
+        raise ValueError(f'Invalid SLO {value}, expected PERCENTILE:LATENCY such as 99.9:10ms')
+    return float(percentile), float(match.group(1)) * LATENCY_UNITS[match.group(2)]
+
+# Function to merge the latency histograms of every drive, and of the whole fleet
+def load_histograms(dirs, args, use_cache):
+    found = [(d, os.path.join(d, name)) for d in dirs for name in (args.file or SS_FILES)
+             if os.path.exists(os.path.join(d, name))]
+    loaded = load_latency_many([path for _, path in found], args.kind, args.jobs, use_cache)
+    selected = {d: [] for d in dirs}
+    for (d, _), jobs in zip(found, loaded):
+        selected[d] += select_histograms(jobs, args.job_filter, args.direction or DIRECTIONS)
+    merged = {d: merge_histograms(selected[d]) for d in dirs}
+    found = [d for d in dirs if merged[d][1].sum()]
+    # Drives are told apart by name, the fleet name is taken
+    histograms = {name: merged[d] for d, name in zip(found, drive_names(found, reserved=[FLEET]))}
+    if len(histograms) > 1:
+        histograms[FLEET] = merge_histograms(list(histograms.values()))
+    return histograms
+
+# Function to print the percentiles of every drive, flagging SLO violations
+def print_percentiles(histograms, percentiles, slos, kind):
+    print(f'{kind} percentiles:')
+    header = ''.join(f'{f"p{p:g}":>11}' for p in percentiles)
+    print(f'  {"drive":<24} {"IOs":>12}{header}')
+    for name, (values, counts) in histograms.items():
+        latencies = histogram_percentiles(values, counts, percentiles)
+        row = ''.join(f'{format_latency(latency):>11}' for latency in latencies)
+        print(f'  {name:<24} {counts.sum():>12}{row}')
+        for percentile, limit in slos:
+            latency = histogram_percentiles(values, counts, [percentile])[0]
+            if latency > limit:
+                print(f'  {"":<24} SLO p{percentile:g} <= {format_latency(limit)} missed: {format_latency(latency)}')
+
+# Function to map percentiles to their number of nines, 99.9 -> 3
+def nines(percentiles):
+    return -np.log10(1 - np.asarray(percentiles, dtype=np.float64) / 100)
+
+# Function to style an axis like the other ss plots
+def style_axis(ax):
+    ax.set_facecolor('black')
+    ax.tick_params(which='both', colors='white')
+    for spine in ax.spines.values():
+        spine.set_color('gray')
+
+# Function to plot latency against percentile, the tail stretched out in nines
+def plot_curves(ax, histograms, percentiles, slos, kind):
+    # Past one in N IOs every percentile is the maximum
+    top = max(nines(min(percentiles[-1], 99.9999)), 1)
+    x = np.linspace(nines(50), top, 400)
+    p = 100 * (1 - 10 ** -x)
+    drives = [name for name in histograms if name != FLEET]
+    lines = []
+    for name, color in zip(drives, fleet_colors(len(drives))):
+        line, = ax.plot(x, histogram_percentiles(*histograms[name], p), color=color, linewidth=1.5, label=name)
+        lines.append(line)
+    if FLEET in histograms:
+        line, = ax.plot(x, histogram_percentiles(*histograms[FLEET], p), color='white', linestyle='--', linewidth=2, label=FLEET)
+        lines.append(line)
+    for percentile, limit in slos:
+        line, = ax.plot([nines(percentile)], [limit], 'X', color='red', markersize=12, label=f'SLO p{percentile:g}')
+        lines.append(line)
+    ticks = [t for t in [50, 90, 99, 99.9, 99.99, 99.999, 99.9999] if nines(t) <= top + 1e-9]
+    ax.set_xticks(nines(ticks))
+    ax.set_xticklabels([f'p{t:g}' for t in ticks])
+    ax.set_yscale('log')
+    # Tail latencies rarely span a decade, label the minor ticks too
+    ax.yaxis.set_major_formatter(FuncFormatter(lambda y, pos: format_latency(y)))
+    ax.yaxis.set_minor_formatter(FuncFormatter(lambda y, pos: format_latency(y)))
+    ax.set_xlabel('Percentile', color='white')
+    ax.set_ylabel(f'{kind} latency', color='white')
+    ax.grid(True, color='gray', which='both', alpha=0.5)
+    style_axis(ax)
+    return lines
+
+# Function to plot a heatmap of every drive's percentiles against the fleet
+def plot_heatmap(fig, ax, histograms, percentiles):
+    names = list(histograms)
+    latencies = np.array([histogram_percentiles(*histograms[name], percentiles) for name in names])
+    # Compare each drive to the fleet median, log2 so 2x slower and 2x
+    # faster are as far from white
+    ratio = np.log2(latencies / np.nanmedian(latencies[[n != FLEET for n in names]], axis=0))
+    limit = max(np.nanmax(np.abs(ratio)), 0.1)
+    image = ax.imshow(ratio, cmap='RdYlGn_r', norm=TwoSlopeNorm(0, -limit, limit), aspect='auto')
+    for i in range(len(names)):
+        for j in range(len(percentiles)):
+            ax.text(j, i, format_latency(latencies[i, j]), ha='center', va='center', fontsize=9, color='black')
+    ax.set_xticks(range(len(percentiles)))
+    ax.set_xticklabels([f'p{p:g}' for p in percentiles])
+    ax.set_yticks(range(len(names)))
+    ax.set_yticklabels(names)
+    style_axis(ax)
+    colorbar = fig.colorbar(image, ax=ax)
+    colorbar.set_label('log2 latency vs fleet median', color='white')
+    colorbar.ax.tick_params(colors='white')
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Compare the latency percentiles of drives from the histograms of fio json+ output.')
+    parser.add_argument('dirs', type=str, nargs='+', help='Drive directories holding ss_iops.json and/or ss_bw.json written with --output-format=json+')
+    parser.add_argument('--kind', choices=[kind.split('_')[0] for kind in LATENCY_KINDS], default='clat',
+                        help='Completion, total or submission latency (default: clat)')
+    parser.add_argument('--percentiles', type=str, default=','.join(f'{p:g}' for p in DEFAULT_PERCENTILES),
+                        help='Comma separated percentiles (default: %(default)s)')
+    parser.add_argument('--file', choices=SS_FILES, action='append', default=[],
+                        help='fio output to use, may be repeated (default: all found)')
+    parser.add_argument('--direction', choices=DIRECTIONS, action='append', default=[],
+                        help='IO direction to use, may be repeated (default: all)')
+    parser.add_argument('--job-filter', type=str, default=None, help='Only merge the fio jobs whose name matches this regex')
+    parser.add_argument('--slo', type=str, action='append', default=[],
+                        help='Latency objective such as 99.9:10ms, may be repeated (a latency without unit is in us)')
+    parser.add_argument('--title-prefix', type=str, default='', help='Prefix for the title of the graph')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of parser processes (default: number of CPUs)')
+    parser.add_argument('--output', type=str, default='steady_state_latency.png', help='Output image file')
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    use_cache = handle_cache_arguments(args)
+    args.kind = f'{args.kind}_ns'
+    try:
+        percentiles = parse_percentiles(args.percentiles)
+        slos = [parse_slo(slo) for slo in args.slo]
+        if args.job_filter:
+            re.compile(args.job_filter)
+    except (ValueError, re.error) as e:
+        parser.error(str(e))
+
+    histograms = load_histograms(args.dirs, args, use_cache)
+    checkpoint('parse')
+    if not histograms:
+        parser.error('no latency bins found, run fio with --output-format=json+')
+    skipped = len(args.dirs) - len(histograms) + (FLEET in histograms)
+    if skipped:
+        print(f'Skipping {skipped} directories without fio json+ latency bins')
+    kind = args.kind.split('_')[0]
+    print_percentiles(histograms, percentiles, slos, kind)
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(28, max(8, 0.6 * len(histograms) + 4)),
+                                   gridspec_kw={'width_ratios': [3, 2]})
+    fig.patch.set_facecolor('black')
+    lines = plot_curves(ax1, histograms, percentiles, slos, kind)
+    plot_heatmap(fig, ax2, histograms, percentiles)
+    fig.suptitle(ss_title(args.title_prefix, f'Steady-State {kind} Latency Percentiles'), color='white')
+    fig.tight_layout(pad=2.0)
+    add_legend(ax1, lines, loc='upper left', bbox_to_anchor=None, markerscale=1)
+    checkpoint('render')
+    fig.savefig(args.output, facecolor=fig.get_facecolor())
+    checkpoint('savefig')
+    print(f'\nLatency plot saved to {args.output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Latency histograms of fio json+ output.
+#
+# With --output-format=json+ fio adds to the clat_ns and lat_ns sections of
+# every job and direction a 'bins' map from latency, in nanoseconds, to the
+# number of IOs that completed in the histogram bucket represented by that
+# value. The buckets are the same fixed log-linear ones for every job, so
+# histograms of different jobs and drives merge exactly by adding the
+# counts of equal values, and any percentile of the merged histogram comes
+# out the way fio computes its own: the value of the first bucket where the
+# cumulative count reaches the percentile of the total.
+#
+# The percentile list fio prints cannot be merged, percentiles of the sum
+# of two distributions are not a function of their percentiles. Plain json
+# output has no bins, latency_jobs() then finds empty histograms.
+
+import re
+from functools import partial
+import numpy as np
+from fio_ss import load_columns_many
+from fio_json import extract_paths
+
+CACHE_KIND = 'fio-lat-v1'
+LATENCY_KINDS = ['clat_ns', 'lat_ns', 'slat_ns']
+DIRECTIONS = ['read', 'write', 'trim']
+DEFAULT_PERCENTILES = [50, 90, 99, 99.9, 99.99, 99.999]
+
+
+def _bins(stats):
+    """The bins of a fio latency section as sorted value and count arrays."""
+    bins = stats.get('bins') or {}
+    values = np.fromiter(map(int, bins.keys()), dtype=np.int64, count=len(bins))
+    counts = np.fromiter(bins.values(), dtype=np.int64, count=len(bins))
+    order = np.argsort(values)
+    return values[order], counts[order]
+
+
+def latency_columns(file_path, kind='clat_ns'):
+    # Every job has every direction, bins only show up once a direction
+    # saw IO, so extract the whole section to keep the jobs lined up
+    paths = {direction: f'jobs[].{direction}.{kind}' for direction in DIRECTIONS}
+    found = extract_paths(file_path, ['jobs[].jobname'] + list(paths.values()))
+    columns = {'jobname': np.array(found['jobs[].jobname'], dtype=str)}
+    for direction, path in paths.items():
+        for i, stats in enumerate(found[path]):
+            columns[f'job{i}.{direction}.values'], columns[f'job{i}.{direction}.counts'] = _bins(stats)
+    return columns
+
+
+def _latency_jobs(columns):
+    jobs = []
+    for i, jobname in enumerate(columns['jobname']):
+        bins = {}
+        for direction in DIRECTIONS:
+            if f'job{i}.{direction}.values' in columns:
+                bins[direction] = (columns[f'job{i}.{direction}.values'], columns[f'job{i}.{direction}.counts'])
+        jobs.append({'jobname': str(jobname), 'bins': bins})
+    return jobs
+
+
+def load_latency_many(file_paths, kind='clat_ns', max_workers=None, use_cache=True):
+    """The jobs of each fio output as [{'jobname', 'bins': {direction:
+    (values, counts)}}], served from the cache and parsed in parallel."""
+    if kind not in LATENCY_KINDS:
+        raise ValueError(f'Unknown latency kind {kind}, choose from: {", ".join(LATENCY_KINDS)}')
+    loader = partial(latency_columns, kind=kind)
+    results = load_columns_many(file_paths, f'{CACHE_KIND}-{kind}', loader, max_workers, use_cache)
+    return [_latency_jobs(columns) for columns in results]
+
+
+def select_histograms(jobs, job_filter=None, directions=DIRECTIONS):
+    """The histograms of the jobs whose name matches the job_filter regex,
+    for the given directions."""
+    pattern = re.compile(job_filter) if job_filter else None
+    return [job['bins'][direction] for job in jobs for direction in directions
+            if direction in job['bins'] and (pattern is None or pattern.search(job['jobname']))]
+
+
+def merge_histograms(histograms):
+    """Add up (values, counts) histograms into one over the union of their
+    values."""
+    histograms = [h for h in histograms if len(h[0])]
+    if not histograms:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    values = np.concatenate([values for values, _ in histograms])
+    counts = np.concatenate([counts for _, counts in histograms])
+    merged, inverse = np.unique(values, return_inverse=True)
+    return merged, np.bincount(inverse, weights=counts, minlength=len(merged)).astype(np.int64)
+
+
+def histogram_percentiles(values, counts, percentiles):
+    """Percentiles of a histogram the way fio computes them, NaN for an
+    empty histogram."""
+    percentiles = np.asarray(percentiles, dtype=np.float64)
+    cumulative = np.cumsum(counts)
+    if not len(cumulative) or cumulative[-1] == 0:
+        return np.full(len(percentiles), np.nan)
+    index = np.searchsorted(cumulative, percentiles / 100 * cumulative[-1], side='left')
+    return values[np.minimum(index, len(values) - 1)].astype(np.float64)
+
+
+def parse_percentiles(value):
+    """'50,99,99.9' -> [50.0, 99.0, 99.9]"""
+    try:
+        percentiles = [float(p) for p in value.split(',') if p.strip()]
+    except ValueError:
+        raise ValueError(f'Invalid percentile list: {value}')
+    if not percentiles or any(not 0 < p <= 100 for p in percentiles):
+        raise ValueError(f'Percentiles must be in (0, 100]: {value}')
+    return sorted(percentiles)
@@ -0,0 +1,236 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Streaming ingestion of fio per-interval logs.
+#
+# write_iops_log, write_bw_log and write_lat_log make fio write one line per
+# sample to <prefix>_<kind>.<job>.log:
+#
+#   time (ms), value, data direction, block size, offset[, priority]
+#
+# Values are IOs per second, KiB/s, or nanoseconds for the lat, clat and
+# slat logs. Without log_avg_msec a latency log has a line per IO, so a
+# long preconditioning run writes gigabytes of them. We never hold the
+# lines: every newline-aligned chunk of the memory mapped log is converted
+# by NumPy in one call and reduced right away to per time bin sums, counts
+# and extremes, keyed by bin and data direction. Chunks are reduced in
+# parallel and merged, so memory is bounded by the number of bins and not
+# by the size of the log.
+#
+# aggregate_logs() then combines the per job logs of one kind: the IOPS and
+# bandwidth of every job and direction are averaged within a bin and added
+# up, latencies are averaged over all the IOs of the bin and their maximum
+# kept. The iops and bw logs should be written with log_avg_msec, and the
+# bin resolution should not be finer than it, empty bins of those logs are
+# read as intervals where no IO completed.
+
+import mmap
+import os
+import re
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from series_cache import cache_enabled, cache_get, cache_put  # noqa: E402
+from sysbench_parse import chunk_ranges  # noqa: E402
+
+CACHE_KIND = 'fio-log-v1'
+LOG_KINDS = ['iops', 'bw', 'lat', 'clat', 'slat']
+RATE_KINDS = ['iops', 'bw']
+DIRECTIONS = ['read', 'write', 'trim']
+# <prefix>_<kind>.<job>.log, or <prefix>_<kind>.log with per_job_logs=0
+LOG_NAME_RE = re.compile(r'^(?P<prefix>.*)_(?P<kind>iops|bw|lat|clat|slat)(?:\.(?P<job>\d+))?\.log$')
+INTERVAL_PROBE_SIZE = 1024 * 1024
+# A chunk becomes about four times its size in NumPy columns while it is
+# reduced, in every worker at once
+CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def log_kind(file_path):
+    """The kind of a fio log from its name, None for other files."""
+    match = LOG_NAME_RE.match(os.path.basename(file_path))
+    return match.group('kind') if match else None
+
+
+def find_logs(paths):
+    """The fio logs among paths, directories are searched for them."""
+    logs = []
+    for path in paths:
+        if os.path.isdir(path):
+            logs += sorted(os.path.join(path, name) for name in os.listdir(path) if log_kind(name))
+        else:
+            logs.append(path)
+    return logs
+
+
+def empty_bins():
+    return {
+        'key': np.empty(0, dtype=np.int64),
+        'sum': np.empty(0, dtype=np.float64),
+        'count': np.empty(0, dtype=np.int64),
+        'min': np.empty(0, dtype=np.float64),
+        'max': np.empty(0, dtype=np.float64),
+    }
+
+
+def parse_log_buffer(buf):
+    """The time, value and direction columns of the fio log lines in buf."""
+    buf = bytes(buf).rstrip()
+    if not buf:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+    fields = buf[:buf.find(b'\n') if b'\n' in buf else len(buf)].count(b',') + 1
+    # One conversion for the whole chunk, lines become fields like the rest
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            flat = np.fromstring(buf.replace(b'\n', b','), dtype=np.float64, sep=',')
+        except DeprecationWarning:
+            raise ValueError('malformed fio log line')
+    if fields < 3 or len(flat) % fields:
+        raise ValueError(f'fio log lines do not all have {fields} fields')
+    return flat[0::fields], flat[1::fields], flat[2::fields].astype(np.int64)
+
+
+def _reduce(key, values, counts=None, minimum=None, maximum=None):
+    """Sum, count and extremes of values per distinct key."""
+    if len(key) and np.all(key[1:] >= key[:-1]):
+        # Logs are written in time order, equal keys are runs then and need
+        # no sorting
+        starts = np.flatnonzero(np.concatenate([[True], key[1:] != key[:-1]]))
+        return {
+            'key': key[starts],
+            'sum': np.add.reduceat(values, starts),
+            'count': np.diff(np.append(starts, len(key))) if counts is None else np.add.reduceat(counts, starts),
+            'min': np.minimum.reduceat(values if minimum is None else minimum, starts),
+            'max': np.maximum.reduceat(values if maximum is None else maximum, starts),
+        }
+    keys, inverse = np.unique(key, return_inverse=True)
+    bins = {
+        'key': keys,
+        'sum': np.bincount(inverse, weights=values, minlength=len(keys)),
+        'count': np.bincount(inverse, weights=counts, minlength=len(keys)).astype(np.int64),
+        'min': np.full(len(keys), np.inf),
+        'max': np.full(len(keys), -np.inf),
+    }
+    np.minimum.at(bins['min'], inverse, values if minimum is None else minimum)
+    np.maximum.at(bins['max'], inverse, values if maximum is None else maximum)
+    return bins
+
+
+def bin_buffer(buf, resolution):
+    """Reduce the lines of buf to bins of resolution ms, keyed by
+    bin * len(DIRECTIONS) + direction."""
+    time, value, ddir = parse_log_buffer(buf)
+    known = (ddir >= 0) & (ddir < len(DIRECTIONS))
+    if not known.any():
+        return empty_bins()
+    key = (time[known] // resolution).astype(np.int64) * len(DIRECTIONS) + ddir[known]
+    return _reduce(key, value[known])
+
+
+def merge_bins(parts):
+    """Merge the bins of several chunks of the same log, emptying the
+    chunks as their columns are consumed."""
+    parts = [part for part in parts if len(part['key'])]
+    if not parts:
+        return empty_bins()
+    if len(parts) == 1:
+        return parts[0]
+    merged = {name: np.concatenate([part.pop(name) for part in parts]) for name in list(parts[0])}
+    return _reduce(merged['key'], merged['sum'], merged['count'], merged['min'], merged['max'])
+
+
+def bin_range(file_path, start, end, resolution):
+    if start == end:
+        return empty_bins()
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return bin_buffer(mm[start:end], resolution)
+
+
+def log_interval(file_path):
+    """The median time between samples of one direction at the head of a
+    log in ms, which is log_avg_msec for averaged logs."""
+    with open(file_path, 'rb') as f:
+        head = f.read(INTERVAL_PROBE_SIZE)
+    time, _, ddir = parse_log_buffer(head[:head.rfind(b'\n') + 1] if len(head) == INTERVAL_PROBE_SIZE else head)
+    steps = np.diff(time[ddir == ddir[0]]) if len(time) else np.empty(0)
+    steps = steps[steps > 0]
+    return float(np.median(steps)) if len(steps) else 1.0
+
+
+def load_logs_many(file_paths, resolution, max_workers=None, use_cache=True, chunk_size=CHUNK_SIZE):
+    """The bins of several fio logs, in the order of file_paths. Large logs
+    are split into chunks reduced in parallel, cached logs are not read."""
+    use_cache = use_cache and cache_enabled()
+    kind = f'{CACHE_KIND}-{resolution:g}ms'
+    results = [None] * len(file_paths)
+    work = []
+    for i, file_path in enumerate(file_paths):
+        if use_cache:
+            results[i] = cache_get(file_path, kind)
+        if results[i] is None:
+            work.extend((i, file_path, start, end) for start, end in chunk_ranges(file_path, chunk_size))
+
+    parts = {}
+    if len(work) == 1:
+        i, file_path, start, end = work[0]
+        parts[i] = [bin_range(file_path, start, end, resolution)]
+    elif work:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(i, executor.submit(bin_range, path, start, end, resolution)) for i, path, start, end in work]
+            for i, future in futures:
+                parts.setdefault(i, []).append(future.result())
+
+    for i in list(parts):
+        results[i] = merge_bins(parts.pop(i))
+        if use_cache:
+            cache_put(file_paths[i], kind, results[i])
+    return results
+
+
+def aggregate_logs(logs, kind, resolution, directions=DIRECTIONS):
+    """Combine the bins of the per job logs of one kind into dense series
+    {'time' (s), 'value', 'max'} over every bin from the first to the last
+    sample. 'max' is the highest latency of each bin, None for rates."""
+    wanted = [DIRECTIONS.index(direction) for direction in directions]
+    keys, means, sums, counts, maxima = [], [], [], [], []
+    for bins in logs:
+        selected = np.isin(bins['key'] % len(DIRECTIONS), wanted)
+        keys.append(bins['key'][selected] // len(DIRECTIONS))
+        means.append(bins['sum'][selected] / bins['count'][selected])
+        sums.append(bins['sum'][selected])
+        counts.append(bins['count'][selected])
+        maxima.append(bins['max'][selected])
+    key = np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+    if not len(key):
+        return {'time': np.empty(0), 'value': np.empty(0), 'max': None}
+    first = key.min()
+    slot = key - first
+    length = int(key.max() - first) + 1
+    time = (first + np.arange(length)) * resolution / 1000
+    if kind in RATE_KINDS:
+        # Every job and direction adds its own rate, a bin without any
+        # sample had no IO complete
+        value = np.bincount(slot, weights=np.concatenate(means), minlength=length)
+        return {'time': time, 'value': value, 'max': None}
+    total = np.bincount(slot, weights=np.concatenate(sums), minlength=length)
+    count = np.bincount(slot, weights=np.concatenate(counts), minlength=length)
+    maximum = np.full(length, -np.inf)
+    np.maximum.at(maximum, slot, np.concatenate(maxima))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        value = total / count
+    maximum[count == 0] = np.nan
+    return {'time': time, 'value': value, 'max': maximum}
+
+
+def find_stalls(time, value, threshold, resolution):
+    """Runs of bins where a rate falls below threshold percent of its
+    median, as (start s, duration s, lowest value), longest first."""
+    if not len(value):
+        return []
+    low = value < np.median(value) * threshold / 100
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], low.astype(np.int8), [0]])))
+    stalls = [(time[start], (end - start) * resolution / 1000, float(value[start:end].min()))
+              for start, end in zip(edges[0::2], edges[1::2])]
+    return sorted(stalls, key=lambda stall: -stall[1])
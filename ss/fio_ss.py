@@ -0,0 +1,168 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Shared fio steady-state JSON loading for the ss/ plotting tools.
+#
+# The tools only need jobs[i].steadystate.data.iops/bw out of the fio
+# output, so fio_json extracts just those arrays, as float64, without
+# decoding the latency percentiles and histograms of json+ output. The
+# arrays are kept in the parsed-series cache next to the sysbench logs and
+# load_steadystate_many() parses the uncached files of a fleet of drives in
+# parallel.
+#
+# Series of different lengths are lined up with pad_nan(), NaN padding
+# keeps them float64 where padding with None made pandas fall back to
+# object columns.
+
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from fio_json import extract_paths  # noqa: E402
+from series_cache import cache_enabled, cache_get, cache_put, cached_load  # noqa: E402
+
+CACHE_KIND = 'fio-ss-v1'
+SS_FILES = ['ss_iops.json', 'ss_bw.json']
+SS_PATHS = {
+    'iops': 'jobs[].steadystate.data.iops',
+    'bw': 'jobs[].steadystate.data.bw',
+}
+# What steady-state analysis needs besides the data arrays
+SS_JOB_PATHS = {
+    'jobname': 'jobs[].jobname',
+    'options': 'jobs[].job options',
+    'elapsed': 'jobs[].elapsed',
+    'job_runtime': 'jobs[].job_runtime',
+    'ss': 'jobs[].steadystate.ss',
+    'duration': 'jobs[].steadystate.duration',
+    'attained': 'jobs[].steadystate.attained',
+    'criterion': 'jobs[].steadystate.criterion',
+}
+FIO_TIME_RE = re.compile(r'^([\d.]+)\s*(us|ms|s|m|h|d)?$')
+FIO_TIME_UNITS = {'us': 1e-6, 'ms': 1e-3, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, None: 1}
+
+
+def steadystate_columns(file_path):
+    found = extract_paths(file_path, list(SS_PATHS.values()))
+    columns = {}
+    for metric, path in SS_PATHS.items():
+        for i, values in enumerate(found[path]):
+            columns[f'job{i}.{metric}'] = np.asarray(values, dtype=np.float64)
+    return columns
+
+
+def _jobs(columns):
+    jobs = []
+    i = 0
+    while f'job{i}.iops' in columns:
+        jobs.append({'steadystate': {'data': {
+            'iops': columns[f'job{i}.iops'],
+            'bw': columns[f'job{i}.bw'],
+        }}})
+        i += 1
+    return {'jobs': jobs}
+
+
+def load_steadystate(file_path, use_cache=True):
+    """Return the fio output as {'jobs': [{'steadystate': {'data': ...}}]}
+    holding only the iops and bw arrays, served from the cache."""
+    return _jobs(cached_load(file_path, CACHE_KIND, steadystate_columns, use_cache))
+
+
+def load_columns_many(file_paths, kind, loader, max_workers=None, use_cache=True):
+    """loader(file_path) for several files through the cache, parsing the
+    ones not cached in parallel. loader must be picklable, a module level
+    function or a partial of one. Results are in the order of file_paths."""
+    use_cache = use_cache and cache_enabled()
+    results = [None] * len(file_paths)
+    work = []
+    for i, file_path in enumerate(file_paths):
+        if use_cache:
+            results[i] = cache_get(file_path, kind)
+        if results[i] is None:
+            work.append(i)
+
+    if len(work) == 1:
+        results[work[0]] = loader(file_paths[work[0]])
+    elif work:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(i, executor.submit(loader, file_paths[i])) for i in work]
+            for i, future in futures:
+                results[i] = future.result()
+    for i in work:
+        if use_cache:
+            cache_put(file_paths[i], kind, results[i])
+    return results
+
+
+def load_steadystate_many(file_paths, max_workers=None, use_cache=True):
+    """load_steadystate() for several files, parsing the ones not cached
+    in parallel. Results are in the order of file_paths."""
+    results = load_columns_many(file_paths, CACHE_KIND, steadystate_columns, max_workers, use_cache)
+    return [_jobs(columns) for columns in results]
+
+
+def load_ss_directories(directories, max_workers=None, use_cache=True):
+    """Return one {file name: fio output} dict per directory, for the
+    SS_FILES present in it."""
+    found = [(d, name, os.path.join(d, name)) for d in directories for name in SS_FILES
+             if os.path.exists(os.path.join(d, name))]
+    loaded = load_steadystate_many([path for _, _, path in found], max_workers, use_cache)
+    data = {d: {} for d in directories}
+    for (d, name, _), output in zip(found, loaded):
+        data[d][name] = output
+    return [data[d] for d in directories]
+
+
+def pad_nan(values, length):
+    """values as a float64 array of exactly length entries, cut short or
+    padded with NaN."""
+    values = np.asarray(values, dtype=np.float64)[:length]
+    if len(values) < length:
+        values = np.concatenate([values, np.full(length - len(values), np.nan)])
+    return values
+
+
+def parse_fio_time(value):
+    """Seconds in a fio time value such as 240, 30s, 4m or 1h."""
+    match = FIO_TIME_RE.match(str(value).strip().lower())
+    if not match:
+        raise ValueError(f'Invalid fio time: {value}')
+    return float(match.group(1)) * FIO_TIME_UNITS[match.group(2)]
+
+
+def load_steadystate_jobs(file_path):
+    """The steady-state jobs of a fio output: name, fio's own criterion,
+    window and verdict, the data arrays and when the job ended."""
+    found = extract_paths(file_path, list(SS_JOB_PATHS.values()) + list(SS_PATHS.values()))
+    field = {name: found[path] for name, path in SS_JOB_PATHS.items()}
+    count = len(found[SS_PATHS['iops']])
+    # Paths are matched independently, per job fields only line up with the
+    # steady-state ones when every job has a steadystate section
+    aligned = len(field['jobname']) == count
+    jobs = []
+    for i in range(count):
+        options = field['options'][i] if aligned else {}
+        interval = parse_fio_time(options.get('steadystate_check_interval', options.get('ss_interval', 1)))
+        iops = np.asarray(found[SS_PATHS['iops']][i], dtype=np.float64)
+        # The data arrays hold the last samples of the run, end them there
+        if aligned and len(field['elapsed']) == count:
+            end = float(field['elapsed'][i])
+        elif aligned and len(field['job_runtime']) == count:
+            end = field['job_runtime'][i] / 1000
+        else:
+            end = len(iops) * interval
+        job = {
+            'file': file_path,
+            'jobname': field['jobname'][i] if aligned else f'job{i}',
+            'interval': interval,
+            'end': end,
+            'iops': iops,
+            'bw': np.asarray(found[SS_PATHS['bw']][i], dtype=np.float64),
+        }
+        for name in ('ss', 'duration', 'attained', 'criterion'):
+            job[name] = field[name][i] if len(field[name]) == count else None
+        jobs.append(job)
+    return jobs
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+
+import argparse
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.ticker import FuncFormatter
+from ss_plot import add_cache_arguments, format_latency, handle_cache_arguments, human_readable_bandwidth, ss_title, time_unit
+from fio_log import DIRECTIONS, LOG_KINDS, RATE_KINDS, aggregate_logs, find_logs, find_stalls, load_logs_many, log_interval, log_kind
+from downsample import add_downsample_arguments, downsample, pixel_width
+from stage_timer import checkpoint
+
+KIND_LABELS = {
+    'iops': 'IOPS',
+    'bw': 'Bandwidth',
+    'lat': 'Total latency',
+    'clat': 'Completion latency',
+    'slat': 'Submission latency',
+}
+KIND_COLORS = {'iops': '#FF0000', 'bw': '#0057B8', 'lat': '#00FF00', 'clat': '#FFC72C', 'slat': '#808080'}
+
+# Function to print the longest stalls of a rate series
+def print_stalls(kind, series, threshold, resolution, count=10):
+    stalls = find_stalls(series['time'], series['value'], threshold, resolution)
+    total = sum(duration for _, duration, _ in stalls)
+    print(f'{KIND_LABELS[kind]}: {len(stalls)} stalls below {threshold:g}% of the median, {total:.3f}s in total')
+    for start, duration, lowest in stalls[:count]:
+        print(f'  at {start:10.3f}s for {duration * 1000:8.0f}ms, down to {lowest:.0f}')
+
+# Function to plot one kind of log onto its own axis, decimated to the figure width
+def plot_kind(ax, kind, series, factor, method, width):
+    ax.set_facecolor('black')
+    ax.tick_params(which='both', colors='white')
+    ax.grid(True, color='gray')
+    ax.set_ylabel(KIND_LABELS[kind], color='white')
+    color = KIND_COLORS[kind]
+    time = series['time'] / factor
+    if series['max'] is not None:
+        # Latency is only known where IOs completed
+        known = np.isfinite(series['value'])
+        x, y = downsample(time[known], series['max'][known], method, width)
+        ax.plot(x, y, '-', color=color, linewidth=0.5, alpha=0.5, label=f'{KIND_LABELS[kind]} max')
+        x, y = downsample(time[known], series['value'][known], method, width)
+        ax.plot(x, y, '-', color='white', linewidth=0.8, label=f'{KIND_LABELS[kind]} mean')
+        ax.set_yscale('log')
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda v, pos: format_latency(v, 1)))
+        ax.yaxis.set_minor_formatter(FuncFormatter(lambda v, pos: format_latency(v, 1)))
+    else:
+        x, y = downsample(time, series['value'], method, width)
+        ax.plot(x, y, '-', color=color, linewidth=0.8, label=KIND_LABELS[kind])
+        ax.set_ylim(bottom=0)
+        if kind == 'bw':
+            # bw logs are in KiB/s
+            ax.yaxis.set_major_formatter(FuncFormatter(lambda v, pos: human_readable_bandwidth(v * 1024, pos)))
+    legend = ax.legend(loc='upper right', facecolor='black', edgecolor='gray')
+    for text in legend.get_texts():
+        text.set_color('white')
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Plot fio iops, bw and latency logs at fine time resolution.')
+    parser.add_argument('paths', type=str, nargs='+', help='fio log files, or directories holding them')
+    parser.add_argument('--kind', choices=LOG_KINDS, action='append', default=[],
+                        help='Kind of log to plot, may be repeated (default: all found)')
+    parser.add_argument('--direction', choices=DIRECTIONS, action='append', default=[],
+                        help='IO direction to plot, may be repeated (default: all)')
+    parser.add_argument('--resolution', type=float, default=None,
+                        help='Time bin in ms (default: the log interval, log_avg_msec for averaged logs)')
+    parser.add_argument('--stall', type=float, default=10.0,
+                        help='Report bins where IOPS or bandwidth fall below this percent of the median (default: 10)')
+    parser.add_argument('--title-prefix', type=str, default='', help='Prefix for the title of the graph')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of parser processes (default: number of CPUs)')
+    parser.add_argument('--output', type=str, default='fio_logs.png', help='Output image file')
+    add_downsample_arguments(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    use_cache = handle_cache_arguments(args)
+    logs = {}
+    for path in find_logs(args.paths):
+        kind = log_kind(path)
+        if kind is None:
+            parser.error(f'{path} is not named like a fio log: <prefix>_<iops|bw|lat|clat|slat>.<job>.log')
+        if not args.kind or kind in args.kind:
+            logs.setdefault(kind, []).append(path)
+    if not logs:
+        parser.error('no fio logs found')
+    if args.resolution is not None and args.resolution <= 0:
+        parser.error('--resolution must be positive')
+
+    kinds = [kind for kind in LOG_KINDS if kind in logs]
+    series = {}
+    for kind in kinds:
+        try:
+            # The coarsest interval of the logs, finer bins would leave holes
+            interval = max(log_interval(path) for path in logs[kind])
+            resolution = args.resolution or interval
+            bins = load_logs_many(logs[kind], resolution, args.jobs, use_cache)
+        except ValueError as e:
+            parser.error(str(e))
+        if kind in RATE_KINDS and resolution < interval:
+            print(f'Warning: {resolution:g}ms bins are finer than the {interval:g}ms interval of the {kind} logs, '
+                  'bins without samples read as no IO')
+        series[kind] = aggregate_logs(bins, kind, resolution, args.direction or DIRECTIONS)
+        print(f'{KIND_LABELS[kind]}: {len(logs[kind])} logs, {len(series[kind]["time"])} bins of {resolution:g}ms')
+        if kind in RATE_KINDS:
+            print_stalls(kind, series[kind], args.stall, resolution)
+    checkpoint('parse')
+
+    end = max((s['time'][-1] for s in series.values() if len(s['time'])), default=0)
+    factor, unit = time_unit(end)
+    fig, axes = plt.subplots(len(kinds), 1, figsize=(30, 5 * len(kinds) + 2), sharex=True, squeeze=False)
+    fig.patch.set_facecolor('black')
+    width = pixel_width(fig)
+    for ax, kind in zip(axes[:, 0], kinds):
+        plot_kind(ax, kind, series[kind], factor, args.downsample, width)
+    axes[-1, 0].set_xlabel(f'Time ({unit})', color='white')
+    fig.suptitle(ss_title(args.title_prefix, 'fio Logs Over Time'), color='white')
+    fig.tight_layout(pad=2.0)
+    checkpoint('render')
+    fig.savefig(args.output, facecolor=fig.get_facecolor())
+    checkpoint('savefig')
+    print(f'Log plot saved to {args.output}')
+
+if __name__ == '__main__':
+    main()
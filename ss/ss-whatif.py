@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+
+import argparse
+import json
+import os
+import matplotlib.pyplot as plt
+import numpy as np
+from fio_ss import SS_FILES, load_steadystate_jobs, parse_fio_time
+from steady_state import criterion_values, parse_criterion, steady_windows, window_intervals
+
+METRICS = ['iops', 'bw']
+
+# Function to expand drive directories into their fio steady-state outputs
+def input_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in SS_FILES if os.path.exists(os.path.join(path, name))]
+        else:
+            files.append(path)
+    return files
+
+# Function to format a time in seconds the way fio options take it
+def format_time(seconds):
+    for unit, size in (('h', 3600), ('m', 60)):
+        if seconds >= size and seconds % size == 0:
+            return f'{seconds // size:.0f}{unit}'
+    return f'{seconds:.0f}s'
+
+# Function to format a criterion value next to its limit
+def format_value(value, criterion):
+    if value is None or not np.isfinite(value):
+        return '-'
+    return f'{value:.6f}%' if criterion['percent'] else f'{value:.6f}'
+
+# Function to evaluate one criterion over every window of a job's data
+def evaluate(job, criterion, w):
+    values = job[criterion['column']]
+    interval = job['interval']
+    # The data holds the last samples of the run, the first starts here
+    first = job['end'] - len(values) * interval
+    result = {'criterion': criterion['spec'], 'window': w * interval}
+    if len(values) < w:
+        result['status'] = f'only {len(values) * interval:.0f}s of data'
+        return result, None
+    value = criterion_values(values, w, criterion, interval)
+    hits = np.flatnonzero(value <= criterion['limit'])
+    result.update({
+        'status': 'met' if len(hits) else 'never',
+        'met_at': first + (int(hits[0]) + w) * interval if len(hits) else None,
+        'final': float(value[-1]),
+        'best': float(np.min(value)),
+        'steady_fraction': float(len(hits) / len(value)),
+    })
+    times = first + (np.arange(len(value)) + w) * interval
+    return result, (times, value)
+
+# Function to evaluate all criteria together over every window of a job's data
+def evaluate_all(job, criteria, w):
+    interval = job['interval']
+    first = job['end'] - len(job['iops']) * interval
+    result = {'criterion': 'all', 'window': w * interval}
+    if len(job['iops']) < w:
+        result['status'] = f'only {len(job["iops"]) * interval:.0f}s of data'
+        return result
+    steady = steady_windows({metric: job[metric] for metric in METRICS}, w, criteria, interval)
+    hits = np.flatnonzero(steady)
+    result.update({
+        'status': 'met' if len(hits) else 'never',
+        'met_at': first + (int(hits[0]) + w) * interval if len(hits) else None,
+        'steady_fraction': float(steady.mean()),
+    })
+    return result
+
+# Function to print the results of one job
+def print_job(job, results):
+    verdict = {1: 'attained', 0: 'not attained'}.get(job['attained'], 'unknown')
+    first = job['end'] - len(job['iops']) * job['interval']
+    print(f'{job["file"]} {job["jobname"]}')
+    if job['ss']:
+        print(f'  fio: {job["ss"]} over {job["duration"]}s, {verdict}, criterion {job["criterion"]}')
+    print(f'  data covers {first:.0f}s to {job["end"]:.0f}s of the run')
+    print(f'  {"window":>8}  {"criterion":<24} {"met at":>10} {"final":>14} {"best":>14} {"steady":>7}')
+    for result in results:
+        if result['status'] not in ('met', 'never'):
+            print(f'  {format_time(result["window"]):>8}  {result["criterion"]:<24} {result["status"]}')
+            continue
+        met = format_time(result['met_at']) if result['met_at'] is not None else 'never'
+        criterion = parse_criterion(result['criterion']) if result['criterion'] != 'all' else None
+        final = format_value(result.get('final'), criterion) if criterion else ''
+        best = format_value(result.get('best'), criterion) if criterion else ''
+        print(f'  {format_time(result["window"]):>8}  {result["criterion"]:<24} {met:>10} {final:>14} {best:>14} '
+              f'{100 * result["steady_fraction"]:>6.1f}%')
+    shortest = [r for r in results if r['criterion'] == 'all' and r.get('met_at') is not None]
+    if shortest:
+        best = min(shortest, key=lambda r: (r['met_at'], r['window']))
+        print(f'  Earliest steady: window {format_time(best["window"])}, met at {format_time(best["met_at"])}')
+    print()
+
+# Function to plot the criterion values of every job over time against their limits
+def plot_criteria(curves, output):
+    fig, ax = plt.subplots(figsize=(20, 10))
+    for (label, criterion), (times, values) in curves:
+        line, = ax.plot(times, values, '-', linewidth=1, label=label)
+        ax.axhline(criterion['limit'], color=line.get_color(), linestyle=':', linewidth=1)
+    ax.set_yscale('log')
+    ax.set_xlabel('Time (seconds)')
+    ax.set_ylabel('Criterion value (dotted: limit)')
+    ax.set_title('Steady-state criteria recomputed over sliding windows')
+    ax.grid(True)
+    ax.legend(loc='upper right')
+    fig.tight_layout()
+    fig.savefig(output)
+    print(f'Criteria plot saved to {output}')
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Recompute fio steady-state criteria from the steadystate data of fio JSON output, with what-if thresholds and windows.')
+    parser.add_argument('paths', type=str, nargs='+', help='fio JSON output files, or directories holding ss_iops.json and/or ss_bw.json')
+    parser.add_argument('--criterion', type=str, action='append', default=[],
+                        help='fio criterion such as iops:10%% or bw_slope:0.5%%, may be repeated (default: each job\'s own)')
+    parser.add_argument('--window', type=str, action='append', default=[],
+                        help='Window such as 30m, 1h or seconds, may be repeated (default: each job\'s own ss_dur)')
+    parser.add_argument('--json', type=str, default=None, help='Write the results to this JSON file')
+    parser.add_argument('--plot', type=str, default=None, help='Plot the criterion values over time into this image file')
+    args = parser.parse_args()
+
+    try:
+        criteria = [parse_criterion(spec) for spec in args.criterion]
+        windows = [parse_fio_time(window) for window in args.window]
+    except ValueError as e:
+        parser.error(str(e))
+    for criterion in criteria:
+        if criterion['column'] not in METRICS:
+            parser.error(f'{criterion["spec"]}: fio steady-state data only holds {" and ".join(METRICS)}')
+
+    files = input_files(args.paths)
+    if not files:
+        parser.error('no fio JSON output found')
+    output = []
+    curves = []
+    for file_path in files:
+        for job in load_steadystate_jobs(file_path):
+            job_criteria = criteria or ([parse_criterion(job['ss'])] if job['ss'] else [])
+            job_windows = windows or ([job['duration']] if job['duration'] else [])
+            if not job_criteria or not job_windows:
+                print(f'{file_path} {job["jobname"]}: no criterion or window given and none in the fio output, skipped\n')
+                continue
+            results = []
+            for window in job_windows:
+                w = window_intervals(window, job['interval'])
+                for criterion in job_criteria:
+                    result, curve = evaluate(job, criterion, w)
+                    results.append(result)
+                    if curve is not None:
+                        label = f'{os.path.basename(file_path)} {job["jobname"]} {criterion["spec"]} {format_time(w * job["interval"])}'
+                        curves.append(((label, criterion), curve))
+                if len(job_criteria) > 1:
+                    results.append(evaluate_all(job, job_criteria, w))
+            print_job(job, results)
+            output.append({'file': file_path, 'jobname': job['jobname'], 'fio': {
+                'ss': job['ss'], 'duration': job['duration'], 'attained': job['attained'], 'criterion': job['criterion'],
+            }, 'results': results})
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f'Results written to {args.json}')
+    if args.plot and curves:
+        plot_criteria(curves, args.plot)
+
+if __name__ == '__main__':
+    main()
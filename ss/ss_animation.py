@@ -0,0 +1,172 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Progressive reveal animations of steady-state plots.
+#
+# FuncAnimation redraws the whole figure for every frame, and calling plot()
+# from the frame callback adds artists that are never removed, so every
+# frame draws more than the last. Here the figure is drawn once with the
+# revealed lines empty, and every frame only draws the points that became
+# visible since the previous one onto the same canvas, blit style, before
+# redrawing the overlays (the legend) on top. Each point is drawn exactly
+# once, so a whole animation costs about one full drawing of the data plus
+# a constant per frame.
+#
+# Frames are streamed as raw RGBA into an ffmpeg pipe, the video is never
+# held in memory. Without ffmpeg a GIF is still written through Pillow, one
+# palette frame at a time straight to the file, so memory stays flat with
+# either sink.
+
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+
+class FFmpegSink:
+    """Encode raw RGBA frames with an ffmpeg process fed through a pipe."""
+
+    def __init__(self, path, width, height, fps, reference=None):
+        self.path = path
+        if path.endswith('.gif'):
+            codec = ['-pix_fmt', 'rgb8']
+        else:
+            # x264 needs even dimensions
+            codec = ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', 'libx264', '-pix_fmt', 'yuv420p']
+        command = ['ffmpeg', '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(fps),
+                   '-i', '-'] + codec + [path]
+        self.stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=self.stderr)
+
+    def write(self, frame):
+        self.process.stdin.write(frame)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait():
+            self.stderr.seek(0)
+            raise RuntimeError(f'ffmpeg failed writing {self.path}: {self.stderr.read().decode().strip()}')
+        self.stderr.close()
+
+
+class PillowSink:
+    """Write a GIF with Pillow, encoding each frame as it comes: Image.save
+    would need all of them at the end. Every frame is mapped to the palette
+    of the reference frame, a single palette keeps both the mapping and the
+    encoding fast."""
+
+    def __init__(self, path, width, height, fps, reference=None):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.duration = 1000 / fps
+        self.palette = None
+        if reference is not None:
+            self.palette = self._image(reference).quantize(256, method=Image.Quantize.FASTOCTREE)
+        self.f = open(path, 'wb')
+        self.written = 0
+
+    def _image(self, frame):
+        return Image.frombuffer('RGBA', (self.width, self.height), frame, 'raw', 'RGBA', 0, 1).convert('RGB')
+
+    def write(self, frame):
+        image = self._image(frame)
+        if self.palette is None:
+            self.palette = image.quantize(256, method=Image.Quantize.FASTOCTREE)
+        image = image.quantize(palette=self.palette, dither=Image.Dither.NONE)
+        if not self.written:
+            # The global palette and the loop forever extension
+            header, _ = GifImagePlugin.getheader(image, info={'loop': 0, 'optimize': False})
+            self.f.write(b''.join(header))
+        self.f.write(b''.join(GifImagePlugin.getdata(image, duration=self.duration)))
+        self.written += 1
+
+    def close(self):
+        if self.written:
+            self.f.write(b';')
+        self.f.close()
+
+
+def open_sink(path, width, height, fps, reference=None):
+    """A frame sink for path, reference is a frame with all the colors of
+    the animation, used when the sink needs a palette."""
+    if shutil.which('ffmpeg'):
+        return FFmpegSink(path, width, height, fps)
+    if path.endswith('.gif'):
+        print('ffmpeg not found, writing the GIF with Pillow', file=sys.stderr)
+        return PillowSink(path, width, height, fps, reference)
+    raise RuntimeError(f'ffmpeg is needed to write {path}')
+
+
+def reveal_counts(x, edges):
+    """Points of a series with sorted x visible once the reveal reached
+    each of edges."""
+    return np.searchsorted(x, edges, side='right')
+
+
+class RevealAnimation:
+    """Animate lines of an already laid out figure appearing from left to
+    right, all at the same pace along the x axis. lines are Line2D artists
+    holding their full data sorted by x, overlays are artists redrawn on
+    top of every frame."""
+
+    def __init__(self, fig, lines, overlays=()):
+        self.fig = fig
+        self.lines = lines
+        self.overlays = overlays
+        self.data = [tuple(np.asarray(a) for a in line.get_data(orig=True)) for line in lines]
+
+    def _draw_background(self):
+        for line in self.lines:
+            line.set_data([], [])
+        self.fig.canvas.draw()
+
+    def frames(self, count, hold_start=0, hold_end=0):
+        """Draw the animation and yield each frame as an RGBA buffer, valid
+        until the next frame is drawn."""
+        canvas = self.fig.canvas
+        self._draw_background()
+        frame = canvas.buffer_rgba()
+        for _ in range(hold_start):
+            yield frame
+        shown = [0] * len(self.lines)
+        starts = [x[0] for x, _ in self.data if len(x)]
+        ends = [x[-1] for x, _ in self.data if len(x)]
+        edges = np.linspace(min(starts, default=0), max(ends, default=0), count + 1)[1:]
+        counts = [reveal_counts(x, edges) for x, _ in self.data]
+        for i in range(count):
+            for j, (line, (x, y)) in enumerate(zip(self.lines, self.data)):
+                end = counts[j][i]
+                if end == shown[j]:
+                    continue
+                # Connected lines need the previous point to join the new ones
+                start = shown[j] if line.get_linestyle() in ('None', 'none', '') else max(shown[j] - 1, 0)
+                line.set_data(x[start:end], y[start:end])
+                line.axes.draw_artist(line)
+                shown[j] = end
+            for artist in self.overlays:
+                self.fig.draw_artist(artist)
+            frame = canvas.buffer_rgba()
+            yield frame
+        for _ in range(hold_end):
+            yield frame
+        # Leave the figure showing everything
+        for line, (x, y) in zip(self.lines, self.data):
+            line.set_data(x, y)
+
+    def save(self, path, count, fps=20, hold_start=0, hold_end=0):
+        # The complete figure holds every color of the animation
+        canvas = self.fig.canvas
+        canvas.draw()
+        width, height = int(canvas.get_renderer().width), int(canvas.get_renderer().height)
+        sink = open_sink(path, width, height, fps, bytes(canvas.buffer_rgba()))
+        written = 0
+        try:
+            for frame in self.frames(count, hold_start, hold_end):
+                sink.write(frame)
+                written += 1
+        finally:
+            sink.close()
+        return written
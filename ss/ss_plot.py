@@ -0,0 +1,228 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Shared plotting for the fio steady-state tools.
+#
+# Every ss/ tool plots the same eight series of a drive directory: the IOPS
+# and bandwidth arrays of the mean (job 0) and slope (job 1) steady-state
+# jobs of ss_iops.json and ss_bw.json. SERIES describes them once, drives
+# are loaded into {'name', 'dir', 'series': {label: array}} dicts by
+# load_drives(), and plot_drive() draws one drive onto an IOPS axis and its
+# bandwidth twin, so a tool only decides which drives go on which axes:
+#
+#   plot-fio-steady-state.py   one drive
+#   compare-ss.py              two drives overlaid, the second one drifted
+#   compare-ss-animate.py      two drives overlaid, the first one revealed
+#   compare-ss-fleet.py        any number of drives, as a grid or overlaid
+
+import os
+import re
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.ticker import FuncFormatter
+from fio_ss import load_ss_directories
+from series_cache import add_cache_arguments, handle_cache_arguments  # noqa: F401
+
+# (file, job, metric, label, marker, color, marker size scale, alpha scale)
+SERIES = [
+    ('ss_iops.json', 0, 'iops', 'Mean IOPS', 'o', 'red', 1.0, 1.0),
+    ('ss_iops.json', 1, 'iops', 'Slope IOPS', 'o', 'contrast_yellow', 0.5, 0.5),
+    ('ss_bw.json', 0, 'iops', 'Mean IOPS (BW)', 'o', 'green', 1.0, 1.0),
+    ('ss_bw.json', 1, 'iops', 'Slope IOPS (BW)', 'o', 'yellow', 0.5, 0.5),
+    ('ss_iops.json', 0, 'bw', 'Mean Bandwidth (KB/s)', 'x', 'blue', 0.5, 1.0),
+    ('ss_iops.json', 1, 'bw', 'Slope Bandwidth (KB/s)', 'x', 'contrast_blue', 0.25, 0.5),
+    ('ss_bw.json', 0, 'bw', 'Mean Bandwidth (KB/s) (BW)', 'x', 'grey', 0.5, 1.0),
+    ('ss_bw.json', 1, 'bw', 'Slope Bandwidth (KB/s) (BW)', 'x', 'white', 0.25, 0.5),
+]
+SERIES_LABELS = [series[3] for series in SERIES]
+
+# Our color palette
+BASE_COLORS = {
+    'red': '#FF0000',
+    'green': '#00FF00',
+    'blue': '#0000FF',
+    'yellow': '#FFFF00',
+    'grey': '#808080',
+    'white': '#FFFFFF',
+    'contrast_red': '#E4002B',
+    'contrast_yellow': '#FFC72C',
+    'contrast_blue': '#0057B8',
+}
+
+
+def add_ss_arguments(parser):
+    """Options shared by all the steady-state plotting tools."""
+    parser.add_argument('--title-prefix', type=str, default='', help='Prefix for the title of the graph')
+    parser.add_argument('--iops-max', type=float, default=None, help='Maximum value for IOPS y-axis')
+    parser.add_argument('--bw-max', type=str, default=None, help='Maximum value for Bandwidth y-axis (e.g., 1.8GB/s, 8MB/s, 400KB/s, 500B/s)')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of parser processes (default: number of CPUs)')
+    add_cache_arguments(parser)
+
+
+def drive_name(directory):
+    return os.path.basename(os.path.normpath(os.path.abspath(directory)))
+
+
+def drive_names(directories, reserved=()):
+    """Names telling drive directories apart: the directory name, qualified
+    with its path when another drive shares it or it is reserved."""
+    names = [drive_name(directory) for directory in directories]
+    qualified = []
+    for directory, name in zip(directories, names):
+        if name in reserved:
+            name = os.path.abspath(directory)
+        elif names.count(name) > 1:
+            name = os.path.normpath(directory)
+        qualified.append(name)
+    return qualified
+
+
+def load_drives(directories, max_workers=None, use_cache=True):
+    """Load the steady-state series of each drive directory in parallel.
+    Drives without any fio JSON output are left out."""
+    drives = []
+    for directory, data in zip(directories, load_ss_directories(directories, max_workers, use_cache)):
+        series = {}
+        for file, job, metric, label, *_ in SERIES:
+            jobs = data.get(file, {'jobs': []})['jobs']
+            if job < len(jobs):
+                series[label] = jobs[job]['steadystate']['data'][metric]
+        if series:
+            drives.append({'dir': directory, 'series': series})
+    # Drives are told apart by name, qualify duplicates with their path
+    for drive, name in zip(drives, drive_names([drive['dir'] for drive in drives])):
+        drive['name'] = name
+    return drives
+
+
+def time_unit(seconds):
+    """The time factor and unit for an axis spanning seconds."""
+    if seconds >= 3600:
+        return 3600, 'hours'
+    if seconds >= 60:
+        return 60, 'minutes'
+    return 1, 'seconds'
+
+
+def time_scale(drives):
+    """The time factor and unit for the longest series of the drives, one
+    steady-state entry per second."""
+    return time_unit(max((len(values) for drive in drives for values in drive['series'].values()), default=0))
+
+
+def format_latency(ns, precision=2):
+    """A latency in nanoseconds with a readable unit, '-' when unknown."""
+    if not np.isfinite(ns):
+        return '-'
+    for unit, size in (('s', 1e9), ('ms', 1e6), ('us', 1e3)):
+        if ns >= size:
+            return f'{ns / size:.{precision}f}{unit}'
+    return f'{ns:.0f}ns'
+
+
+def series_time(values, factor):
+    return np.arange(1, len(values) + 1) / factor
+
+
+def human_readable_bandwidth(x, pos):
+    if x >= 1e9:
+        return f'{x*1e-9:.1f} GB/s'
+    elif x >= 1e6:
+        return f'{x*1e-6:.1f} MB/s'
+    elif x >= 1e3:
+        return f'{x*1e-3:.1f} KB/s'
+    else:
+        return f'{x:.1f} B/s'
+
+
+def parse_shorthand_bandwidth(value):
+    units = {"B/s": 1, "KB/s": 1e3, "MB/s": 1e6, "GB/s": 1e9}
+    match = re.match(r"([0-9.]+)([a-zA-Z/]+)", value)
+    if match:
+        num, unit = match.groups()
+        return float(num) * units[unit]
+    return float(value)  # Default to B/s if no unit is specified
+
+
+def drift_color(color, red_drift, green_drift, blue_drift):
+    r = min(max(int(color[1:3], 16) + red_drift, 0), 255)
+    g = min(max(int(color[3:5], 16) + green_drift, 0), 255)
+    b = min(max(int(color[5:7], 16) + blue_drift, 0), 255)
+    return f'#{r:02X}{g:02X}{b:02X}'
+
+
+def drifted_colors(red_drift, green_drift, blue_drift):
+    return {name: drift_color(color, red_drift, green_drift, blue_drift) for name, color in BASE_COLORS.items()}
+
+
+def fleet_colors(count):
+    """One distinct color per drive, from tab10 or tab20 for larger fleets."""
+    cmap = plt.get_cmap('tab10' if count <= 10 else 'tab20')
+    return [cmap(i % cmap.N) for i in range(count)]
+
+
+def setup_axes(ax1, time_unit):
+    """Style an IOPS axis black and add its bandwidth twin, returned."""
+    ax2 = ax1.twinx()
+    for ax in (ax1, ax2):
+        ax.set_facecolor('black')
+        ax.tick_params(axis='y', labelcolor='white')
+    ax1.tick_params(axis='x', labelcolor='white')
+    ax1.set_xlabel(f'Time ({time_unit})', color='white')
+    ax1.set_ylabel('IOPS', color='white')
+    ax1.grid(True, color='gray')
+    ax2.set_ylabel('Bandwidth', color='white')
+    ax2.yaxis.set_major_formatter(FuncFormatter(human_readable_bandwidth))
+    return ax2
+
+
+def set_limits(ax1, ax2, iops_max=None, bw_max=None):
+    """Start both y-axes at 0, call once the data is plotted as fixing a
+    limit stops autoscaling."""
+    ax1.set_ylim(bottom=0)
+    if iops_max:
+        ax1.set_ylim(top=iops_max)
+    ax2.set_ylim(bottom=0)
+    if bw_max:
+        ax2.set_ylim(top=parse_shorthand_bandwidth(bw_max))
+
+
+def plot_drive(ax1, ax2, drive, factor, colors=BASE_COLORS, marker_size=2, alpha=1.0,
+               labels=None, label_format='{series} ({drive})', slope_alpha=None):
+    """Plot the series of a drive, IOPS on ax1 and bandwidth on ax2.
+    colors maps the SERIES color names, or is a single color for all of
+    them. labels limits the series plotted. label_format may use {series},
+    {quantity}, the label without its (BW) file marker, {file}, the fio
+    output without .json, and {drive}. The slope series are drawn at
+    slope_alpha, alpha scaled as in SERIES by default. Returns the Line2D
+    artists."""
+    lines = []
+    for file, job, metric, label, marker, color, size_scale, alpha_scale in SERIES:
+        if label not in drive['series'] or (labels is not None and label not in labels):
+            continue
+        values = drive['series'][label]
+        ax = ax1 if metric == 'iops' else ax2
+        line_alpha = slope_alpha if job == 1 and slope_alpha is not None else alpha * alpha_scale
+        line, = ax.plot(series_time(values, factor), values, marker, linestyle='none',
+                        markersize=marker_size * size_scale, alpha=line_alpha,
+                        color=colors[color] if isinstance(colors, dict) else colors,
+                        label=label_format.format(series=label, quantity=label.removesuffix(' (BW)'),
+                                                  file=file.removesuffix('.json'), drive=drive['name']))
+        lines.append(line)
+    return lines
+
+
+def add_legend(fig, handles=None, light=True, markerscale=2, **kwargs):
+    """The figure legend in the upper right, on white or on black."""
+    args = (handles, [h.get_label() for h in handles]) if handles is not None else ()
+    kwargs.setdefault('loc', 'upper right')
+    kwargs.setdefault('bbox_to_anchor', (0.85, 0.90))
+    legend = fig.legend(*args, facecolor='black', edgecolor='black', markerscale=markerscale, **kwargs)
+    for text in legend.get_texts():
+        text.set_color('black' if light else 'white')
+    legend.get_frame().set_facecolor('white' if light else 'black')
+    legend.get_frame().set_edgecolor('white' if light else 'black')
+    return legend
+
+
+def ss_title(title_prefix, what='Steady-State IOPS and Bandwidth Over Time'):
+    return f'{title_prefix} {what}'.strip()
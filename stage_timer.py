@@ -0,0 +1,41 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Stage timings for benchmark-tools.py.
+#
+# The benchmark runs every plotting tool the way it is used, as a fresh
+# process, and wants to know where its time goes: parsing the input,
+# building DataFrames, drawing and writing the image. The tools call
+# checkpoint('parse') and friends at the end of each stage, which charges
+# the wall time since the previous checkpoint to that stage. Stages inside a
+# loop accumulate.
+#
+# When PLOT_SYSBENCH_TIMINGS names a file the accumulated stage times are
+# written there as JSON when the process exits. Otherwise a checkpoint is
+# one clock read.
+
+import atexit
+import json
+import os
+import time
+
+TIMINGS_ENV = 'PLOT_SYSBENCH_TIMINGS'
+
+_timings = {}
+_last = time.perf_counter()
+
+
+def checkpoint(stage):
+    """Charge the time since the previous checkpoint to stage."""
+    global _last
+    now = time.perf_counter()
+    _timings[stage] = _timings.get(stage, 0.0) + now - _last
+    _last = now
+
+
+def _write_timings(path):
+    with open(path, 'w') as f:
+        json.dump(_timings, f)
+
+
+if os.environ.get(TIMINGS_ENV):
+    atexit.register(_write_timings, os.environ[TIMINGS_ENV])
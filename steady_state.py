@@ -0,0 +1,211 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Steady-state detection for sysbench interval series.
+#
+# Criteria follow fio's steadystate= option, applied to a sysbench column
+# over a sliding window:
+#
+#   tps:10%         every value in the window is within 10% of the window mean
+#   tps_slope:0.1%  the least-squares slope of the window, in units per
+#                   second, is within 0.1% of the window mean
+#
+# Without a trailing % the limit is absolute. Any interval column can be
+# used (tps, qps, lat95, ...). A window is steady when all criteria hold.
+#
+# Window sums of y, k * y for the slope, come from cumulative sums, and the
+# window minimum and maximum from the van Herk / Gil-Werman block scan, so
+# every window of an n interval run is evaluated in O(n) vectorized work
+# regardless of the window length.
+#
+# SteadyStateMonitor evaluates the same criteria incrementally on a run in
+# progress so it can be stopped once they have held for a full window.
+
+import re
+import numpy as np
+
+CRITERION_RE = re.compile(r'^(\w+?)(_slope)?:([\d.]+)(%?)$')
+DEFAULT_CRITERIA = ['tps:10%', 'tps_slope:0.01%']
+# The defaults as argparse help text, which is %-formatted
+DEFAULT_CRITERIA_HELP = ' '.join(DEFAULT_CRITERIA).replace('%', '%%')
+
+
+def parse_criterion(spec):
+    """Parse a fio style criterion such as tps:10% or tps_slope:0.1%."""
+    match = CRITERION_RE.match(spec)
+    if not match:
+        raise ValueError(f'Invalid steady-state criterion: {spec}')
+    column, slope, limit, pct = match.groups()
+    return {
+        'spec': spec,
+        'column': column,
+        'kind': 'slope' if slope else 'deviation',
+        'limit': float(limit),
+        'percent': bool(pct),
+    }
+
+
+def report_interval(times):
+    """Seconds between sysbench reports, from the interval timestamps."""
+    if len(times) < 2:
+        return 1
+    return max(1, int(np.median(np.diff(times))))
+
+
+def window_intervals(window, interval):
+    return max(2, int(round(window / interval)))
+
+
+def rolling_sum(values, w):
+    prefix = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    return prefix[w:] - prefix[:-w]
+
+
+def _rolling_extreme(values, w, reduce):
+    # van Herk / Gil-Werman: within blocks of w, a forward running extreme
+    # and a backward one; every window spans the tail of one block and the
+    # head of the next, so its extreme is one reduce of the two.
+    n = len(values)
+    pad = -(-n // w) * w - n
+    fill = -np.inf if reduce is np.maximum else np.inf
+    blocks = np.concatenate([values, np.full(pad, fill)]).reshape(-1, w)
+    forward = reduce.accumulate(blocks, axis=1).ravel()
+    backward = reduce.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return reduce(backward[:n - w + 1], forward[w - 1:n])
+
+
+def rolling_max(values, w):
+    return _rolling_extreme(np.asarray(values, dtype=np.float64), w, np.maximum)
+
+
+def rolling_min(values, w):
+    return _rolling_extreme(np.asarray(values, dtype=np.float64), w, np.minimum)
+
+
+def rolling_slope(values, w, interval=1):
+    """Least-squares slope of every window of w values, per second."""
+    values = np.asarray(values, dtype=np.float64)
+    k = np.arange(len(values), dtype=np.float64)
+    sum_y = rolling_sum(values, w)
+    # Sum of j * y[i + j] over the window starting at i, with j = 0..w-1
+    sum_jy = rolling_sum(k * values, w) - k[:len(sum_y)] * sum_y
+    sum_j = w * (w - 1) / 2
+    sum_jj = (w - 1) * w * (2 * w - 1) / 6
+    slope = (w * sum_jy - sum_j * sum_y) / (w * sum_jj - sum_j ** 2)
+    return slope / interval
+
+
+def criterion_values(values, w, criterion, interval=1):
+    """Criterion value of every window, comparable to criterion['limit']."""
+    values = np.asarray(values, dtype=np.float64)
+    mean = rolling_sum(values, w) / w
+    if criterion['kind'] == 'slope':
+        value = np.abs(rolling_slope(values, w, interval))
+    else:
+        value = np.maximum(rolling_max(values, w) - mean, mean - rolling_min(values, w))
+    if criterion['percent']:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = np.where(mean != 0, 100 * value / np.abs(mean), np.inf)
+    return value
+
+
+def steady_windows(columns, w, criteria, interval=1):
+    """Boolean per window start, True where every criterion holds."""
+    steady = None
+    for criterion in criteria:
+        holds = criterion_values(columns[criterion['column']], w, criterion, interval) <= criterion['limit']
+        steady = holds if steady is None else steady & holds
+    return steady
+
+
+def detect_steady_state(columns, criteria, window=1800, ramp=0):
+    """Find the first window, starting after ramp seconds, over which all
+    criteria hold. Everything before that window is warm-up."""
+    times = columns['time']
+    interval = report_interval(times)
+    w = window_intervals(window, interval)
+    result = {
+        'criteria': [c['spec'] for c in criteria],
+        'window': w * interval,
+        'ramp': ramp,
+        'report_interval': interval,
+        'intervals': len(times),
+        'steady': False,
+    }
+    first = int(np.searchsorted(times, ramp))
+    if len(times) - first < w:
+        return result
+    sliced = {c['column']: columns[c['column']][first:] for c in criteria}
+    steady = steady_windows(sliced, w, criteria, interval)
+    hits = np.flatnonzero(steady)
+    if not len(hits):
+        return result
+    start = first + int(hits[0])
+    result.update({
+        'steady': True,
+        'start_index': start,
+        'start_time': int(times[start]),
+        'reached_time': int(times[start + w - 1]),
+        'warmup_intervals': start,
+        'steady_fraction': float(steady.mean()),
+    })
+    for c in criteria:
+        values = columns[c['column']][start:start + w]
+        result[c['spec']] = float(criterion_values(values, w, c, interval)[0])
+    return result
+
+
+def trim_warmup(columns, result):
+    """Columns without the warm-up intervals found by detect_steady_state."""
+    if not result['steady']:
+        return columns
+    return {name: values[result['start_index']:] for name, values in columns.items()}
+
+
+class SteadyStateMonitor:
+    """Evaluate steady-state criteria on a live run. Each update checks
+    every window ending in the newly fed intervals, so a large batch (for
+    example when attaching to a run in progress) still stops at the first
+    steady window."""
+
+    def __init__(self, criteria, window=1800, ramp=0):
+        self.criteria = criteria
+        self.window = window
+        self.ramp = ramp
+        self.names = sorted({'time'} | {c['column'] for c in criteria})
+        self.tail = {name: np.empty(0) for name in self.names}
+        self.count = 0
+        self.result = None
+
+    def update(self, columns):
+        """Feed newly parsed intervals and return True once a full window
+        has been steady."""
+        if len(columns['time']) == 0:
+            return self.result is not None and self.result['steady']
+        data = {name: np.concatenate([self.tail[name], np.asarray(columns[name], dtype=np.float64)])
+                for name in self.names}
+        self.count += len(columns['time'])
+        interval = report_interval(data['time'])
+        w = window_intervals(self.window, interval)
+        # Windows still to be checked next time start in the last w - 1 intervals
+        self.tail = {name: values[-(w - 1):] for name, values in data.items()}
+        self.result = {
+            'steady': False,
+            'time': int(data['time'][-1]),
+            'window': w * interval,
+        }
+        if len(data['time']) < w:
+            return False
+        steady = steady_windows(data, w, self.criteria, interval) & (data['time'][:len(data['time']) - w + 1] >= self.ramp)
+        hits = np.flatnonzero(steady)
+        if not len(hits):
+            return False
+        start = int(hits[0])
+        self.result.update({
+            'steady': True,
+            'start_time': int(data['time'][start]),
+            'time': int(data['time'][start + w - 1]),
+        })
+        for c in self.criteria:
+            values = data[c['column']][start:start + w]
+            self.result[c['spec']] = float(criterion_values(values, w, c, interval)[0])
+        return True
@@ -0,0 +1,181 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Constant-memory, mergeable summaries of sysbench columns.
+#
+# Moments are tracked with Welford's method, and batches are folded in with
+# the pairwise update from Chan et al., so a summary can be fed one chunk at
+# a time and summaries of separate chunks can be merged exactly.
+#
+# Quantiles come from a log-bucketed sketch in the spirit of DDSketch / HDR
+# histograms: a value v > 0 lands in bucket ceil(log(v) / log(gamma)) with
+# gamma = (1 + alpha) / (1 - alpha), so any reported quantile is within a
+# relative error of alpha of a true sample. Bucket counts simply add up when
+# two sketches are merged, and the number of buckets only grows with the
+# dynamic range of the data, not with the number of samples.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sysbench_parse import CHUNK_SIZE, chunk_ranges, parse_buffer, parse_range
+
+SUMMARY_COLUMNS = ('tps', 'lat95')
+
+
+class Moments:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _combine(self, count, mean, m2, vmin, vmax):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, vmin)
+        self.max = max(self.max, vmax)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        mean = values.mean()
+        self._combine(len(values), mean, ((values - mean) ** 2).sum(), values.min(), values.max())
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+class QuantileSketch:
+    def __init__(self, alpha=0.001):
+        self.alpha = alpha
+        self.log_gamma = np.log((1 + alpha) / (1 - alpha))
+        self.counts = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+        keys, counts = np.unique(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError('Cannot merge quantile sketches with different accuracy')
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.nan
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        keys = np.array(sorted(self.counts))
+        cumulative = self.zero_count + np.cumsum([self.counts[k] for k in keys])
+        key = keys[np.searchsorted(cumulative, rank, side='right')]
+        # Midpoint of the bucket (gamma^(key-1), gamma^key] in relative terms
+        return 2 * np.exp(key * self.log_gamma) / (np.exp(self.log_gamma) + 1)
+
+
+class Summary:
+    """Streaming summary of one column: moments plus a quantile sketch."""
+
+    def __init__(self, alpha=0.001):
+        self.moments = Moments()
+        self.sketch = QuantileSketch(alpha)
+
+    def update(self, values):
+        self.moments.update(values)
+        self.sketch.update(values)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def as_dict(self):
+        return {
+            'count': int(self.moments.count),
+            'mean': float(self.moments.mean),
+            'median': float(self.sketch.quantile(0.5)),
+            'std': float(self.moments.std),
+            'variance': float(self.moments.variance),
+            'min': float(self.moments.min),
+            'max': float(self.moments.max),
+            'p95': float(self.sketch.quantile(0.95)),
+            'p99': float(self.sketch.quantile(0.99)),
+        }
+
+
+def summarize_columns(columns, names=SUMMARY_COLUMNS):
+    summaries = {name: Summary() for name in names}
+    for name in names:
+        summaries[name].update(columns[name])
+    return summaries
+
+
+def merge_summaries(parts):
+    merged = None
+    for part in parts:
+        if merged is None:
+            merged = part
+        else:
+            for name, summary in part.items():
+                merged[name].merge(summary)
+    return merged
+
+
+def _summarize_range(file_path, start, end, names):
+    return summarize_columns(parse_range(file_path, start, end), names)
+
+
+def summarize_file(file_path, names=SUMMARY_COLUMNS, chunk_size=CHUNK_SIZE):
+    """Summarize a sysbench log in a single pass holding at most one chunk
+    of it in memory."""
+    summaries = {name: Summary() for name in names}
+    partial = b''
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            buf = partial + block
+            cut = buf.rfind(b'\n') + 1
+            partial = buf[cut:]
+            merge_summaries([summaries, summarize_columns(parse_buffer(buf[:cut]), names)])
+    if partial:
+        merge_summaries([summaries, summarize_columns(parse_buffer(partial), names)])
+    return summaries
+
+
+def summarize_file_parallel(file_path, names=SUMMARY_COLUMNS, max_workers=None, chunk_size=CHUNK_SIZE):
+    """Summarize newline-aligned chunks of a log in worker processes and
+    merge the partial summaries."""
+    ranges = chunk_ranges(file_path, chunk_size)
+    if len(ranges) == 1 or max_workers == 1 or os.cpu_count() == 1:
+        return summarize_file(file_path, names, chunk_size)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_summarize_range, file_path, start, end, names) for start, end in ranges]
+        return merge_summaries(future.result() for future in futures)
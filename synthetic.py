@@ -0,0 +1,327 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Synthetic sysbench output.
+#
+# Exercising the runner, the parsers and the plots should not need Docker,
+# MySQL or twelve hours. We emit logs in the exact format of sysbench 1.0:
+# the run options header, one interval line per report interval and the
+# final statistics block, so every tool in this repository reads them like
+# the real thing.
+#
+# The model is deliberately simple but has the features the analysis tools
+# look for:
+#
+#   - throughput follows the Universal Scalability Law in the thread count
+#   - each mysql.cnf gets a fixed, arbitrary throughput factor derived from
+#     a hash of its contents, so cnf variants differ reproducibly
+#   - intervals carry AR(1) noise, an optional warm-up ramp and optional
+#     periodic dips
+#   - 95th percentile latency follows Little's law and is quantized to the
+#     buckets of the sysbench latency histogram
+#
+# Everything is seeded, so the same parameters produce the same log.
+#
+# Logs are generated and formatted in chunks of CHUNK_INTERVALS with the
+# AR(1) state carried across chunks, so a 1e7 interval log (the size of a
+# few months of 1s reports) is written in bounded memory, the summary's 95th
+# percentile comes from a quantile sketch of the interval values. The same
+# holds for the fio steady-state JSON output, whose per-second iops and bw
+# arrays are written straight from NumPy.
+
+import hashlib
+import json
+import time as _time
+import numpy as np
+from scipy.signal import lfilter
+from scalability import usl_throughput as _usl_throughput
+from streaming_stats import QuantileSketch
+
+SYSBENCH_VERSION = '1.0.17'
+
+# Universal Scalability Law: X(N) = lambda * N / (1 + sigma (N - 1) + kappa N (N - 1))
+USL_LAMBDA = 200.0
+USL_SIGMA = 0.02
+USL_KAPPA = 0.00005
+
+# sysbench keeps latencies in a 1024 bucket log histogram over [0.001, 100000] ms
+HISTOGRAM_BUCKETS = 1024
+HISTOGRAM_MIN = 0.001
+HISTOGRAM_MAX = 100000.0
+
+CHUNK_INTERVALS = 1 << 20
+
+# fio steady-state jobs as fio-3.37 names them, per steady-state kind
+FIO_SS_JOBS = {
+    'iops': [('steady-state-mean-iops', 'iops', 20.0), ('steady-state-slope-iops', 'iops_slope', 10.0)],
+    'bw': [('steady-state-mean-bw', 'bw', 20.0), ('steady-state-slope-bw', 'bw_slope', 10.0)],
+}
+FIO_BLOCK_SIZE = 128 * 1024
+# fio JSON is stamped at FIO_EPOCH plus the seed, 2024-01-01 00:00:00 UTC
+FIO_EPOCH = 1704067200
+
+
+def usl_throughput(threads, lam=USL_LAMBDA, sigma=USL_SIGMA, kappa=USL_KAPPA):
+    return _usl_throughput(threads, lam, sigma, kappa)
+
+
+def cnf_factor(cnf_text):
+    """Arbitrary but reproducible throughput factor in [0.9, 1.1] for a
+    mysql.cnf, ignoring comments and blank lines."""
+    if not cnf_text:
+        return 1.0
+    settings = [line.split('#')[0].strip() for line in cnf_text.splitlines()]
+    digest = hashlib.blake2b('\n'.join(s for s in settings if s).encode(), digest_size=8).digest()
+    return 0.9 + 0.2 * int.from_bytes(digest, 'little') / 2 ** 64
+
+
+def quantize_latency(ms):
+    """Round latencies to the bucket values the sysbench histogram reports."""
+    deduct = np.log(HISTOGRAM_MIN)
+    mult = (HISTOGRAM_BUCKETS - 1) / (np.log(HISTOGRAM_MAX) - deduct)
+    bucket = np.ceil((np.log(np.maximum(ms, HISTOGRAM_MIN)) - deduct) * mult)
+    return np.exp(bucket / mult + deduct)
+
+
+def _ar1(rng, n, noise, state, phi=0.9):
+    """n AR(1) samples continuing from state (None to start afresh),
+    filtered in C by lfilter. Returns the samples and the last one."""
+    shocks = rng.normal(0, noise * np.sqrt(1 - phi ** 2), n)
+    if state is None:
+        shocks[0] = rng.normal(0, noise)
+        ar = lfilter([1.0], [1.0, -phi], shocks)
+    else:
+        ar = lfilter([1.0], [1.0, -phi], shocks, zi=[phi * state])[0]
+    return ar, ar[-1]
+
+
+def synthetic_chunks(duration, threads=128, interval=2, cnf_text=None, seed=0, noise=0.01,
+                     warmup=0, dip_period=0, dip_depth=0.05, chunk=CHUNK_INTERVALS):
+    """Yield the interval columns of a synthetic run, chunk intervals at a
+    time, as parse_sysbench() returns them."""
+    rng = np.random.default_rng(seed)
+    n = max(1, int(duration // interval))
+    level = usl_throughput(threads) * cnf_factor(cnf_text)
+    state = None
+    for first in range(0, n, chunk):
+        count = min(chunk, n - first)
+        time = (np.arange(first + 1, first + count + 1) * interval).astype(np.int64)
+
+        # AR(1) noise keeps adjacent intervals correlated like real runs
+        ar, state = _ar1(rng, count, noise, state)
+        shape = 1 + ar
+        if warmup:
+            shape *= np.minimum(1, 0.3 + 0.7 * time / warmup)
+        if dip_period:
+            phase = (time % dip_period) / dip_period
+            shape *= 1 - dip_depth * (phase < 0.1)
+        tps = np.round(level * shape, 2)
+
+        qps = np.round(tps * 20, 2)
+        lat95 = quantize_latency(1.35 * 1000 * threads / np.maximum(tps, 1e-3) * (1 + rng.normal(0, 0.01, count)))
+        yield {
+            'time': time,
+            'thds': np.full(count, threads, dtype=np.int32),
+            'tps': tps,
+            'qps': qps,
+            'reads': np.round(qps * 0.7, 2),
+            'writes': np.round(qps * 0.2, 2),
+            'other': np.round(qps * 0.1, 2),
+            'lat95': np.round(lat95, 2),
+            'err': np.round(np.abs(rng.normal(0, 0.01, count)), 2),
+            'reconn': np.zeros(count),
+        }
+
+
+def synthetic_series(duration, threads=128, interval=2, cnf_text=None, seed=0, **model):
+    """Interval columns of a synthetic run, as parse_sysbench() returns them."""
+    chunks = list(synthetic_chunks(duration, threads, interval, cnf_text, seed, **model))
+    return {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+
+
+def format_header(threads, interval):
+    return (f'sysbench {SYSBENCH_VERSION} (using bundled LuaJIT 2.1.0-beta2)\n\n'
+            'Running the test with following options:\n'
+            f'Number of threads: {threads}\n'
+            f'Report intermediate results every {interval} second(s)\n'
+            'Initializing random number generator from current time\n\n\n'
+            'Initializing worker threads...\n\n'
+            'Threads started!\n\n')
+
+
+INTERVAL_LINE = ('[ %ds ] thds: %d tps: %.2f qps: %.2f (r/w/o: %.2f/%.2f/%.2f) '
+                 'lat (ms,95%%): %.2f err/s: %.2f reconn/s: %.2f\n')
+INTERVAL_FIELDS = ['time', 'thds', 'tps', 'qps', 'reads', 'writes', 'other', 'lat95', 'err', 'reconn']
+
+
+def format_intervals(columns):
+    # One %-format over the whole chunk runs in C, unlike a per-line f-string
+    values = np.column_stack([columns[name] for name in INTERVAL_FIELDS]).ravel().tolist()
+    return (INTERVAL_LINE * len(columns['time'])) % tuple(values)
+
+
+def summary_totals(columns):
+    """What format_summary() needs, accumulated over chunks by add_totals()."""
+    lat95 = QuantileSketch()
+    lat95.update(columns['lat95'])
+    return {
+        'duration': float(columns['time'][-1]),
+        'threads': int(columns['thds'][0]),
+        'tps': float(columns['tps'].sum()),
+        'qps': float(columns['qps'].sum()),
+        'reads': float(columns['reads'].sum()),
+        'writes': float(columns['writes'].sum()),
+        'err': float(columns['err'].sum()),
+        'lat95': lat95,
+    }
+
+
+def add_totals(totals, columns):
+    chunk = summary_totals(columns)
+    if totals is None:
+        return chunk
+    for name in ('tps', 'qps', 'reads', 'writes', 'err'):
+        totals[name] += chunk[name]
+    totals['duration'] = chunk['duration']
+    totals['lat95'].merge(chunk['lat95'])
+    return totals
+
+
+def format_summary(totals, interval):
+    """The final statistics block, consistent with the interval columns
+    summed up in totals."""
+    duration = totals['duration']
+    transactions = int(round(totals['tps'] * interval))
+    queries = int(round(totals['qps'] * interval))
+    read = int(round(totals['reads'] * interval))
+    write = int(round(totals['writes'] * interval))
+    other = queries - read - write
+    errors = int(round(totals['err'] * interval))
+    threads = totals['threads']
+    avg = 1000 * threads / max(transactions / duration, 1e-9)
+    lat_sum = avg * transactions
+    return ('SQL statistics:\n'
+            '    queries performed:\n'
+            f'        read:                            {read}\n'
+            f'        write:                           {write}\n'
+            f'        other:                           {other}\n'
+            f'        total:                           {queries}\n'
+            f'    transactions:                        {transactions} ({transactions / duration:.2f} per sec.)\n'
+            f'    queries:                             {queries} ({queries / duration:.2f} per sec.)\n'
+            f'    ignored errors:                      {errors}    ({errors / duration:.2f} per sec.)\n'
+            '    reconnects:                          0      (0.00 per sec.)\n\n'
+            'General statistics:\n'
+            f'    total time:                          {duration + 0.0178:.4f}s\n'
+            f'    total number of events:              {transactions}\n\n'
+            'Latency (ms):\n'
+            f'         min:                                    {avg / 9:.2f}\n'
+            f'         avg:                                   {avg:.2f}\n'
+            f'         max:                                  {avg * 6:.2f}\n'
+            f'         95th percentile:                       {totals["lat95"].quantile(0.5):.2f}\n'
+            f'         sum:                           {lat_sum:.2f}\n\n'
+            'Threads fairness:\n'
+            f'    events (avg/stddev):           {transactions / threads:.4f}/{np.sqrt(transactions / threads):.2f}\n'
+            f'    execution time (avg/stddev):   {lat_sum / threads / 1000:.4f}/0.08\n\n')
+
+
+def write_sysbench_log(path, duration, threads=128, interval=2, cnf_text=None, seed=0, **model):
+    """Write a complete synthetic sysbench log, one chunk of intervals at a
+    time. Returns the number of intervals written."""
+    totals = None
+    count = 0
+    with open(path, 'w') as f:
+        f.write(format_header(threads, interval))
+        for columns in synthetic_chunks(duration, threads, interval, cnf_text, seed, **model):
+            f.write(format_intervals(columns))
+            totals = add_totals(totals, columns)
+            count += len(columns['time'])
+        f.write(format_summary(totals, interval))
+    return count
+
+
+def fio_ss_series(seconds, seed=0, level=16000, fresh=0.3, settle=None, noise=0.02):
+    """Per-second IOPS of a drive settling from its fresh-out-of-box rate
+    down to level, with AR(1) noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(seconds, dtype=np.float64)
+    settle = settle or max(1.0, seconds / 4)
+    ar, _ = _ar1(rng, seconds, noise, None)
+    iops = level * (1 + fresh * np.exp(-t / settle)) * (1 + ar)
+    return np.maximum(np.round(iops), 0).astype(np.int64)
+
+
+def fio_ss_criterion(values, metric, limit):
+    """The steadystate fields fio reports for a mean (max deviation) or a
+    slope criterion over the window values."""
+    values = np.asarray(values, dtype=np.float64)
+    mean = values.mean()
+    if metric.endswith('_slope'):
+        x = np.arange(len(values), dtype=np.float64)
+        slope = np.polyfit(x, values, 1)[0] if len(values) > 1 else 0.0
+        criterion = 100 * slope / mean if mean else 0.0
+        return {'attained': int(abs(criterion) <= limit), 'criterion': f'{criterion:.6f}%',
+                'max_deviation': 0.0, 'slope': float(slope)}
+    deviation = np.abs(values - mean).max()
+    criterion = 100 * deviation / mean if mean else 0.0
+    return {'attained': int(criterion <= limit), 'criterion': f'{criterion:.6f}%',
+            'max_deviation': float(deviation), 'slope': 0.0}
+
+
+def _write_array(f, values, indent):
+    separator = ',\n' + ' ' * indent
+    f.write('[\n' + ' ' * indent)
+    for first in range(0, len(values), CHUNK_INTERVALS):
+        if first:
+            f.write(separator)
+        f.write(separator.join(map(str, values[first:first + CHUNK_INTERVALS].tolist())))
+    f.write('\n' + ' ' * (indent - 2) + ']')
+
+
+def write_fio_ss_json(path, seconds, kind='iops', seed=0, bs=FIO_BLOCK_SIZE, timestamp=None, **model):
+    """Write fio --output-format=json output of the two steady-state jobs of
+    ss/0001 (kind iops) or ss/0002 (kind bw), with seconds entries in each
+    steadystate data array. The output is stamped with timestamp, epoch
+    seconds, FIO_EPOCH + seed by default. Returns the number of entries per
+    job."""
+    now = int(FIO_EPOCH + seed if timestamp is None else timestamp)
+    arrays = []
+    jobs = []
+    for i, (name, metric, limit) in enumerate(FIO_SS_JOBS[kind]):
+        iops = fio_ss_series(seconds, seed + i, **model)
+        bw = iops * bs
+        window = iops if metric.startswith('iops') else bw
+        arrays += [iops, bw]
+        jobs.append({
+            'jobname': name,
+            'groupid': 0,
+            'error': 0,
+            'job options': {'steadystate': f'{metric}:{limit:g}%', 'steadystate_duration': f'{seconds}s'},
+            'job_runtime': seconds * 1000,
+            'steadystate': dict({
+                'ss': f'{metric}:{limit:.6f}%',
+                'duration': seconds,
+            }, **fio_ss_criterion(window, metric, limit), data={
+                'bw_mean': int(bw.mean()),
+                'iops_mean': int(iops.mean()),
+                'iops': f'@@array{2 * i}@@',
+                'bw': f'@@array{2 * i + 1}@@',
+            }),
+        })
+    doc = {
+        'fio version': 'fio-3.37',
+        'timestamp': now,
+        'timestamp_ms': now * 1000,
+        'time': _time.asctime(_time.gmtime(now)),
+        'global options': {'name': f'Synthetic steady state {kind} pre-conditioning', 'bs': f'{bs // 1024}k',
+                           'rw': 'randwrite', 'filename': '/dev/synthetic'},
+        'jobs': jobs,
+        'disk_util': [{'name': 'synthetic', 'util': 100.0}],
+    }
+    text = json.dumps(doc, indent=2, separators=(',', ' : '))
+    with open(path, 'w') as f:
+        for i, values in enumerate(arrays):
+            before, text = text.split(f'"@@array{i}@@"', 1)
+            f.write(before)
+            line = before.rsplit('\n', 1)[-1]
+            _write_array(f, values, len(line) - len(line.lstrip(' ')) + 2)
+        f.write(text + '\n')
+    return seconds
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import matplotlib.pyplot as plt
+import numpy as np
+from bench_matrix import BACKENDS, DockerBackend, SyntheticBackend, cnf_variants, expand_jobs, load_matrix, run_matrix
+from sysbench_parse import load_sysbench_many
+
+COMPARE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'compare-sysbench.py')
+
+# Function to parse a comma separated list of thread counts
+def parse_threads(value):
+    try:
+        threads = [int(v) for v in value.split(',') if v]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid thread list: {value}')
+    if not threads or min(threads) < 1:
+        raise argparse.ArgumentTypeError(f'invalid thread list: {value}')
+    return threads
+
+# Function to print progress as jobs finish
+def print_progress(record, done, total):
+    status = record['status'] if record['status'] == 'ok' else f'{record["status"]} ({record["error"]})'
+    print(f'[{done}/{total}] {record["variant"]} threads={record["threads"]} rep={record["repeat"]}: '
+          f'{status} in {record["elapsed"]:.1f}s', flush=True)
+
+# Function to plot mean TPS against threads, one line per mysql.cnf variant
+def plot_scaling(records, runs, output):
+    fig, ax = plt.subplots(figsize=(12, 7))
+    variants = list(dict.fromkeys(record['variant'] for record in records))
+    for variant in variants:
+        by_threads = {}
+        for record, columns in zip(records, runs):
+            if record['variant'] == variant and len(columns['tps']):
+                by_threads.setdefault(record['threads'], []).append(columns['tps'].mean())
+        threads = sorted(by_threads)
+        means = [np.mean(by_threads[n]) for n in threads]
+        spread = [np.std(by_threads[n]) for n in threads]
+        ax.errorbar(threads, means, yerr=spread, marker='o', capsize=4, label=variant)
+    ax.set_xscale('log', base=2)
+    ax.set_xlabel('Threads')
+    ax.set_ylabel('Mean TPS')
+    ax.set_title('Mean TPS by thread count')
+    ax.set_ylim(0)
+    ax.grid(True)
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(output)
+    plt.close(fig)
+
+# Function to plot the sysbench outputs of every thread count with compare-sysbench.py
+def plot_compare(matrix_dir, records):
+    for n in sorted({record['threads'] for record in records}):
+        group = [record for record in records if record['threads'] == n]
+        command = [sys.executable, COMPARE_SCRIPT, '--output', os.path.join(matrix_dir, f'compare-threads-{n}.png')]
+        for record in group:
+            command += ['--legend', f'{record["variant"]} rep {record["repeat"]}']
+        command += [record['output'] for record in group]
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+
+# Function to plot a finished matrix directory
+def plot_matrix(matrix_dir, results_db=None, compare=True):
+    records = [record for record in load_matrix(matrix_dir)['jobs'] if record['status'] == 'ok']
+    if not records:
+        print('No successful runs to plot')
+        return
+    runs = load_sysbench_many([record['output'] for record in records])
+    plot_scaling(records, runs, os.path.join(matrix_dir, 'scaling.png'))
+    if compare:
+        plot_compare(matrix_dir, records)
+    print(f'Plots saved to {matrix_dir}')
+    if results_db:
+        from results_store import ingest_run, open_store
+        db = open_store(results_db)
+        for record in records:
+            ingest_run(db, record['output'], label=f'{record["variant"]}-t{record["threads"]}-r{record["repeat"]}',
+                       cnf_path=record['cnf'], meta={'matrix': os.path.basename(matrix_dir), 'variant': record['variant'],
+                                                     'repeat': str(record['repeat'])})
+        db.close()
+        print(f'{len(records)} runs ingested into {results_db}')
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Run sysbench over a matrix of mysql.cnf variants and thread counts.')
+    parser.add_argument('--cnf', type=str, action='append', default=[], help='Base mysql.cnf as [name=]path, may be repeated (default: mysql.cnf)')
+    parser.add_argument('--vary', type=str, action='append', default=[], help='Sweep a [mysqld] setting as key=value1,value2 on every base cnf, may be repeated')
+    parser.add_argument('--threads', type=parse_threads, default=[128], help='Comma separated sysbench thread counts (default: 128)')
+    parser.add_argument('--time', type=int, default=43200, help='Seconds per sysbench run (default: 43200)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per variant and thread count (default: 1)')
+    parser.add_argument('--jobs', type=int, default=1, help='Maximum runs in parallel (default: 1)')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='docker', help='Execution backend (default: docker)')
+    parser.add_argument('--run-dir', type=str, default='runs', help='Directory holding the matrix directories (default: runs)')
+    parser.add_argument('--name', type=str, default=None, help='Matrix directory name (default: the current date and time)')
+    parser.add_argument('--base-port', type=int, default=3306, help='MySQL port of the first parallel slot with the docker backend (default: 3306)')
+    parser.add_argument('--telemetry', action='store_true', help='Also collect MySQL telemetry with 0005-telemetry-mysql.sh during each run')
+    parser.add_argument('--os-sample', type=float, default=0, help='Record /proc samples with os-sampler.py every this many seconds during each docker run (default: off)')
+    parser.add_argument('--synthetic-warmup', type=int, default=0, help='Warm-up ramp in seconds of synthetic runs (default: 0)')
+    parser.add_argument('--synthetic-dip-period', type=int, default=0, help='Period in seconds of TPS dips in synthetic runs (default: none)')
+    parser.add_argument('--synthetic-delay', type=float, default=0.0, help='Seconds each synthetic run sleeps, to emulate run time (default: 0)')
+    parser.add_argument('--results-db', type=str, default=None, help='Also ingest every run into this results database')
+    parser.add_argument('--no-compare', action='store_true', help='Skip the per thread count compare-sysbench.py plots')
+    parser.add_argument('--plot-only', type=str, default=None, metavar='MATRIX_DIR', help='Only plot an existing matrix directory')
+    args = parser.parse_args()
+
+    if args.plot_only:
+        plot_matrix(args.plot_only, args.results_db, not args.no_compare)
+        return 0
+
+    try:
+        variants = cnf_variants(args.cnf or ['mysql.cnf'], args.vary)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.jobs < 1 or args.repeat < 1:
+        parser.error('--jobs and --repeat must be at least 1')
+
+    matrix_dir = os.path.join(args.run_dir, args.name or time.strftime('%Y%m%d-%H%M%S'))
+    jobs = expand_jobs(matrix_dir, variants, args.threads, args.repeat, args.time)
+    if args.backend == 'synthetic':
+        backend = SyntheticBackend(warmup=args.synthetic_warmup, dip_period=args.synthetic_dip_period, delay=args.synthetic_delay)
+    else:
+        backend = DockerBackend(base_port=args.base_port, telemetry=args.telemetry, os_sample=args.os_sample)
+    print(f'Running {len(jobs)} jobs ({len(variants)} variants x {len(args.threads)} thread counts x {args.repeat} repeats), '
+          f'{args.jobs} at a time, into {matrix_dir}')
+
+    started = time.time()
+    records = run_matrix(matrix_dir, jobs, backend, args.jobs, print_progress)
+    failed = [record for record in records if record['status'] != 'ok']
+    print(f'{len(records) - len(failed)}/{len(records)} runs succeeded in {time.time() - started:.1f}s')
+
+    plot_matrix(matrix_dir, args.results_db, not args.no_compare)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
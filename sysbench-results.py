@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+
+import argparse
+import glob
+import sys
+from datetime import datetime
+import matplotlib.pyplot as plt
+from results_store import SERIES_FIELDS, SUMMARY_FIELDS, find_runs, get_runs, ingest_run, load_series, open_store, results_path, run_meta
+
+LIST_FIELDS = ['threads', 'duration', 'tps_mean', 'tps_std', 'transactions_per_sec', 'latency_avg', 'latency_p95']
+
+# Function to parse repeated key=value metadata arguments
+def parse_meta(items, parser):
+    meta = {}
+    for item in items:
+        key, sep, value = item.partition('=')
+        if not sep or not key:
+            parser.error(f'metadata must be given as key=value, not "{item}"')
+        meta[key] = value
+    return meta
+
+# Function to format one stored value for a table
+def format_value(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    return str(value)
+
+# Function to print rows as an aligned table
+def print_table(header, rows):
+    widths = [max(len(str(h)), *(len(r[i]) for r in rows)) if rows else len(str(h)) for i, h in enumerate(header)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        print('  '.join(v.ljust(w) for v, w in zip(row, widths)))
+
+# Function to record sysbench logs in the store
+def cmd_ingest(db, args, parser):
+    meta = parse_meta(args.meta, parser)
+    files = []
+    for entry in args.logs:
+        files.extend(sorted(glob.glob(entry)) if glob.has_magic(entry) else [entry])
+    if args.label and len(files) > 1:
+        parser.error('--label can only be used when ingesting a single log')
+    for log_path in files:
+        run_id, created = ingest_run(db, log_path, label=args.label, cnf_path=args.cnf, meta=meta)
+        state = 'ingested' if created else 'already stored'
+        print(f'{log_path}: {state} as run {run_id}')
+
+# Function to list stored runs matching the filters
+def cmd_list(db, args, parser):
+    runs = find_runs(db, threads=args.threads, label=args.label, cnf_hash=args.cnf_hash,
+                     meta=parse_meta(args.meta, parser))
+    header = ['id', 'label', 'ingested', 'cnf'] + LIST_FIELDS
+    rows = [[str(run['id']), run['label'],
+             datetime.fromtimestamp(run['ingested_at']).strftime('%Y-%m-%d %H:%M'),
+             (run['cnf_hash'] or '-')[:8]] + [format_value(run[field]) for field in LIST_FIELDS]
+            for run in runs]
+    print_table(header, rows)
+
+# Function to show stored runs side by side, relative to the first one
+def cmd_compare(db, args, parser):
+    try:
+        runs = get_runs(db, args.ids)
+    except KeyError as e:
+        parser.error(e.args[0])
+    header = ['field'] + [f'{run["id"]}: {run["label"]}' for run in runs]
+    rows = []
+    for field in ['duration', 'intervals'] + SUMMARY_FIELDS + SERIES_FIELDS:
+        row = [field, format_value(runs[0][field])]
+        for run in runs[1:]:
+            value = format_value(run[field])
+            base = runs[0][field]
+            if isinstance(run[field], (int, float)) and isinstance(base, (int, float)) and base and field != 'threads':
+                value += f' ({100 * (run[field] - base) / base:+.1f}%)'
+            row.append(value)
+        rows.append(row)
+    if any(run['cnf_hash'] for run in runs):
+        rows.append(['cnf'] + [(run['cnf_hash'] or '-')[:8] for run in runs])
+    for run in runs:
+        meta = run_meta(db, run['id'])
+        if meta:
+            print(f'run {run["id"]} metadata: ' + ', '.join(f'{k}={v}' for k, v in sorted(meta.items())))
+    print_table(header, rows)
+
+# Function to show one summary metric over time across runs
+def cmd_trend(db, args, parser):
+    if args.metric not in SUMMARY_FIELDS + SERIES_FIELDS + ['duration', 'intervals']:
+        parser.error(f'unknown metric "{args.metric}"')
+    runs = find_runs(db, threads=args.threads, label=args.label, cnf_hash=args.cnf_hash,
+                     meta=parse_meta(args.meta, parser))
+    runs = [run for run in runs if run[args.metric] is not None]
+    print_table(['id', 'ingested', 'label', args.metric],
+                [[str(run['id']), datetime.fromtimestamp(run['ingested_at']).strftime('%Y-%m-%d %H:%M'),
+                  run['label'], format_value(run[args.metric])] for run in runs])
+    if args.plot and runs:
+        plt.figure(figsize=(12, 6))
+        plt.plot([datetime.fromtimestamp(run['ingested_at']) for run in runs],
+                 [run[args.metric] for run in runs], 'o-')
+        plt.xlabel('Ingested')
+        plt.ylabel(args.metric)
+        plt.title(f'{args.metric} across {len(runs)} runs')
+        plt.grid(True)
+        plt.savefig(args.plot)
+        print(f'Trend plot saved to {args.plot}')
+
+# Function to write the stored interval series of a run back as CSV
+def cmd_export(db, args, parser):
+    columns = load_series(db, args.id)
+    if not columns:
+        parser.error(f'No such run: {args.id}')
+    out = open(args.output, 'w') if args.output else sys.stdout
+    names = list(columns)
+    out.write(','.join(names) + '\n')
+    for row in zip(*(columns[name].tolist() for name in names)):
+        out.write(','.join(map(str, row)) + '\n')
+    if args.output:
+        out.close()
+
+# Function to add the filters shared by list and trend
+def add_filter_arguments(parser):
+    parser.add_argument('--threads', type=int, default=None, help='Only runs with this number of threads')
+    parser.add_argument('--label', type=str, default=None, help='Only runs whose label matches this SQL LIKE pattern')
+    parser.add_argument('--cnf-hash', type=str, default=None, help='Only runs whose mysql.cnf hash starts with this prefix')
+    parser.add_argument('--meta', type=str, action='append', default=[], help='Only runs with this key=value metadata, may be repeated')
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Store sysbench runs in an indexed SQLite database and query them.')
+    parser.add_argument('--db', type=str, default=None, help=f'Results database (default: $PLOT_SYSBENCH_RESULTS or {results_path()})')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ingest = sub.add_parser('ingest', help='Record sysbench logs')
+    ingest.add_argument('logs', type=str, nargs='+', help='sysbench output files or globs')
+    ingest.add_argument('--label', type=str, default=None, help='Label for the run (default: the file name)')
+    ingest.add_argument('--cnf', type=str, default=None, help='mysql.cnf used for the run(s)')
+    ingest.add_argument('--meta', type=str, action='append', default=[], help='Extra key=value metadata, may be repeated')
+    ingest.set_defaults(func=cmd_ingest)
+
+    listing = sub.add_parser('list', help='List stored runs')
+    add_filter_arguments(listing)
+    listing.set_defaults(func=cmd_list)
+
+    compare = sub.add_parser('compare', help='Compare the summaries of stored runs')
+    compare.add_argument('ids', type=int, nargs='+', help='Run ids, the first one is the baseline')
+    compare.set_defaults(func=cmd_compare)
+
+    trend = sub.add_parser('trend', help='Show a summary metric across runs by ingest time')
+    trend.add_argument('--metric', type=str, default='tps_mean', help='Stored metric (default: tps_mean)')
+    trend.add_argument('--plot', type=str, default=None, help='Also plot the trend to this image file')
+    add_filter_arguments(trend)
+    trend.set_defaults(func=cmd_trend)
+
+    export = sub.add_parser('export', help='Write the stored interval series of a run as CSV')
+    export.add_argument('id', type=int, help='Run id')
+    export.add_argument('--output', type=str, default=None, help='Output CSV file (default: stdout)')
+    export.set_defaults(func=cmd_export)
+
+    args = parser.parse_args()
+    db = open_store(args.db)
+    try:
+        args.func(db, args, parser)
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+
+import argparse
+import json
+import matplotlib.pyplot as plt
+import numpy as np
+from bench_matrix import load_matrix
+from scalability import fit_model, model_latency, model_tps
+from series_cache import add_cache_arguments, handle_cache_arguments
+from steady_state import DEFAULT_CRITERIA, DEFAULT_CRITERIA_HELP, detect_steady_state, parse_criterion, trim_warmup
+from sysbench_parse import load_sysbench_many
+
+MODELS = ['usl', 'amdahl']
+MODEL_LABELS = {'usl': 'USL', 'amdahl': 'Amdahl'}
+MODEL_COLORS = {'usl': 'C3', 'amdahl': 'C2'}
+
+# Function to reduce a run to its thread count, steady-state TPS and p95 latency
+def scaling_point(file_path, columns, criteria, window, ramp):
+    result = detect_steady_state(columns, criteria, window, ramp)
+    steady = trim_warmup(columns, result)
+    return {
+        'file': file_path,
+        'threads': int(np.median(columns['thds'])),
+        'steady': result['steady'],
+        'warmup_intervals': result.get('warmup_intervals', 0),
+        'tps': float(steady['tps'].mean()),
+        'lat95': float(np.median(steady['lat95'])),
+    }
+
+# Function to print the measured points and the fitted models
+def print_scaling(points, fits):
+    print(f'{"threads":>8} {"TPS":>10} {"p95 ms":>8}  file')
+    for point in sorted(points, key=lambda p: p['threads']):
+        note = '' if point['steady'] else '  (never steady, whole run used)'
+        print(f'{point["threads"]:>8} {point["tps"]:>10.2f} {point["lat95"]:>8.2f}  {point["file"]}{note}')
+    print()
+    for fit in fits:
+        if fit['peak_threads'] is not None:
+            peak = f'peak at {fit["peak_threads"]:.0f} threads, {fit["peak_tps"]:.2f} TPS'
+        elif fit['peak_tps'] is not None:
+            peak = f'no peak, approaches {fit["peak_tps"]:.2f} TPS'
+        else:
+            peak = 'scales linearly'
+        print(f'{MODEL_LABELS[fit["model"]]}: lambda={fit["lambda"]:.2f} sigma={fit["sigma"]:.5f} '
+              f'kappa={fit["kappa"]:.3g} R^2={fit["r2"]:.4f}, {peak}')
+
+# Function to plot measured against modeled TPS and latency by thread count
+def plot_scaling(points, fits, max_threads, output):
+    threads = np.array([p['threads'] for p in points])
+    grid = np.unique(np.geomspace(1, max_threads, 400))
+    fig, (tps_ax, lat_ax) = plt.subplots(1, 2, figsize=(24, 9))
+
+    tps_ax.plot(threads, [p['tps'] for p in points], 'o', color='C0', markersize=8, label='Measured steady-state TPS', zorder=3)
+    lat_ax.plot(threads, [p['lat95'] for p in points], 'o', color='C0', markersize=8, label='Measured p95 latency', zorder=3)
+    for fit in fits:
+        label = MODEL_LABELS[fit['model']]
+        color = MODEL_COLORS[fit['model']]
+        tps_ax.plot(grid, model_tps(fit, grid), '-', color=color, label=f'{label} fit (R$^2$ {fit["r2"]:.3f})')
+        lat_ax.plot(grid, model_latency(fit, grid), '-', color=color, label=f'{label} mean latency (Little\'s law)')
+        if fit['peak_threads'] is not None:
+            tps_ax.axvline(fit['peak_threads'], color=color, linestyle='--', linewidth=1)
+            tps_ax.annotate(f'{label} peak: {fit["peak_threads"]:.0f} threads\n{fit["peak_tps"]:.0f} TPS',
+                            (fit['peak_threads'], fit['peak_tps']), xytext=(10, 10), textcoords='offset points', color=color)
+    if fits:
+        # Linear scaling at the fitted single thread throughput, for reference
+        lam = fits[0]['lambda']
+        top = tps_ax.get_ylim()[1]
+        tps_ax.plot(grid, lam * grid, ':', color='grey', label='Linear scaling')
+        tps_ax.set_ylim(0, top)
+
+    tps_ax.set_title('Throughput by thread count')
+    tps_ax.set_ylabel('TPS')
+    lat_ax.set_title('Latency by thread count')
+    lat_ax.set_ylabel('Latency (ms)')
+    lat_ax.set_ylim(0)
+    for ax in (tps_ax, lat_ax):
+        ax.set_xscale('log', base=2)
+        ax.set_xlabel('Threads')
+        ax.grid(True)
+        ax.legend(loc='upper left')
+    fig.tight_layout()
+    fig.savefig(output)
+    print(f'\nScaling plot saved to {output}')
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Fit Amdahl and Universal Scalability Law models to sysbench runs at different thread counts.')
+    parser.add_argument('files', type=str, nargs='*', help='sysbench output files, one or more per thread count')
+    parser.add_argument('--matrix', type=str, action='append', default=[], help='Also use the successful runs of a sysbench-matrix.py directory, may be repeated')
+    parser.add_argument('--variant', type=str, default=None, help='Only use this mysql.cnf variant of the --matrix runs')
+    parser.add_argument('--model', type=str, default=','.join(MODELS), help=f'Comma separated models to fit (default: {",".join(MODELS)})')
+    parser.add_argument('--criterion', type=str, action='append', default=[],
+                        help=f'Steady-state criterion used to trim warm-up, may be repeated (default: {DEFAULT_CRITERIA_HELP})')
+    parser.add_argument('--window', type=int, default=1800, help='Seconds the steady-state criteria must hold for (default: 1800)')
+    parser.add_argument('--ramp', type=int, default=0, help='Seconds at the start of each run never considered steady (default: 0)')
+    parser.add_argument('--max-threads', type=int, default=None, help='Extend the model curves to this thread count (default: past the peak or 2x the largest run)')
+    parser.add_argument('--output', type=str, default='scaling_fit.png', help='Output image file')
+    parser.add_argument('--json', type=str, default=None, help='Write the measured points and fits to this JSON file')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of parser processes (default: number of CPUs)')
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    use_cache = handle_cache_arguments(args)
+    models = [m.strip() for m in args.model.split(',') if m.strip()]
+    for model in models:
+        if model not in MODELS:
+            parser.error(f'unknown model {model}, choose from: {", ".join(MODELS)}')
+    try:
+        criteria = [parse_criterion(spec) for spec in args.criterion or DEFAULT_CRITERIA]
+    except ValueError as e:
+        parser.error(str(e))
+
+    files = list(args.files)
+    for matrix_dir in args.matrix:
+        files += [record['output'] for record in load_matrix(matrix_dir)['jobs']
+                  if record['status'] == 'ok' and args.variant in (None, record['variant'])]
+    if not files:
+        parser.error('no sysbench output files given')
+
+    runs = load_sysbench_many(files, max_workers=args.jobs, use_cache=use_cache)
+    points = [scaling_point(file_path, columns, criteria, args.window, args.ramp)
+              for file_path, columns in zip(files, runs) if len(columns['tps'])]
+    if not points:
+        parser.error('no intervals in the sysbench output files')
+    threads = [p['threads'] for p in points]
+    tps = [p['tps'] for p in points]
+
+    fits = []
+    for model in models:
+        try:
+            fits.append(fit_model(threads, tps, model))
+        except ValueError as e:
+            print(f'Skipping {MODEL_LABELS[model]}: {e}')
+    print_scaling(points, fits)
+
+    max_threads = args.max_threads
+    if not max_threads:
+        peaks = [fit['peak_threads'] for fit in fits if fit['peak_threads'] is not None]
+        max_threads = max([2 * max(threads)] + [1.5 * n for n in peaks if n < 8 * max(threads)])
+    plot_scaling(points, fits, max_threads, args.output)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'points': points, 'fits': fits}, f, indent=2)
+        print(f'Scaling fits written to {args.json}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+
+import argparse
+import json
+import subprocess
+import time
+import matplotlib.pyplot as plt
+from series_cache import add_cache_arguments, handle_cache_arguments
+from steady_state import DEFAULT_CRITERIA, DEFAULT_CRITERIA_HELP, SteadyStateMonitor, detect_steady_state, parse_criterion, trim_warmup
+from sysbench_follow import SysbenchFollower
+from sysbench_parse import load_sysbench
+
+# Function to print the steady-state result of a run
+def print_result(label, result, columns):
+    print(f'{label}:')
+    if not result['steady']:
+        print(f'  Not steady: no {result["window"]}s window satisfies {", ".join(result["criteria"])}\n')
+        return
+    print(f'  Steady from {result["start_time"]}s, criteria held by {result["reached_time"]}s '
+          f'({result["warmup_intervals"]} warm-up intervals trimmed)')
+    for spec in result['criteria']:
+        print(f'  {spec}: {result[spec]:.4g}')
+    print(f'  Windows satisfying the criteria: {100 * result["steady_fraction"]:.1f}%')
+    steady = trim_warmup(columns, result)
+    print(f'  Mean TPS: {columns["tps"].mean():.2f} whole run, {steady["tps"].mean():.2f} after warm-up\n')
+
+# Function to plot TPS with the warm-up shaded and steady state marked
+def plot_result(files, runs, results, output):
+    fig, axes = plt.subplots(len(runs), 1, figsize=(30, 6 * len(runs)), squeeze=False)
+    for ax, file_path, columns, result in zip(axes[:, 0], files, runs, results):
+        ax.plot(columns['time'], columns['tps'], 'o', markersize=1)
+        if result['steady']:
+            ax.axvspan(columns['time'][0], result['start_time'], color='grey', alpha=0.3, label='Warm-up')
+            ax.axvline(result['reached_time'], color='r', linestyle='--', label=f'Steady by {result["reached_time"]}s')
+            ax.legend(loc='lower right')
+        ax.set_title(f'{file_path}: {", ".join(result["criteria"])} over {result["window"]}s')
+        ax.set_xlabel('Time (seconds)')
+        ax.set_ylabel('TPS')
+        ax.set_ylim(0)
+        ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(output)
+    print(f'Steady-state plot saved to {output}')
+
+# Function to watch a run in progress and optionally stop it once steady
+def follow_run(args, criteria):
+    follower = SysbenchFollower(args.files[0], window=1, history=2)
+    monitor = SteadyStateMonitor(criteria, args.window, args.ramp)
+    while True:
+        # Feed the monitor with the intervals appended since the last poll
+        if follower.poll():
+            if monitor.update(follower.last):
+                result = monitor.result
+                print(f'Steady at {result["time"]}s over the last {result["window"]}s: ' +
+                      ', '.join(f'{c["spec"]}={result[c["spec"]]:.4g}' for c in criteria), flush=True)
+                if args.stop_command:
+                    subprocess.run(args.stop_command, shell=True, check=False)
+                return 0
+            print(f'{follower.total} intervals, not steady yet at {monitor.result["time"]}s', flush=True)
+        if follower.finished:
+            print('Run finished before reaching steady state')
+            return 1
+        time.sleep(args.refresh)
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description='Detect warm-up and steady state in sysbench TPS.')
+    parser.add_argument('files', type=str, nargs='+', help='sysbench output files')
+    parser.add_argument('--criterion', type=str, action='append', default=[],
+                        help=f'fio style criterion, e.g. tps:10%% or tps_slope:0.01%%, may be repeated (default: {DEFAULT_CRITERIA_HELP})')
+    parser.add_argument('--window', type=int, default=1800, help='Seconds the criteria must hold for (default: 1800)')
+    parser.add_argument('--ramp', type=int, default=0, help='Seconds at the start of the run never considered steady (default: 0)')
+    parser.add_argument('--plot', type=str, default=None, help='Plot TPS with the warm-up marked to this image file')
+    parser.add_argument('--json', type=str, default=None, help='Write the results to this JSON file')
+    parser.add_argument('--follow', action='store_true', help='Watch a run in progress and exit once it is steady')
+    parser.add_argument('--refresh', type=float, default=10.0, help='Seconds between polls in --follow mode (default: 10)')
+    parser.add_argument('--stop-command', type=str, default=None, help='Shell command run once steady in --follow mode, e.g. "docker stop sysbench"')
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        criteria = [parse_criterion(spec) for spec in args.criterion or DEFAULT_CRITERIA]
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.follow:
+        if len(args.files) != 1:
+            parser.error('--follow takes a single sysbench output file')
+        try:
+            return follow_run(args, criteria)
+        except KeyboardInterrupt:
+            return 1
+
+    use_cache = handle_cache_arguments(args)
+    runs = [load_sysbench(file_path, use_cache) for file_path in args.files]
+    results = [detect_steady_state(columns, criteria, args.window, args.ramp) for columns in runs]
+    for file_path, columns, result in zip(args.files, runs, results):
+        print_result(file_path, result, columns)
+    if args.plot:
+        plot_result(args.files, runs, results, args.plot)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(zip(args.files, results)), f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
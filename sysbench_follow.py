@@ -0,0 +1,135 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Incremental reader for a sysbench log that is still being written.
+#
+# A follower remembers the byte offset it has consumed so far and only
+# parses newly appended bytes on each poll, holding back a trailing partial
+# line until it is complete. Parsed intervals go into two bounded stores:
+#
+#   - a ring buffer with the most recent intervals at full resolution
+#   - a decimated history of the whole run as (time, min, max) buckets,
+#     where adjacent buckets are merged pairwise whenever the history fills
+#     up, so stalls and peaks survive no matter how long the run gets
+#
+# The cost of a poll is proportional to the bytes appended since the last
+# poll, and memory is bounded by the ring and history capacities.
+
+import os
+import numpy as np
+from sysbench_parse import empty_columns, parse_buffer
+
+END_OF_RUN = b'SQL statistics:'
+
+
+class RingBuffer:
+    def __init__(self, capacity, columns=('time', 'tps')):
+        self.capacity = capacity
+        self.data = {name: np.empty(capacity, dtype=np.float64) for name in columns}
+        self.count = 0
+        self.head = 0
+
+    def extend(self, columns):
+        n = len(next(iter(columns.values())))
+        if n == 0:
+            return
+        if n > self.capacity:
+            columns = {name: values[-self.capacity:] for name, values in columns.items()}
+            n = self.capacity
+        idx = (self.head + np.arange(n)) % self.capacity
+        for name, values in self.data.items():
+            values[idx] = columns[name]
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def get(self, name):
+        """Return the stored values of a column, oldest first."""
+        values = self.data[name]
+        if self.count < self.capacity:
+            return values[:self.count].copy()
+        return np.concatenate([values[self.head:], values[:self.head]])
+
+
+class DecimatedHistory:
+    def __init__(self, capacity):
+        # Keep capacity even so a full history always merges cleanly in pairs
+        self.capacity = capacity + capacity % 2
+        self.time = np.empty(0)
+        self.low = np.empty(0)
+        self.high = np.empty(0)
+        self.stride = 1
+        self.pending = (np.empty(0), np.empty(0))
+
+    def extend(self, times, values):
+        # Fold incoming samples into buckets of the current stride; samples
+        # that do not yet fill a bucket wait in pending.
+        times = np.concatenate([self.pending[0], times])
+        values = np.concatenate([self.pending[1], values])
+        full = len(times) - len(times) % self.stride
+        self.pending = (times[full:], values[full:])
+        if full:
+            t = times[:full].reshape(-1, self.stride)
+            v = values[:full].reshape(-1, self.stride)
+            self.time = np.concatenate([self.time, t[:, 0]])
+            self.low = np.concatenate([self.low, v.min(axis=1)])
+            self.high = np.concatenate([self.high, v.max(axis=1)])
+        while len(self.time) > self.capacity:
+            self._merge_pairs()
+
+    def _merge_pairs(self):
+        n = len(self.time) - len(self.time) % 2
+        rest = slice(n, None)
+        self.time = np.concatenate([self.time[:n:2], self.time[rest]])
+        low = self.low[:n].reshape(-1, 2).min(axis=1)
+        high = self.high[:n].reshape(-1, 2).max(axis=1)
+        self.low = np.concatenate([low, self.low[rest]])
+        self.high = np.concatenate([high, self.high[rest]])
+        self.stride *= 2
+
+
+class SysbenchFollower:
+    def __init__(self, file_path, window=3600, history=4096):
+        self.file_path = file_path
+        self.offset = 0
+        self.partial = b''
+        self.finished = False
+        self.total = 0
+        # Every column of the intervals parsed by the latest poll
+        self.last = empty_columns()
+        self.recent = RingBuffer(window)
+        self.history = DecimatedHistory(history)
+
+    def reset(self):
+        self.__init__(self.file_path, self.recent.capacity, self.history.capacity)
+
+    def poll(self):
+        """Parse whatever was appended since the last poll and return the
+        number of new intervals."""
+        try:
+            size = os.path.getsize(self.file_path)
+        except FileNotFoundError:
+            return 0
+        if size < self.offset:
+            # The log was truncated or replaced, start over
+            self.reset()
+        if size == self.offset:
+            return 0
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        self.offset += len(chunk)
+
+        buf = self.partial + chunk
+        cut = buf.rfind(b'\n') + 1
+        self.partial = buf[cut:]
+        buf = buf[:cut]
+        if END_OF_RUN in buf:
+            self.finished = True
+
+        columns = parse_buffer(buf)
+        self.last = columns
+        n = len(columns['time'])
+        if n:
+            self.recent.extend(columns)
+            self.history.extend(columns['time'].astype(np.float64), columns['tps'])
+            self.total += n
+        return n
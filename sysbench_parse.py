@@ -0,0 +1,219 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Shared sysbench interval log parser.
+#
+# sysbench prints one line per --report-interval:
+#
+# [ 2s ] thds: 128 tps: 5318.92 qps: 106975.40 (r/w/o: 74971.45/21304.66/10699.29) lat (ms,95%): 33.72 err/s: 0.00 reconn/s: 0.00
+#
+# We scan the file as bytes with a single compiled regular expression over an
+# mmap of the file, so the scan runs in C and we never build a list of lines.
+# The matched fields are then converted to typed NumPy columns in one
+# vectorized step. load_sysbench() additionally goes through the parsed-series
+# cache so re-plotting an unchanged log does not parse it again.
+#
+# parse_summary() reads the run options from the head of the log and the final
+# statistics block sysbench prints after the last interval from its tail.
+#
+# load_sysbench_many() parses a set of logs across a process pool, splitting
+# large logs into newline-aligned chunks so a single huge log also uses all
+# cores.
+
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from series_cache import cache_enabled, cache_get, cache_put, cached_load
+
+INTERVAL_RE = re.compile(
+    rb'\[\s*(\d+)s\s*\]\s*'
+    rb'thds:\s*(\d+)\s+'
+    rb'tps:\s*([\d.]+)\s+'
+    rb'qps:\s*([\d.]+)\s+'
+    rb'\(r/w/o:\s*([\d.]+)/([\d.]+)/([\d.]+)\)\s+'
+    rb'lat\s*\(ms,[\d.]+%\):\s*([\d.]+)\s+'
+    rb'err/s:?\s*([\d.]+)\s+'
+    rb'reconn/s:\s*([\d.]+)'
+)
+
+CACHE_KIND = 'sysbench-v1'
+CHUNK_SIZE = 64 * 1024 * 1024
+
+# Column name and dtype for each regex group, in order
+COLUMNS = [
+    ('time', np.int64),
+    ('thds', np.int32),
+    ('tps', np.float64),
+    ('qps', np.float64),
+    ('reads', np.float64),
+    ('writes', np.float64),
+    ('other', np.float64),
+    ('lat95', np.float64),
+    ('err', np.float64),
+    ('reconn', np.float64),
+]
+
+
+def empty_columns():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+
+
+def parse_buffer(buf):
+    """Parse all interval lines found in a bytes-like buffer into columns."""
+    matches = INTERVAL_RE.findall(buf)
+    if not matches:
+        return empty_columns()
+    raw = np.array(matches, dtype=np.bytes_)
+    columns = {}
+    for i, (name, dtype) in enumerate(COLUMNS):
+        if np.issubdtype(dtype, np.integer):
+            columns[name] = raw[:, i].astype(np.int64).astype(dtype)
+        else:
+            columns[name] = raw[:, i].astype(dtype)
+    return columns
+
+
+def parse_sysbench(file_path):
+    """Parse a sysbench output file into a dict of NumPy columns."""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return empty_columns()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_buffer(mm)
+
+
+def load_sysbench(file_path, use_cache=True):
+    """Like parse_sysbench() but served from the parsed-series cache."""
+    return cached_load(file_path, CACHE_KIND, parse_sysbench, use_cache)
+
+
+def concat_columns(parts):
+    """Concatenate a list of column dicts, preserving column order."""
+    parts = [p for p in parts if len(p['time'])]
+    if not parts:
+        return empty_columns()
+    return {name: np.concatenate([p[name] for p in parts]) for name, _ in COLUMNS}
+
+
+def chunk_ranges(file_path, chunk_size=CHUNK_SIZE):
+    """Split file_path into (start, end) byte ranges of about chunk_size
+    bytes, each ending right after a newline so no line is split."""
+    size = os.path.getsize(file_path)
+    if size <= chunk_size:
+        return [(0, size)]
+    ranges = []
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = mm.find(b'\n', min(start + chunk_size, size) - 1)
+            end = size if end < 0 else end + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_range(file_path, start, end):
+    if start == end:
+        return empty_columns()
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return parse_buffer(mm[start:end])
+
+
+def load_sysbench_many(file_paths, max_workers=None, use_cache=True, chunk_size=CHUNK_SIZE):
+    """Parse several sysbench logs in parallel and return their columns in
+    the same order. Cached logs are not re-parsed."""
+    use_cache = use_cache and cache_enabled()
+    results = [None] * len(file_paths)
+    work = []
+    for i, file_path in enumerate(file_paths):
+        if use_cache:
+            results[i] = cache_get(file_path, CACHE_KIND)
+        if results[i] is None:
+            work.extend((i, file_path, start, end) for start, end in chunk_ranges(file_path, chunk_size))
+
+    if len(work) == 1:
+        i, file_path, start, end = work[0]
+        parts = {i: [parse_range(file_path, start, end)]}
+    elif work:
+        parts = {}
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(i, executor.submit(parse_range, path, start, end)) for i, path, start, end in work]
+            for i, future in futures:
+                parts.setdefault(i, []).append(future.result())
+    else:
+        parts = {}
+
+    for i, chunks in parts.items():
+        results[i] = concat_columns(chunks)
+        if use_cache:
+            cache_put(file_paths[i], CACHE_KIND, results[i])
+    return results
+
+
+# The final statistics block, one (key, regex) per value we keep
+SUMMARY_RE = [
+    ('queries_read', rb'read:\s+(\d+)'),
+    ('queries_write', rb'write:\s+(\d+)'),
+    ('queries_other', rb'other:\s+(\d+)'),
+    ('queries_total', rb'total:\s+(\d+)'),
+    ('transactions', rb'transactions:\s+(\d+)'),
+    ('transactions_per_sec', rb'transactions:\s+\d+\s+\(([\d.]+) per sec\.\)'),
+    ('queries', rb'queries:\s+(\d+)'),
+    ('queries_per_sec', rb'queries:\s+\d+\s+\(([\d.]+) per sec\.\)'),
+    ('ignored_errors', rb'ignored errors:\s+(\d+)'),
+    ('reconnects', rb'reconnects:\s+(\d+)'),
+    ('total_time', rb'total time:\s+([\d.]+)s'),
+    ('total_events', rb'total number of events:\s+(\d+)'),
+    ('latency_min', rb'min:\s+([\d.]+)'),
+    ('latency_avg', rb'avg:\s+([\d.]+)'),
+    ('latency_max', rb'max:\s+([\d.]+)'),
+    ('latency_p95', rb'\d+th percentile:\s+([\d.]+)'),
+    ('latency_sum', rb'sum:\s+([\d.]+)'),
+    ('events_avg', rb'events \(avg/stddev\):\s+([\d.]+)/'),
+    ('events_stddev', rb'events \(avg/stddev\):\s+[\d.]+/([\d.]+)'),
+    ('execution_time_avg', rb'execution time \(avg/stddev\):\s+([\d.]+)/'),
+    ('execution_time_stddev', rb'execution time \(avg/stddev\):\s+[\d.]+/([\d.]+)'),
+]
+
+HEADER_RE = [
+    ('sysbench_version', rb'sysbench ([\w.-]+)'),
+    ('threads', rb'Number of threads:\s+(\d+)'),
+    ('report_interval', rb'Report intermediate results every (\d+) second'),
+]
+
+SUMMARY_TAIL_SIZE = 64 * 1024
+HEADER_SIZE = 4096
+
+
+def _match_fields(buf, patterns):
+    fields = {}
+    for key, pattern in patterns:
+        match = re.search(pattern, buf)
+        if not match:
+            continue
+        value = match.group(1).decode()
+        try:
+            fields[key] = int(value)
+        except ValueError:
+            try:
+                fields[key] = float(value)
+            except ValueError:
+                fields[key] = value
+    return fields
+
+
+def parse_summary(file_path):
+    """Return the run options and final statistics of a sysbench log as a
+    flat dict. Only the head and the tail of the file are read; missing
+    sections (for example an interrupted run) are simply left out."""
+    with open(file_path, 'rb') as f:
+        head = f.read(HEADER_SIZE)
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size - SUMMARY_TAIL_SIZE))
+        tail = f.read()
+    summary = _match_fields(head, HEADER_RE)
+    start = tail.find(b'SQL statistics:')
+    if start >= 0:
+        summary.update(_match_fields(tail[start:], SUMMARY_RE))
+    return summary
@@ -0,0 +1,14 @@
+# SPDX-License-Identifier: copyleft-next-0.3.1
+#
+# Time axis of the sysbench plots.
+#
+# sysbench reports seconds since the start of the run. Runs longer than two
+# hours are drawn in hours so the tick labels stay readable.
+
+
+def time_scale(max_time_in_seconds):
+    """The factor to divide times by and the axis label for a run lasting
+    max_time_in_seconds."""
+    if max_time_in_seconds > 2 * 3600:
+        return 3600, 'Time (hours)'
+    return 1, 'Time (seconds)'